@@ -3,9 +3,30 @@
 
 # imports
 import random  # used for randomly selecting
-import heapq   # used for the minheap
-from itertools import count  # used for the counter
-import copy  # used to preserve best schedule
+import argparse  # used for the command line options
+from collections import namedtuple  # used for the read-only assignment view
+from types import MappingProxyType  # used for the read-only assignment view
+from fitness_engine import FitnessTables, batch_fitness  # used for batch scoring
+from genome import new_genome, decode_genome, stack_genomes, split_block, block_genome  # used for compact schedules
+from operators import random_genome  # used for random schedules
+from ga_engines import SteadyStateGA  # used for the steady-state GA loop
+from islands import run_islands  # used for the multi-core island mode
+from population_store import PopulationStore  # used for restoring the minheap population
+from fitness_cache import FitnessCache, POLICIES, cache_summary  # used for skipping already scored children
+from instance_loader import load_instance  # used for problem instances stored in files
+from instrumentation import NULL_METRICS, add_metrics_arguments, metrics_from_args  # used for per-generation metrics
+from checkpoint import (write_snapshot, read_snapshot, rng_arrays, restore_rng, cache_arrays, restore_cache,  # used for
+                        instance_meta, check_instance, add_checkpoint_arguments)  # saving and resuming long runs
+from results import (NULL_WRITER, add_output_arguments, check_output_arguments, writer_from_args,  # used for streamed
+                     generation_record, improvement_record, export_timetable)  # results and the timetable export
+from local_search import add_memetic_arguments  # used for the memetic stage options
+from adaptive import AdaptiveControl, add_adaptive_arguments, describe  # used for adaptive control
+from stopping import add_stopping_arguments, rules_from_args  # used for deciding when a run is done
+from run_config import add_config_arguments, parse_with_config  # used for seeded, repeatable runs
+from pareto import run_nsga2, format_front, export_front, add_pareto_arguments, check_pareto_arguments  # used for the multi-objective mode
+from warm_start import (STAGNATION, add_warm_start_arguments, changed_instance,  # used for re-optimizing a previous
+                        warm_start_from_args)  # schedule after the instance changed
+from seeding import add_seeding_arguments  # used for the greedy seed and repair options
 
 # data definitions
 MUTATION_RATE = 0.01  # given to us
@@ -41,41 +62,46 @@ ACTIVITIES = {  # dictionary of activities and preferences
     "SLA451":  {"enrollment": 100, "preferred": ["Tyler", "Singer", "Shaw"], "others": ["Zeldin", "Uther", "Richards", "Banks"]}
 }
 
+TABLES = FitnessTables(ROOMS, TIME_SLOTS, FACILITATORS, ACTIVITIES, "minheap")  # index tables and precomputed scores
+BUILT_IN_TABLES = TABLES  # what compute_fitness's rules are written for
+# the dictionaries above are the built-in instance, --instance swaps in one compiled from a file (see use_instance)
+
 # classes
-class ActivityAssignment:
-    def __init__(self, room, time, facilitator):  # constructor for activity assignments, initializes
-        self.room = room
-        self.time = time
-        self.facilitator = facilitator
+class ActivityAssignment(namedtuple("ActivityAssignment", ["room", "time", "facilitator"])):  # read-only, a tuple
+    __slots__ = ()
 
     def __repr__(self):  # used for printing
         return f"{self.room} @ {self.time} with {self.facilitator}"
 
 class Schedule:
-    def __init__(self):
-        self.assignments = {}  # maps names to assignments
+    def __init__(self, genome=None):
+        self.genome = new_genome(TABLES) if genome is None else genome  # room/time/facilitator indexes, 3 per activity
         self.fitness = 0.0  # fitness score of schedule
 
+    @property
+    def assignments(self):  # read-only view decoded from the genome on every access, changes go through the genome
+        rows = decode_genome(TABLES, self.genome)
+        view = {activity: ActivityAssignment(*row) for activity, row in zip(TABLES.activity_names, rows)}
+        return MappingProxyType(view)  # writes raise instead of being silently lost
+
     def randomize(self):  # fills with random assignments
-        for activity in ACTIVITIES:
-            room = random.choice(list(ROOMS.keys()))
-            time = random.choice(TIME_SLOTS)
-            facilitator = random.choice(FACILITATORS)
-            self.assignments[activity] = ActivityAssignment(room, time, facilitator)  # stores them
+        random_genome(self.genome, TABLES)
 
 # fitness functions
 
 def time_to_int(time_str):  # converts time to int
     return int(time_str.split()[0])
 
-def score_special_cases(schedule):  # calculates bonuses for SLA100/191
+def score_special_cases(schedule, assignments=None):  # calculates bonuses for SLA100/191
     bonus = 0.0
     time_map = {}
     room_map = {}
+    if assignments is None:  # compute_fitness passes the view it already decoded
+        assignments = schedule.assignments
 
     for activity in ["SLA100A", "SLA100B", "SLA191A", "SLA191B"]:  # converts and stores room/time
-        if activity in schedule.assignments:
-            assignment = schedule.assignments[activity]
+        if activity in assignments:
+            assignment = assignments[activity]
             time_map[activity] = time_to_int(assignment.time)
             room_map[activity] = assignment.room
 
@@ -113,8 +139,11 @@ def score_special_cases(schedule):  # calculates bonuses for SLA100/191
 
 # calculates fitness for full schedule
 def compute_fitness(schedule): 
+    if TABLES is not BUILT_IN_TABLES:  # the rules below name the built-in rooms and activities, --instance scores by table
+        return float(batch_fitness(TABLES, stack_genomes(TABLES, [schedule.genome]))[0])
     fitness = 0.0
-    activity_list = list(schedule.assignments.items())  # converts to list
+    assignments = schedule.assignments  # decoded once per call
+    activity_list = list(assignments.items())  # converts to list
     facilitator_times = {f: [] for f in FACILITATORS}  # tracks facilitator usage by time
     room_times = {}  # tracks room/time conflicts
     facilitator_total_load = {f: 0 for f in FACILITATORS}  # facilitator total assignments
@@ -164,90 +193,235 @@ def compute_fitness(schedule):
         elif total in [1, 2] and facilitator != "Tyler":
             fitness -= 0.4  # too few, unless Tyler
 
-    fitness += score_special_cases(schedule)  # handle SLA special rules
+    fitness += score_special_cases(schedule, assignments)  # handle SLA special rules
     return fitness
 
-# creates child from 2 parents
-def crossover(parent1, parent2): 
-    child = Schedule()
-    for activity in ACTIVITIES:
-        if random.random() < 0.5:  # randomly selects from either parent
-            child.assignments[activity] = parent1.assignments[activity]
-        else:
-            child.assignments[activity] = parent2.assignments[activity]
-    return child
-
-# randomly mutates schedule
-def mutate(schedule): 
-    for activity in schedule.assignments:
-        assignment = schedule.assignments[activity]
-        if random.random() < MUTATION_RATE:
-            assignment.room = random.choice(list(ROOMS.keys()))
-        if random.random() < MUTATION_RATE:
-            assignment.time = random.choice(TIME_SLOTS)
-        if random.random() < MUTATION_RATE:
-            assignment.facilitator = random.choice(FACILITATORS)
-
-# runs a generation
-def run_generation(population): 
-    global best_overall
-    for _ in range(POPULATION_SIZE):
-        heapq.heappop(population)  # remove least fit
-        parents = random.sample(population, 2)  # pick 2 random parents
-        parent1 = parents[0][2]
-        parent2 = parents[1][2]
-        child = crossover(parent1, parent2)  # crossover
-        mutate(child)  # mutate
-        child.fitness = compute_fitness(child)  # score
-        if best_overall is None or child.fitness > best_overall.fitness: # this is part of what i was missing, if the child is better then update only if better
-            best_overall = copy.deepcopy(child)  # update best
-        heapq.heappush(population, (child.fitness, next(counter), child))  # insert
+# calculates fitness for many schedules in one call, same scores as compute_fitness
+def compute_population_fitness(schedules):
+    return batch_fitness(TABLES, stack_genomes(TABLES, (s.genome for s in schedules))).tolist()
+
+def use_instance(tables):  # schedules a different problem instance, compute_fitness follows it
+    global TABLES
+    TABLES = tables
 
 # population generation
 POPULATION_SIZE = 500
-counter = count()  # global counter for unique heap entries
-
-# creates initial population
-def generate_initial_population(): 
-    population = []
-    for _ in range(POPULATION_SIZE):
-        sched = Schedule()
-        sched.randomize()
-        sched.fitness = compute_fitness(sched)
-        heapq.heappush(population, (sched.fitness, next(counter), sched))
-    return population
-
-# main genetic algorithm
-def run_genetic_algorithm():
-    global best_overall # this is what I was missing
-    population = generate_initial_population()  # create starting pool
-    best_overall = max(population, key=lambda x: x[0])[2]  # initialize best
-    fitness_history = []  # tracks improvement
 
-    for gen in range(300):  # up to 300 generations
-        run_generation(population)
+def best_member(engine):  # the engine's best member as a Schedule
+    fitness, genome = engine.best()
+    best = Schedule(genome)
+    best.fitness = fitness
+    return best
+
+# checkpoints, the file layout is described in checkpoint.py
+def save_checkpoint(path, engine, fitness_history, generation, stopping=None):
+    population = engine.population
+    state = population.state()
+    blank = new_genome(TABLES)  # free slots have no genome
+    meta = dict(instance_meta(TABLES, "minheap"), generation=generation, next_age=state.pop("next_age"),
+                adaptive=engine.control and engine.control.state(),
+                evaluations=stopping.evaluations if stopping else 0)
+    arrays = dict(state, fitness_history=fitness_history,
+                  genomes=stack_genomes(TABLES, (blank if g is None else g for g in population.genome)))
+    for extra_meta, extra_arrays in (rng_arrays(), cache_arrays(engine.cache)):
+        meta.update(extra_meta)
+        arrays.update(extra_arrays)
+    write_snapshot(path, meta, arrays)
+
+def load_checkpoint(path, engine, stopping=None):  # restores the engine's population -> (fitness_history, generation)
+    meta, arrays = read_snapshot(path)
+    check_instance(meta, TABLES, "minheap")
+    genomes = split_block(TABLES, arrays["genomes"])
+    for slot in arrays["free"].tolist():
+        genomes[slot] = None
+    state = {name: arrays[name].tolist() for name in ("fitness", "age", "members", "worst", "best", "free")}
+    state["next_age"] = meta["next_age"]
+    engine.population = PopulationStore.from_state(state, genomes, [None] * len(genomes))
+    restore_rng(meta, arrays)  # restores random, the cache, the adaptive controller and the stopping rules
+    restore_cache(meta, arrays, engine.cache)
+    if engine.control is not None:
+        if meta.get("adaptive"):
+            engine.control.load_state(meta["adaptive"])
+        engine.mutation_rate, engine.crossover = engine.control.mutation_rate, engine.control.crossover
+    if stopping is not None:
+        stopping.resume(arrays["fitness_history"].tolist(), meta.get("evaluations", 0))
+    return arrays["fitness_history"].tolist(), meta["generation"]
+
+# main genetic algorithm, the steady-state loop itself is SteadyStateGA in ga_engines.py
+def run_genetic_algorithm(cache=None, run_metrics=NULL_METRICS, checkpoint_path=None, checkpoint_every=10, resume=None,
+                          results=NULL_WRITER, quiet=False, memetic=None, memetic_interval=10, memetic_top=5,
+                          memetic_steps=50, adaptive=False, stopping=None, warm=None, greedy_share=0.0, repair=False):
+    global best_overall # this is what I was missing
+    def report(decision):  # adaptive decisions go to the results stream and, unless quiet, the console
+        results.write(dict(decision))
+        if not quiet:
+            print(describe(decision))
+    control = AdaptiveControl(MUTATION_RATE, temperature=None, crossover="uniform", report=report) if adaptive else None
+    engine = SteadyStateGA(TABLES, POPULATION_SIZE, MUTATION_RATE, "uniform", random, cache, run_metrics,
+                           warm and warm.frozen, repair, memetic, memetic_interval, memetic_top, memetic_steps, control)
+    stopping = stopping or rules_from_args()  # default: <1% gain since generation 101, as before
+    if resume:  # pick up after the last saved generation, the rest of the run is the same as without the break
+        fitness_history, start = load_checkpoint(resume, engine, stopping)
+        print(f"Resuming from {resume} after generation {start}")
+    else:
+        if warm is not None:
+            print(f"Warm start: {len(warm.affected)} affected activities, "
+                  f"repaired schedule Fitness = {warm.repaired.fitness:.3f}")
+        stopping.evaluations += engine.seed(warm and warm.population(POPULATION_SIZE),  # create starting pool
+                                            greedy_share)
+        fitness_history = []  # tracks improvement
+        start = 0
+    best_overall = best_member(engine)  # initialize best
+    if start == 0:
+        results.write(improvement_record(TABLES, 0, best_overall.fitness, best_overall.genome))
+    best_written = best_overall.fitness
+
+    for gen in range(start, 300):  # up to 300 generations
+        run_metrics.start_generation(gen + 1)
+        evaluations = engine.step(gen + 1)  # a generation of children, the memetic stage and adaptive control
+        best_overall = best_member(engine)
+        run_metrics.end_generation(evaluations, best_fitness=best_overall.fitness,
+                                   diversity=1 - engine.population.duplicate_count() / len(engine.population),
+                                   cache=cache)
         fitness_history.append(best_overall.fitness) 
-        print(f"Generation {gen + 1}: Best Fitness = {best_overall.fitness:.3f}")  # display fitness
-
-        if gen > 100:  # early stop after 100 gens
-            if fitness_history[100] != 0:
-                improvement = (fitness_history[gen] - fitness_history[100]) / abs(fitness_history[100])
-                if improvement < 0.01:
-                    print("Stopping early: <1% improvement since generation 100")
-                    break
-            else:
-                print("Stopping early: fitness at generation 100 is zero (can't compare improvement)")
-                break
-
+        results.write(generation_record(gen + 1, best_overall.fitness, evaluations=evaluations))
+        if best_overall.fitness > best_written:  # only new bests carry the whole schedule
+            results.write(improvement_record(TABLES, gen + 1, best_overall.fitness, best_overall.genome))
+            best_written = best_overall.fitness
+        if not quiet:
+            print(f"Generation {gen + 1}: Best Fitness = {best_overall.fitness:.3f}")  # display fitness
+
+        reason = stopping.update(gen + 1, best_overall.fitness, best_overall.fitness, evaluations)
+        if reason:  # early stop, see stopping.py for the rules
+            print(f"Stopping early: {reason}")
+            break
+
+        if checkpoint_path and (gen + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint_path, engine, fitness_history, gen + 1, stopping)
+
+    run_metrics.close()
+    results.close()
+    if cache is not None:
+        print(cache_summary(cache))
+    write_best_schedule(best_overall)
+    if warm is not None:
+        print(warm.describe(best_overall.genome))
+    return best_overall
+
+# prints and saves the best schedule
+def write_best_schedule(schedule):
+    assignments = schedule.assignments
     print("\nBest Schedule:\n")
-    for activity, assignment in best_overall.assignments.items():
+    for activity, assignment in assignments.items():
         print(f"{activity}: {assignment}")
 
     with open("best_schedule.txt", "w") as f:  # save to file
         f.write("Best Schedule:\n\n")
-        for activity, assignment in best_overall.assignments.items():
+        for activity, assignment in assignments.items():
             f.write(f"{activity}: {assignment}\n")
 
+# island genetic algorithm, one heap population per core with periodic migration
+def run_island_model(n_islands, migration_interval, migrants, topology, workers=None, seed=None):
+    best_fitness, genome = run_islands(  # the same seed gives the same result whatever the number of workers
+        TABLES, n_islands=n_islands, population_size=POPULATION_SIZE, generations=300,
+        migration_interval=migration_interval, migrants=migrants, topology=topology,
+        mutation_rate=MUTATION_RATE, seed=seed, workers=workers
+    )
+    best = Schedule(genome)
+    best.fitness = best_fitness
+    write_best_schedule(best)
+    return best
+
+# multi-objective genetic algorithm, the whole Pareto front over the fitness terms in one run (see pareto.py)
+def run_pareto_model(front_path, results=NULL_WRITER, quiet=False, stopping=None):
+    genomes, objectives = run_nsga2(TABLES, POPULATION_SIZE, 300, MUTATION_RATE, "uniform", stopping=stopping,
+                                    results=results, report=None if quiet else print)
+    print("\nPareto Front:\n")
+    print(format_front(objectives))
+    export_front(TABLES, genomes, objectives, front_path)  # every schedule on the front
+    best = Schedule(block_genome(TABLES, genomes, 0))  # the front is sorted by weighted fitness
+    best.fitness = float(batch_fitness(TABLES, genomes[:1])[0])
+    write_best_schedule(best)
+    return best
+
+# command line options
+def parse_args():
+    parser = argparse.ArgumentParser(description="Schedules activities with a heap-based genetic algorithm.")
+    parser.add_argument("--instance", default=None, help="problem instance file (.json/.toml) or CSV folder")
+    parser.add_argument("--islands", type=int, default=0, help="run this many island populations in parallel")
+    parser.add_argument("--migration-interval", type=int, default=10, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=5, help="schedules each island sends per migration")
+    parser.add_argument("--topology", choices=["ring", "random"], default="ring", help="where migrants are sent")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per island)")
+    parser.add_argument("--cache-size", type=int, default=None, help="cache up to this many fitness scores")
+    parser.add_argument("--cache-mb", type=float, default=None, help="cache fitness scores in about this many MB")
+    parser.add_argument("--cache-policy", choices=sorted(POLICIES), default="lru", help="cache eviction policy")
+    add_metrics_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_output_arguments(parser)
+    add_memetic_arguments(parser)
+    add_adaptive_arguments(parser)
+    add_stopping_arguments(parser)
+    add_pareto_arguments(parser)
+    add_warm_start_arguments(parser)
+    add_seeding_arguments(parser)
+    add_config_arguments(parser)
+    args = parse_with_config(parser)
+    if args.islands and (args.checkpoint or args.resume or args.results or args.memetic or args.adaptive
+                         or args.stagnation or args.max_evaluations or args.max_seconds or args.target is not None):
+        parser.error("checkpoints, streamed results, the memetic stage, adaptive control and stopping rules need "
+                     "the single population run")
+    if args.pareto and (args.islands or args.checkpoint or args.resume or args.memetic or args.adaptive
+                        or args.cache_size or args.cache_mb):
+        parser.error("--pareto has its own loop, it does not take islands, checkpoints, the memetic stage, adaptive "
+                     "control or a fitness cache")
+    if (args.warm_start or args.freeze) and (args.islands or args.pareto):
+        parser.error("--warm-start needs the single population run")
+    if (args.greedy_share or args.repair) and (args.islands or args.pareto):
+        parser.error("--greedy-share and --repair need the single population run")
+    if args.migrants < 0:
+        parser.error("--migrants cannot be negative")
+    if not 0 <= args.greedy_share <= 1:
+        parser.error("--greedy-share is a share between 0 and 1")
+    if args.freeze and not args.warm_start:
+        parser.error("--freeze needs --warm-start")
+    if args.greedy_share and args.warm_start:  # a warm start fills the whole population
+        parser.error("--greedy-share cannot be combined with --warm-start")
+    check_output_arguments(parser, args)
+    check_pareto_arguments(parser, args)
+    return args
+
 # runs program
 if __name__ == "__main__": 
-    run_genetic_algorithm()
+    args = parse_args()
+    print(f"Seed: {args.seed}")  # --seed with this value repeats the run
+    random.seed(args.seed)
+    if args.instance_diff:  # the instance as it is now, the previous schedule was made before the diff
+        use_instance(changed_instance(args.instance, args.instance_diff, "minheap"))
+    elif args.instance:
+        use_instance(load_instance(args.instance, "minheap"))
+    if args.islands:
+        best = run_island_model(args.islands, args.migration_interval, args.migrants, args.topology, args.workers,
+                                args.seed)
+    elif args.pareto:  # the gain rules follow weighted fitness, so they only apply when asked for
+        best = run_pareto_model(args.front, writer_from_args(args.results), args.quiet,
+                                rules_from_args(args.stagnation, args.rel_tol, args.abs_tol, args.max_evaluations,
+                                                args.max_seconds, args.target, since_generation=None))
+    else:
+        cache = None
+        if args.cache_size or args.cache_mb:
+            cache = FitnessCache(args.cache_size, args.cache_mb, args.cache_policy)
+        warm = None
+        if args.warm_start:
+            warm = warm_start_from_args(TABLES, args.warm_start, args.instance_diff, args.freeze, args.repaired_share,
+                                        args.perturb)
+        best = run_genetic_algorithm(cache, metrics_from_args(args.metrics_jsonl, args.metrics_csv, args.profile,
+                                                             args.profile_output),
+                                     args.checkpoint or args.resume, args.checkpoint_every, args.resume,
+                                     writer_from_args(args.results), args.quiet, args.memetic, args.memetic_interval,
+                                     args.memetic_top, args.memetic_steps, args.adaptive,
+                                     rules_from_args(args.stagnation or (warm and STAGNATION), args.rel_tol,
+                                                     args.abs_tol, args.max_evaluations, args.max_seconds,
+                                                     args.target), warm, args.greedy_share, args.repair)
+    if args.export:
+        export_timetable(TABLES, best.genome, args.export, best.fitness)
@@ -6,6 +6,30 @@
 import random # used for generating random selections
 import math # used for the calculations in softmax
 from collections import defaultdict, Counter # used for counting and grouping
+import argparse # used for the command line options
+import numpy as np # used for population blocks
+from fitness_engine import FitnessTables, batch_fitness # used for batch scoring
+from genome import new_genome, encode_genome, decode_genome, stack_genomes, block_genome # used for compact schedules
+from operators import (random_genome, uniform_crossover, single_point_crossover,
+                       mutate_genome) # used for the single schedule operators
+from ga_engines import GenerationalGA # used for the generational GA loop
+from evaluators import EVALUATORS, make_evaluator, speedup_report, print_speedup_report # used for scoring backends
+from selection import SELECTION_SCHEMES # used for the selection choices
+from fitness_cache import FitnessCache, POLICIES, cache_summary # used for skipping already scored schedules
+from instance_loader import load_instance # used for problem instances stored in files
+from instrumentation import NULL_METRICS, add_metrics_arguments, metrics_from_args, genome_diversity # used for metrics
+from checkpoint import (write_snapshot, read_snapshot, rng_arrays, restore_rng, cache_arrays, restore_cache,
+                        instance_meta, check_instance, add_checkpoint_arguments) # used for saving and resuming long runs
+from results import (NULL_WRITER, add_output_arguments, check_output_arguments, writer_from_args, generation_record,
+                     improvement_record, export_timetable) # used for streamed results and the timetable export
+from local_search import add_memetic_arguments # used for the memetic stage options
+from adaptive import AdaptiveControl, add_adaptive_arguments, describe # used for adaptive control
+from stopping import add_stopping_arguments, rules_from_args # used for deciding when a run is done
+from run_config import add_config_arguments, parse_with_config # used for seeded, repeatable runs
+from pareto import run_nsga2, format_front, export_front, add_pareto_arguments, check_pareto_arguments # used for the multi-objective mode
+from warm_start import (STAGNATION, add_warm_start_arguments, changed_instance,
+                        warm_start_from_args) # used for re-optimizing a previous schedule after the instance changed
+from seeding import add_seeding_arguments # used for the greedy seed and repair options
 
 # data definitions
 
@@ -42,26 +66,34 @@ ACTIVITIES = [ # list of activities with expected enrollment and facilitator pre
     {"name": "SLA451",  "expected": 100, "preferred": ["Tyler", "Singer", "Shaw"], "other": ["Zeldin", "Uther", "Richards", "Banks"]}
 ]
 
+TABLES = FitnessTables(ROOMS, TIME_SLOTS, FACILITATORS, ACTIVITIES, "probdist") # index tables and precomputed scores
+BUILT_IN_TABLES = TABLES # what compute_fitness's rules are written for
+# the data above is the built-in instance, --instance swaps in one compiled from a file
+
+def use_instance(tables): # schedules a different problem instance, compute_fitness follows it
+    global TABLES
+    TABLES = tables
+
 # random schedule generation
 
+# a schedule is a compact genome: room, time and facilitator indexes for each activity in TABLES.activity_names order
+
 def generate_random_schedule(): # generates random schedule for all activities
-    schedule = [] # list to hold schedule entries
-    for activity in ACTIVITIES: # loop through each activity
-        entry = { 
-            "activity": activity["name"],
-            "room": random.choice(list(ROOMS.keys())), # random room choice
-            "time": random.choice(TIME_SLOTS), # random time slot
-            "facilitator": random.choice(FACILITATORS) # random facilitator
-        }
-        schedule.append(entry) # adds entry to schedule
-    return schedule
-
-def generate_initial_population(n): # generates initial population of random schedules
-    return [generate_random_schedule() for _ in range(n)] # list of n schedules
+    return random_genome(new_genome(TABLES), TABLES) # random room, time slot and facilitator per activity
+
+def schedule_entries(schedule): # readable form, a list of activity/room/time/facilitator dicts
+    return [
+        {"activity": activity, "room": room, "time": time, "facilitator": facilitator}
+        for activity, (room, time, facilitator) in zip(TABLES.activity_names, decode_genome(TABLES, schedule))
+    ]
 
 # fitness function
 
-def compute_fitness(schedule): # evaluates fitness score of given schedule
+def compute_fitness(schedule): # evaluates fitness score of given schedule (readable form from schedule_entries)
+    if TABLES is not BUILT_IN_TABLES: # the rules below read the built-in lists, --instance scores by table
+        rows = {entry["activity"]: (entry["room"], entry["time"], entry["facilitator"]) for entry in schedule}
+        genome = encode_genome(TABLES, (rows[activity] for activity in TABLES.activity_names))
+        return float(batch_fitness(TABLES, stack_genomes(TABLES, [genome]))[0])
     score = 0.0 # initializes score to 0
     room_time_usage = defaultdict(list) # tracks room usage by time slot
     facilitator_times = defaultdict(list) # tracks facilitator's scheduled time
@@ -162,6 +194,16 @@ def compute_fitness(schedule): # evaluates fitness score of given schedule
 
     return score
 
+def compute_population_fitness(population, evaluator=None, cache=None): # scores every schedule in one call, same scores as compute_fitness
+    block = population if isinstance(population, np.ndarray) else stack_genomes(TABLES, population) # block or genomes
+    if evaluator is None:
+        score = lambda b: batch_fitness(TABLES, b)
+    else:
+        score = evaluator.evaluate # pooled backends give the same scores in the same order
+    if cache is None:
+        return score(block).tolist()
+    return cache.score_block(block, score).tolist() # only schedules not seen before are scored
+
 # softmax selection
 
 def softmax(fitness_scores): # applies softmax to scores
@@ -172,69 +214,114 @@ def softmax(fitness_scores): # applies softmax to scores
 
 # genetic operators
 
-def select_parents(population, fitness_scores): # selects 2 parents based on softmax probabilities
-    probabilities = softmax(fitness_scores)
-    parents = random.choices(population, weights=probabilities, k=2)
-    return parents
+def select_parents(population, selector): # selects 2 parents, selector is built once per generation
+    return population[selector.sample()], population[selector.sample()]
 
-def crossover(parent1, parent2): # single-point crossover for two schedules
-    point = random.randint(1, len(parent1) - 1)
-    child1 = parent1[:point] + parent2[point:]
-    child2 = parent2[:point] + parent1[point:]
-    return child1, child2
+def crossover(parent1, parent2, kind="single_point"): # single-point crossover for two schedules
+    if kind == "uniform": # each activity from either parent, chosen by the adaptive controller when diversity drops
+        return uniform_crossover(parent1, parent2), uniform_crossover(parent2, parent1)
+    return single_point_crossover(parent1, parent2) # cut between activities, children never share data with parents
 
 def mutate(schedule, mutation_rate=0.01): # applies random mutations to a schedule
-    for entry in schedule:
-        if random.random() < mutation_rate:
-            entry["room"] = random.choice(list(ROOMS.keys()))
-        if random.random() < mutation_rate:
-            entry["time"] = random.choice(TIME_SLOTS)
-        if random.random() < mutation_rate:
-            entry["facilitator"] = random.choice(FACILITATORS)
-    return schedule
-
-# main genetic algorithm loop
-
-def run_genetic_algorithm(generations=200, population_size=500): # creates the loop
-    population = generate_initial_population(population_size) # initial population
-    fitness_history = [] # list to track average fitness
-    mutation_rate = 0.01 # starting mutation rate
-
-    for gen in range(generations): # loop over generations
-        fitness_scores = [compute_fitness(schedule) for schedule in population] # scores each schedule
+    return mutate_genome(schedule, TABLES, mutation_rate)
+
+# checkpoints, the file layout is described in checkpoint.py
+
+def save_checkpoint(path, engine, fitness_history, generation, stopping=None):
+    meta = dict(instance_meta(TABLES, "probdist"), generation=generation, mutation_rate=engine.mutation_rate,
+                adaptive=engine.control and engine.control.state(), evaluations=stopping.evaluations if stopping else 0,
+                repaired=engine.repaired) # repair moves on the saved children, counted with the generation that scores them
+    arrays = {"genomes": engine.population, "fitness_history": fitness_history}
+    for extra_meta, extra_arrays in (rng_arrays(), cache_arrays(engine.cache)):
+        meta.update(extra_meta)
+        arrays.update(extra_arrays)
+    write_snapshot(path, meta, arrays)
+
+def load_checkpoint(path, engine, stopping=None): # restores the engine -> (fitness_history, generation)
+    meta, arrays = read_snapshot(path)
+    check_instance(meta, TABLES, "probdist")
+    restore_rng(meta, arrays) # the next generation draws the same numbers as the original run
+    restore_cache(meta, arrays, engine.cache)
+    fitness_history = arrays["fitness_history"].tolist()
+    engine.population = np.array(arrays["genomes"]) # copied off the mapped file, the run writes to it
+    engine.mutation_rate, engine.repaired = meta["mutation_rate"], meta.get("repaired", 0)
+    engine.previous_average = fitness_history[-1] if fitness_history else None # for the halving rule
+    if engine.control is not None:
+        if meta.get("adaptive"):
+            engine.control.load_state(meta["adaptive"])
+        engine.temperature, engine.crossover = engine.control.temperature, engine.control.crossover
+    if stopping is not None:
+        stopping.resume(fitness_history, meta.get("evaluations", 0))
+    return fitness_history, meta["generation"]
+
+# main genetic algorithm loop, the generational loop itself is GenerationalGA in ga_engines.py
+
+def run_genetic_algorithm(generations=200, population_size=500, evaluator=None,
+                          selection="softmax", temperature=1.0, tournament_size=2, cache=None,
+                          metrics=NULL_METRICS, checkpoint_path=None, checkpoint_every=10, resume=None,
+                          results=NULL_WRITER, quiet=False, memetic=None, memetic_interval=10, memetic_top=5,
+                          memetic_steps=50, adaptive=False, stopping=None, warm=None, greedy_share=0.0,
+                          repair=False): # creates the loop
+    def report(decision): # adaptive decisions go to the results stream and, unless quiet, the console
+        results.write(dict(decision))
+        if not quiet:
+            print(describe(decision))
+    control = AdaptiveControl(0.01, temperature, "single_point", report=report) if adaptive else None
+    engine = GenerationalGA(TABLES, population_size, 0.01, selection, temperature, tournament_size, "single_point",
+                            random, evaluator, cache, metrics, warm and warm.frozen, repair, memetic, memetic_interval,
+                            memetic_top, memetic_steps, control) # starting mutation rate 0.01
+    stopping = stopping or rules_from_args() # default: <1% gain in average fitness since generation 101, as before
+    if resume: # continue after the last saved generation
+        fitness_history, start = load_checkpoint(resume, engine, stopping)
+        print(f"Resuming from {resume} after generation {start}")
+    elif warm is not None: # repaired and perturbed copies of a previous schedule, see warm_start.py
+        print(f"Warm start: {len(warm.affected)} affected activities, "
+              f"repaired schedule Fitness = {warm.repaired.fitness:.3f}")
+        engine.seed(warm.population(population_size))
+        fitness_history = []
+        start = 0
+    else:
+        engine.seed(greedy_share=greedy_share) # initial population
+        fitness_history = [] # list to track average fitness
+        start = 0
+    best_written = float("-inf") # best score streamed so far, a resumed run streams its first best again
+
+    for gen in range(start, generations): # loop over generations
+        metrics.start_generation(gen + 1)
+        fitness_scores, evaluations = engine.evaluate(gen + 1) # scores each schedule, then the memetic stage if due
         avg_fitness = sum(fitness_scores) / len(fitness_scores) # averages score
         fitness_history.append(avg_fitness) # update list
-
-        print(f"Generation {gen + 1}: Avg Fitness = {avg_fitness:.4f}") # displays current generation's fitness
-
-        if gen > 100:  # checks for early stopping condition
-            if fitness_history[100] != 0:
-                improvement = (fitness_history[gen] - fitness_history[100]) / fitness_history[100]  # calculate % improvement
-                if improvement < 0.01:
-                    print("Stopping early: <1% improvement since generation 100")
-                    break  # stop early if improvement is less than 1%
-            else:
-                print("Stopping early: fitness at generation 100 is zero (can't compare improvement)")
-                break
-
-
-        if gen > 0 and fitness_history[gen] > fitness_history[gen - 1]: 
-            mutation_rate = max(0.0001, mutation_rate / 2) # cut mutation rate in half if improved last generation
-
-        new_population = [] # create list for new population
-        while len(new_population) < population_size:
-            parent1, parent2 = select_parents(population, fitness_scores) # selects 2 parents using softmax
-            child1, child2 = crossover(parent1, parent2) # generates children using crossover
-            new_population.extend([
-                mutate(child1, mutation_rate), # mutate and add child 1
-                mutate(child2, mutation_rate) # mutate and add child 2
-            ])
-        population = new_population[:population_size] # replace population
-
-    final_scores = [compute_fitness(s) for s in population] # recompute fitness scores
+        best_fitness = max(fitness_scores)
+        results.write(generation_record(gen + 1, best_fitness, avg_fitness, evaluations))
+        if best_fitness > best_written: # only new bests carry the whole schedule
+            results.write(improvement_record(TABLES, gen + 1, best_fitness,
+                                             block_genome(TABLES, engine.population, fitness_scores.index(best_fitness))))
+            best_written = best_fitness
+
+        if not quiet:
+            print(f"Generation {gen + 1}: Avg Fitness = {avg_fitness:.4f}") # displays current generation's fitness
+
+        reason = stopping.update(gen + 1, avg_fitness, best_fitness, evaluations) # checks for early stopping
+        if reason:
+            print(f"Stopping early: {reason}")
+            break
+
+        engine.breed(gen + 1, fitness_scores) # next generation, mutation rate halved when the average improved
+        if metrics.enabled: # diversity needs a pass over the population, skip it when nobody is listening
+            metrics.end_generation(evaluations, best_fitness=best_fitness, avg_fitness=avg_fitness,
+                                   diversity=genome_diversity(engine.population), cache=cache)
+        if checkpoint_path and (gen + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint_path, engine, fitness_history, gen + 1, stopping)
+
+    metrics.close()
+    results.close()
+    final_scores = engine.score() # recompute fitness scores
     best_index = final_scores.index(max(final_scores)) # find the index of the best schedule
-    best_schedule = population[best_index] # retrieve best schedule
+    best = block_genome(TABLES, engine.population, best_index) # a copy, the block is reused
+    best_schedule = schedule_entries(best) # retrieve best schedule
     
+    if cache is not None:
+        print(cache_summary(cache)) # shows how many schedules were repeats
     print("\nBest Schedule (Fitness = {:.2f}):".format(final_scores[best_index]))
     for entry in best_schedule:
         print(entry) # prints best schedule
@@ -242,8 +329,108 @@ def run_genetic_algorithm(generations=200, population_size=500): # creates the l
     with open("final_schedule.txt", "w") as f: # opens file
         for entry in best_schedule:
             f.write(str(entry) + "\n") # writes to file
+    if warm is not None:
+        print(warm.describe(best))
+    return best, final_scores[best_index]
+
+# multi-objective genetic algorithm, the whole Pareto front over the fitness terms in one run (see pareto.py)
+
+def run_pareto_model(front_path, generations=200, population_size=500, results=NULL_WRITER, quiet=False,
+                     stopping=None): # -> (best weighted genome, its fitness)
+    genomes, objectives = run_nsga2(TABLES, population_size, generations, 0.01, "single_point", stopping=stopping,
+                                    results=results, report=None if quiet else print)
+    print("\nPareto Front:\n")
+    print(format_front(objectives))
+    export_front(TABLES, genomes, objectives, front_path) # every schedule on the front
+    best = block_genome(TABLES, genomes, 0) # the front is sorted by weighted fitness
+    with open("final_schedule.txt", "w") as f:
+        for entry in schedule_entries(best):
+            f.write(str(entry) + "\n")
+    return best, float(batch_fitness(TABLES, genomes[:1])[0])
 
 # entry point
 
+def parse_args(): # command line options
+    parser = argparse.ArgumentParser(description="Schedules activities with a softmax genetic algorithm.")
+    parser.add_argument("--instance", default=None, help="problem instance file (.json/.toml) or CSV folder")
+    parser.add_argument("--generations", type=int, default=200, help="maximum number of generations")
+    parser.add_argument("--population-size", type=int, default=500, help="schedules per generation")
+    parser.add_argument("--evaluator", choices=sorted(EVALUATORS), default="serial", help="fitness scoring backend")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads/processes for pooled backends")
+    parser.add_argument("--selection", choices=SELECTION_SCHEMES, default="softmax", help="parent selection scheme")
+    parser.add_argument("--temperature", type=float, default=1.0, help="softmax temperature, lower is greedier")
+    parser.add_argument("--tournament-size", type=int, default=2, help="members per tournament")
+    parser.add_argument("--cache-size", type=int, default=None, help="cache up to this many fitness scores")
+    parser.add_argument("--cache-mb", type=float, default=None, help="cache fitness scores in about this many MB")
+    parser.add_argument("--cache-policy", choices=sorted(POLICIES), default="lru", help="cache eviction policy")
+    parser.add_argument("--speedup-report", action="store_true", help="time every backend on this host and exit")
+    add_metrics_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_output_arguments(parser)
+    add_memetic_arguments(parser)
+    add_adaptive_arguments(parser)
+    add_stopping_arguments(parser)
+    add_pareto_arguments(parser)
+    add_warm_start_arguments(parser)
+    add_seeding_arguments(parser)
+    add_config_arguments(parser)
+    args = parse_with_config(parser)
+    if args.pareto and (args.checkpoint or args.resume or args.memetic or args.adaptive or args.cache_size
+                        or args.cache_mb or args.evaluator != "serial"):
+        parser.error("--pareto has its own loop, it does not take checkpoints, the memetic stage, adaptive control, "
+                     "a fitness cache or a pooled evaluator")
+    if (args.warm_start or args.freeze) and args.pareto:
+        parser.error("--warm-start needs the single-objective run")
+    if (args.greedy_share or args.repair) and args.pareto:
+        parser.error("--greedy-share and --repair need the single-objective run")
+    if not 0 <= args.greedy_share <= 1:
+        parser.error("--greedy-share is a share between 0 and 1")
+    if args.freeze and not args.warm_start:
+        parser.error("--freeze needs --warm-start")
+    if args.greedy_share and args.warm_start:  # a warm start fills the whole population
+        parser.error("--greedy-share cannot be combined with --warm-start")
+    check_output_arguments(parser, args)
+    check_pareto_arguments(parser, args)
+    return args
+
 if __name__ == "__main__":
-    run_genetic_algorithm() # runs program
+    args = parse_args()
+    print(f"Seed: {args.seed}") # --seed with this value repeats the run, whichever --evaluator scores it
+    random.seed(args.seed)
+    if args.instance_diff: # the instance as it is now, the previous schedule was made before the diff
+        use_instance(changed_instance(args.instance, args.instance_diff, "probdist"))
+    elif args.instance:
+        use_instance(load_instance(args.instance, "probdist"))
+    if args.speedup_report:
+        print_speedup_report(speedup_report(TABLES, workers=args.workers)) # pick a backend per host
+    elif args.pareto: # the gain rules follow weighted fitness, so they only apply when asked for
+        best, best_fitness = run_pareto_model(
+            args.front, args.generations, args.population_size, writer_from_args(args.results), args.quiet,
+            rules_from_args(args.stagnation, args.rel_tol, args.abs_tol, args.max_evaluations, args.max_seconds,
+                            args.target, since_generation=None))
+        if args.export:
+            export_timetable(TABLES, best, args.export, best_fitness)
+    else:
+        evaluator = make_evaluator(args.evaluator, TABLES, workers=args.workers)
+        cache = None
+        if args.cache_size or args.cache_mb:
+            cache = FitnessCache(args.cache_size, args.cache_mb, args.cache_policy)
+        warm = None
+        if args.warm_start:
+            warm = warm_start_from_args(TABLES, args.warm_start, args.instance_diff, args.freeze, args.repaired_share,
+                                        args.perturb)
+        try:
+            best, best_fitness = run_genetic_algorithm(
+                args.generations, args.population_size, evaluator, args.selection, args.temperature,
+                args.tournament_size, cache,
+                metrics_from_args(args.metrics_jsonl, args.metrics_csv, args.profile, args.profile_output),
+                args.checkpoint or args.resume, args.checkpoint_every, args.resume,
+                writer_from_args(args.results), args.quiet, args.memetic, args.memetic_interval, args.memetic_top,
+                args.memetic_steps, args.adaptive,
+                rules_from_args(args.stagnation or (warm and STAGNATION), args.rel_tol, args.abs_tol,
+                                args.max_evaluations, args.max_seconds, args.target), warm, args.greedy_share,
+                args.repair) # runs program
+        finally:
+            evaluator.close()
+        if args.export:
+            export_timetable(TABLES, best, args.export, best_fitness)
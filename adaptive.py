@@ -0,0 +1,111 @@
+# Dylan Orpin
+# Assignment 2 (adaptive operator control)
+
+# imports
+import numpy as np  # used for the diversity measure
+from local_search import EPSILON  # smaller gains are rounding, not improvements
+
+# population statistics
+
+def activity_entropy(block, sizes):  # mean normalised entropy of every activity's room, time and facilitator
+    n, n_activities, _ = block.shape  # 1 = assignments spread evenly, 0 = every schedule agrees
+    if n < 2:
+        return 0.0
+    totals = []
+    for field, size in enumerate(sizes):
+        if size < 2:
+            continue
+        cells = block[:, :, field].astype(np.intp) + np.arange(n_activities)[None, :] * size
+        share = np.bincount(cells.ravel(), minlength=n_activities * size).reshape(n_activities, size) / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entropy = -np.where(share > 0, share * np.log(share), 0.0).sum(axis=1)
+        totals.append(entropy.mean() / np.log(min(size, n)))
+    return float(np.mean(totals)) if totals else 0.0
+
+# the controller, fed once per generation, changes the knobs the GA loops read
+#   low diversity          -> more mutation, uniform crossover, flatter selection (higher temperature)
+#   improving, diverse     -> less mutation, greedier selection (crossover stays, uniform keeps mixing best here)
+#   no new best for a while -> replace a share of the population with random immigrants, growing while it lasts
+# every change is reported as {"kind": "adaptation", "generation", "parameter", "old", "new", "reason"}
+
+class AdaptiveControl:
+    def __init__(self, mutation_rate=0.01, temperature=1.0, crossover="uniform", min_mutation=0.001, max_mutation=0.25,
+                 min_temperature=0.1, max_temperature=10.0, window=5, low_diversity=0.25, high_diversity=0.6,
+                 max_duplicates=0.2, immigrant_share=0.1, report=None):
+        self.mutation_rate = mutation_rate
+        self.temperature = temperature
+        self.crossover = crossover
+        self.min_mutation, self.max_mutation = min_mutation, max_mutation
+        self.min_temperature, self.max_temperature = min_temperature, max_temperature
+        self.window = window
+        self.low_diversity, self.high_diversity = low_diversity, high_diversity
+        self.max_duplicates = max_duplicates
+        self.immigrant_share = immigrant_share
+        self.report = report
+        self.history = []  # best fitness per generation
+        self.best = float("-inf")
+        self.stalled = 0  # generations since the best last improved
+        self.decisions = []
+
+    def _log(self, generation, parameter, old, new, reason):
+        decision = {"kind": "adaptation", "generation": generation, "parameter": parameter, "old": old, "new": new,
+                    "reason": reason}
+        self.decisions.append(decision)
+        if self.report is not None:
+            self.report(decision)
+
+    def _set(self, generation, parameter, value, reason):
+        old = getattr(self, parameter)
+        if value != old:
+            setattr(self, parameter, value)
+            self._log(generation, parameter, old, value, reason)
+
+    def observe(self, generation, best_fitness, entropy, duplicates):  # duplicates is a share -> share to replace
+        self.history.append(best_fitness)
+        if best_fitness > self.best + EPSILON:
+            self.best = best_fitness
+            self.stalled = 0
+        else:
+            self.stalled += 1
+        improving = False
+        if len(self.history) > self.window:  # gain over the window, scaled so negative fitness works too
+            before = self.history[-self.window - 1]
+            improving = best_fitness - before > 0.01 * (abs(before) + 1)
+
+        if entropy < self.low_diversity or duplicates > self.max_duplicates:
+            reason = f"diversity low (entropy {entropy:.3f}, duplicates {duplicates:.1%})"
+            self._set(generation, "mutation_rate", min(self.max_mutation, self.mutation_rate * 1.5), reason)
+            self._set(generation, "crossover", "uniform", reason)
+            if self.temperature is not None:  # None when the loop has no selection temperature
+                self._set(generation, "temperature", min(self.max_temperature, self.temperature * 1.5), reason)
+        elif improving and entropy > self.high_diversity:
+            reason = f"improving with diversity to spare (entropy {entropy:.3f})"
+            self._set(generation, "mutation_rate", max(self.min_mutation, self.mutation_rate * 0.8), reason)
+            if self.temperature is not None:
+                self._set(generation, "temperature", max(self.min_temperature, self.temperature * 0.9), reason)
+
+        if self.stalled and self.stalled % self.window == 0:
+            share = min(0.5, self.immigrant_share * (self.stalled // self.window))
+            self._log(generation, "immigrants", 0.0, share, f"no new best for {self.stalled} generations")
+            return share
+        return 0.0
+
+    # checkpoints
+
+    def state(self):
+        return {"mutation_rate": self.mutation_rate, "temperature": self.temperature, "crossover": self.crossover,
+                "history": self.history[-self.window - 1:], "best": self.best, "stalled": self.stalled}
+
+    def load_state(self, state):
+        self.mutation_rate, self.temperature = state["mutation_rate"], state["temperature"]
+        self.crossover, self.best, self.stalled = state["crossover"], state["best"], state["stalled"]
+        self.history = list(state["history"])
+
+def add_adaptive_arguments(parser):  # the same option for both scripts
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adapt mutation rate, crossover, selection temperature and immigrants to diversity")
+
+def describe(decision):  # one console line per decision
+    return (f"  adapt {decision['parameter']}: {decision['old']:g} -> {decision['new']:g} ({decision['reason']})"
+            if decision["parameter"] != "crossover" else
+            f"  adapt crossover: {decision['old']} -> {decision['new']} ({decision['reason']})")
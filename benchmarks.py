@@ -0,0 +1,238 @@
+# Dylan Orpin
+# Assignment 2 (benchmarks)
+
+# runs from the command line, for example
+#   python benchmarks.py --output bench.json
+#   python benchmarks.py --full --output bench.json --compare old_bench.json
+
+# imports
+import argparse  # used for the command line options
+import importlib.util  # used for loading the two scripts, their file names have spaces
+import json  # used for the machine-readable results
+import os  # used for paths
+import platform  # used for the run metadata
+import random  # used for seeding the scripts
+import subprocess  # used for the git revision
+import sys  # used for the run metadata
+import time  # used for timing
+import numpy as np  # used for random populations
+from fitness_engine import batch_fitness  # used for the batch scoring cases
+from delta_fitness import DeltaTables, IncrementalFitness  # used for the incremental scoring cases
+from operators import random_block, crossover_masks, crossover_block, mutate_block  # used for populations and operators
+from instance_loader import compile_instance, synthetic_instance  # used for the larger instances
+from selection import build_selector  # used for the selection cases
+from ga_engines import SteadyStateGA, GenerationalGA  # used for the generation cases
+
+# data definitions
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = {"heap": "Assignment2 - UPDATED.py", "probdist": "Assignment2 - prob dist.py"}
+QUICK_POPULATIONS = [500, 5_000, 50_000]
+FULL_POPULATIONS = [500, 5_000, 50_000, 500_000, 1_000_000]
+QUICK_ACTIVITIES = [11, 100, 1_000]
+FULL_ACTIVITIES = [11, 100, 1_000, 10_000]
+MAX_ASSIGNMENTS = 50_000_000  # skips population x activity combinations bigger than this
+MAX_GENERATION_ASSIGNMENTS = 5_000_000  # generations breed in Python, so their cases get a smaller limit
+
+def load_script(engine):  # imports one of the scripts as a module
+    spec = importlib.util.spec_from_file_location(f"ga_{engine}", os.path.join(HERE, SCRIPTS[engine]))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# timing
+
+def measure(function, min_time=0.2, repeats=3):  # best seconds per call over `repeats` rounds
+    calls = 1
+    while True:  # find a call count that runs for at least min_time
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or calls >= 1 << 20:
+            break
+        calls *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    best = elapsed / calls
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+class Recorder:
+    def __init__(self, min_time, repeats, quiet=False):
+        self.results = []
+        self.min_time = min_time
+        self.repeats = repeats
+        self.quiet = quiet
+
+    def run(self, name, engine, function, activities, population=None, items=1):  # items = units of work per call
+        seconds = measure(function, self.min_time, self.repeats)
+        result = {"name": name, "engine": engine, "activities": activities, "population": population,
+                  "seconds": seconds, "items_per_second": items / seconds if seconds else None}
+        self.results.append(result)
+        if not self.quiet:
+            size = f"pop={population}" if population else ""
+            print(f"{engine:<9}{name:<30}A={activities:<7}{size:<14}{seconds * 1e3:>12.4f} ms"
+                  f"{result['items_per_second'] or 0:>16.0f} /s")
+        return result
+
+# benchmark groups
+
+def bench_legacy_functions(recorder, heap, probdist, rng):  # the scripts' functions on the built-in instance
+    n = len(heap.TABLES.activity_names)
+    a = heap.Schedule()
+    a.randomize()
+    recorder.run("compute_fitness", "heap", lambda: heap.compute_fitness(a), n)
+    recorder.run("score_special_cases", "heap", lambda: heap.score_special_cases(a), n)
+    size = heap.POPULATION_SIZE  # the heap script breeds and mutates whole blocks, one generation's worth per call
+    parents = random_block(heap.TABLES, size, rng)
+    first, second = rng.integers(0, size, size), rng.integers(0, size, size)
+    masks = crossover_masks(size, n, "uniform", rng)
+    children = np.empty_like(parents)
+    recorder.run("crossover_block", "heap", lambda: crossover_block(parents, first, second, masks, children),
+                 n, size, size)
+    recorder.run("mutate_block", "heap", lambda: mutate_block(children, heap.TABLES, heap.MUTATION_RATE, rng),
+                 n, size, size)
+
+    x, y = probdist.generate_random_schedule(), probdist.generate_random_schedule()
+    entries = probdist.schedule_entries(x)
+    recorder.run("compute_fitness", "probdist", lambda: probdist.compute_fitness(entries), n)
+    recorder.run("crossover", "probdist", lambda: probdist.crossover(x, y), n)
+    recorder.run("mutate", "probdist", lambda: probdist.mutate(x[:], 0.01), n)
+
+def bench_selection(recorder, probdist, populations, rng):
+    for size in populations:
+        scores = rng.normal(5, 2, size).tolist()
+        population = list(range(size))
+        recorder.run("softmax", "probdist", lambda: probdist.softmax(scores), 11, size, size)
+        for scheme in ("softmax", "rank", "tournament"):
+            recorder.run(f"build_selector[{scheme}]", "probdist", lambda: build_selector(scheme, scores), 11, size, size)
+            selector = build_selector(scheme, scores)
+            recorder.run(f"select_parents[{scheme}]", "probdist",
+                         lambda: probdist.select_parents(population, selector), 11, size)
+
+def bench_fitness_engine(recorder, instances, populations, rng):
+    for n_activities, (tables, _) in instances.items():
+        for size in populations:
+            if size * n_activities > MAX_ASSIGNMENTS:
+                continue
+            block = random_block(tables, size, rng)
+            recorder.run("batch_fitness", "engine", lambda: batch_fitness(tables, block), n_activities, size, size)
+        delta = DeltaTables(tables)
+        block = random_block(tables, 1, rng)
+        evaluator = IncrementalFitness(delta, block[0].tolist())
+        moves = random_block(tables, 1024, rng)[:, 0, :].tolist()
+        picks = rng.integers(0, n_activities, 1024).tolist()
+        state = {"i": 0}
+        def move():
+            i = state["i"] = (state["i"] + 1) & 1023
+            evaluator.set(picks[i], *moves[i])
+        recorder.run("incremental_set", "engine", move, n_activities)
+
+        # what scoring a steady-state child from its parent's counters would cost, against batch_fitness per
+        # schedule above: the parent's counters are built once, then each child copies them and moves the
+        # activities it changed (1% of them here, a child that close is already rare with uniform crossover)
+        row = block[0].tolist()
+        recorder.run("incremental_build", "engine", lambda: IncrementalFitness(delta, row), n_activities)
+        changes = max(1, n_activities // 100)
+        def child():
+            moved = evaluator.copy()
+            for i in range(changes):
+                moved.set(picks[i], *moves[i])
+        recorder.run(f"incremental_child[{changes}]", "engine", child, n_activities)
+
+def bench_generations(recorder, instances, populations):  # one generation of each loop in ga_engines.py
+    for n_activities, (heap_tables, probdist_tables) in instances.items():
+        for size in populations:
+            if size * n_activities > MAX_GENERATION_ASSIGNMENTS:
+                continue
+            steady = SteadyStateGA(heap_tables, size)
+            steady.seed()
+            recorder.run("run_generation", "heap", steady.breed, n_activities, size, size)
+
+            generational = GenerationalGA(probdist_tables, size)
+            generational.seed()
+            def generation():
+                scores, _ = generational.evaluate(1)
+                generational.previous_average = None  # keeps the rate at 0.01, the halving rule would cut it every call
+                generational.breed(1, scores)
+            recorder.run("run_generation", "probdist", generation, n_activities, size, size)
+
+# reporting
+
+def metadata():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {"revision": revision, "python": sys.version.split()[0], "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "timestamp": time.time()}
+
+def result_key(result):
+    return (result["name"], result["engine"], result["activities"], result["population"])
+
+def compare(results, baseline, threshold=0.10):  # prints cases that got slower or faster by more than threshold
+    old = {result_key(r): r for r in baseline["results"]}
+    print(f"\n{'case':<58}{'old ms':>12}{'new ms':>12}{'change':>9}")
+    for result in results:
+        before = old.get(result_key(result))
+        if before is None:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        flag = "  slower" if change > threshold else "  faster" if change < -threshold else ""
+        name, engine, activities, population = result_key(result)
+        label = f"{engine} {name} A={activities}" + (f" pop={population}" if population else "")
+        print(f"{label:<58}{before['seconds'] * 1e3:>12.4f}{result['seconds'] * 1e3:>12.4f}{change:>+9.1%}{flag}")
+
+def parse_sizes(text):
+    return [int(part) for part in text.split(",") if part]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the fitness, selection and GA code paths.")
+    parser.add_argument("--full", action="store_true", help="populations up to 1M and instances up to 10,000 activities")
+    parser.add_argument("--populations", type=parse_sizes, default=None, help="comma separated population sizes")
+    parser.add_argument("--activities", type=parse_sizes, default=None, help="comma separated instance sizes")
+    parser.add_argument("--groups", default="legacy,selection,engine,generation", help="benchmark groups to run")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--repeats", type=int, default=3, help="timing rounds per case, the best is kept")
+    parser.add_argument("--output", default=None, help="write results as JSON here")
+    parser.add_argument("--compare", default=None, help="JSON results from an earlier run to diff against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    populations = args.populations or (FULL_POPULATIONS if args.full else QUICK_POPULATIONS)
+    activities = args.activities or (FULL_ACTIVITIES if args.full else QUICK_ACTIVITIES)
+    groups = set(args.groups.split(","))
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    heap, probdist = load_script("heap"), load_script("probdist")
+    recorder = Recorder(args.min_time, args.repeats)
+
+    if "legacy" in groups:
+        bench_legacy_functions(recorder, heap, probdist, rng)
+    if "selection" in groups:
+        bench_selection(recorder, probdist, populations, rng)
+    instances = {}  # activities -> (minheap tables, prob dist tables), 11 is the built-in instance
+    for n in activities:
+        if n == 11:
+            instances[n] = (heap.TABLES, probdist.TABLES)
+        else:
+            document = synthetic_instance(n, args.seed)
+            instances[n] = (compile_instance(document, "minheap"), compile_instance(document, "probdist"))
+    if "engine" in groups:
+        bench_fitness_engine(recorder, instances, populations, rng)
+    if "generation" in groups:
+        bench_generations(recorder, instances, populations)
+
+    report = {"meta": metadata(), "results": recorder.results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(recorder.results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Dylan Orpin
+# Assignment 2 (checkpoint snapshots)
+
+# imports
+import json  # used for the snapshot header
+import os  # used for the atomic rename
+import random  # used for saving the random module's state
+import struct  # used for the fixed-size preamble
+import numpy as np  # used for the packed arrays
+
+# a snapshot file is
+#   8 bytes    magic b"GASNAP\r\n" (the line ending catches text-mode copies)
+#   4 bytes    format version, little-endian uint32
+#   4 bytes    header length, little-endian uint32
+#   header     UTF-8 JSON: {"meta": {...}, "arrays": {name: {"dtype", "shape", "offset"}}}
+#   arrays     raw C-order data, each starting on a 64 byte boundary so the file can be memory mapped
+# offsets are counted from the first 64 byte boundary after the header
+
+# data definitions
+MAGIC = b"GASNAP\r\n"
+VERSION = 1
+ALIGN = 64
+PREAMBLE = struct.Struct("<8sII")
+
+class SnapshotError(ValueError):  # raised for files that are not snapshots or do not fit the current run
+    pass
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+def write_snapshot(path, meta, arrays):  # meta is JSON data, arrays maps names to numpy arrays or flat lists
+    arrays = {name: np.ascontiguousarray(value) for name, value in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, value in arrays.items():
+        layout[name] = {"dtype": value.dtype.str, "shape": list(value.shape), "offset": offset}
+        offset = _aligned(offset + value.nbytes)
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    start = _aligned(PREAMBLE.size + len(header))
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:  # written beside the old snapshot and renamed, a crash never leaves half a file
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, value in arrays.items():
+            f.seek(start + layout[name]["offset"])
+            f.write(value.tobytes())
+        f.truncate(start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def read_snapshot(path, mmap=True):  # -> (meta, arrays), with mmap the arrays are read-only views of the file
+    with open(path, "rb") as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise SnapshotError(f"{path} is not a snapshot")
+        magic, version, header_length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"{path} is snapshot version {version}, this code reads version {VERSION}")
+        header = json.loads(f.read(header_length))
+    raw = np.memmap(path, np.uint8, "r") if mmap else np.fromfile(path, np.uint8)
+    start = _aligned(PREAMBLE.size + header_length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        size = dtype.itemsize * int(np.prod(spec["shape"], dtype=np.int64))
+        begin = start + spec["offset"]
+        if begin + size > len(raw):
+            raise SnapshotError(f"{path} is truncated")
+        arrays[name] = raw[begin:begin + size].view(dtype).reshape(spec["shape"])
+    return header["meta"], arrays
+
+# the random module's generator, saved so a resumed run draws the same numbers
+
+def rng_arrays(rng=random):  # -> (meta, arrays)
+    version, internal, gauss_next = rng.getstate()
+    return {"rng_version": version, "rng_gauss_next": gauss_next}, {"rng_state": np.array(internal, dtype=np.uint32)}
+
+def restore_rng(meta, arrays, rng=random):
+    rng.setstate((meta["rng_version"], tuple(arrays["rng_state"].tolist()), meta["rng_gauss_next"]))
+
+def check_instance(meta, tables, variant):  # refuses snapshots taken on a different instance or rule set
+    if instance_meta(tables, variant) != {key: meta.get(key) for key in ("variant", "activities", "sizes")}:
+        raise SnapshotError("snapshot was taken on a different problem instance")
+
+def instance_meta(tables, variant):
+    return {"variant": variant, "activities": list(tables.activity_names),
+            "sizes": [len(tables.room_names), len(tables.time_names), len(tables.facilitator_names)]}
+
+# cache contents, a resumed heap run scores the same children from the cache as the original would have
+
+def cache_arrays(cache):  # -> (meta, arrays), nothing when the run has no cache
+    if cache is None:
+        return {}, {}
+    meta, arrays = cache.state()
+    return {"cache": meta}, {f"cache_{name}": value for name, value in arrays.items()}
+
+def restore_cache(meta, arrays, cache):
+    if cache is not None and "cache" in meta:
+        cache.load_state(meta["cache"], {name[6:]: value for name, value in arrays.items() if name.startswith("cache_")})
+
+def add_checkpoint_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--checkpoint", default=None, help="save the run here every --checkpoint-every generations")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="generations between checkpoints")
+    parser.add_argument("--resume", default=None, help="continue the run saved in this checkpoint")
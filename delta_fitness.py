@@ -0,0 +1,139 @@
+# Dylan Orpin
+# Assignment 2 (incremental fitness)
+
+# imports
+from fitness_engine import ROOM, TIME, FACILITATOR, LOAD_LEVELS  # field positions and the load table width
+
+# lookup tables as plain lists, indexing numpy arrays one value at a time is slow
+
+class DeltaTables:
+    def __init__(self, tables):
+        self.n_rooms = len(tables.room_names)
+        self.n_times = len(tables.time_names)
+        self.room_score = tables.room_score.tolist()
+        self.facilitator_score = tables.facilitator_score.tolist()
+        self.room_clash_score = tables.room_clash_score.tolist()
+        self.facilitator_clash_score = tables.facilitator_clash_score.tolist()
+        self.load_score = tables.load_score.tolist()
+        self.section_score = tables.section_score.tolist()
+        self.cross_score = tables.cross_score.tolist()
+        self.room_zone = tables.room_zone.tolist()
+        self.best_room_score = tables.room_score.max(axis=1).tolist()  # per activity, used to spot weak assignments
+        self.best_facilitator_score = tables.facilitator_score.max(axis=1).tolist()
+        self.n_room_cells = len(tables.room_names) * self.n_times
+        self.n_facilitator_cells = len(tables.facilitator_names) * self.n_times
+        self.n_facilitators = len(tables.facilitator_names)
+
+        self.pairs_of = [[] for _ in tables.activity_names]  # special rule pairs each activity takes part in
+        for a, b in tables.section_pairs.tolist():
+            self.pairs_of[a].append((False, a, b))
+            self.pairs_of[b].append((False, a, b))
+        for a, b in tables.cross_pairs.tolist():
+            self.pairs_of[a].append((True, a, b))
+            self.pairs_of[b].append((True, a, b))
+
+# per-schedule occupancy counters, updated one assignment at a time
+
+class IncrementalFitness:
+    def __init__(self, delta_tables, encoded=None):
+        self.tables = delta_tables
+        self.assignment = []  # activity -> [room, time, facilitator]
+        self.room_counts = [0] * delta_tables.n_room_cells  # activities per room x time
+        self.facilitator_counts = [0] * delta_tables.n_facilitator_cells  # activities per facilitator x time
+        self.load = [0] * delta_tables.n_facilitators  # activities per facilitator
+        self.fitness = 0.0
+        if encoded is not None:
+            self.assignment = [list(entry) for entry in encoded]
+            for a in range(len(self.assignment)):  # add activities one at a time, pairs counted once
+                self._add(a)
+            for a in range(len(self.assignment)):
+                for cross, x, y in self.tables.pairs_of[a]:
+                    if x == a:
+                        self.fitness += self._pair_score(cross, x, y)
+
+    def copy(self):  # cheap clone, lists are flat so a shallow copy of each is enough
+        other = IncrementalFitness.__new__(IncrementalFitness)
+        other.tables = self.tables
+        other.assignment = [entry[:] for entry in self.assignment]
+        other.room_counts = self.room_counts[:]
+        other.facilitator_counts = self.facilitator_counts[:]
+        other.load = self.load[:]
+        other.fitness = self.fitness
+        return other
+
+    def _pair_score(self, cross, a, b):  # SLA100/191 term for one pair
+        t = self.tables
+        ta, tb = self.assignment[a][TIME], self.assignment[b][TIME]
+        if not cross:
+            return t.section_score[ta][tb]
+        opposite = t.room_zone[self.assignment[a][ROOM]] ^ t.room_zone[self.assignment[b][ROOM]]
+        return t.cross_score[ta][tb][opposite]
+
+    def _add(self, a):  # counts activity a into the occupancy tables
+        t = self.tables
+        room, time, facilitator = self.assignment[a]
+        self.fitness += t.room_score[a][room] + t.facilitator_score[a][facilitator]
+
+        cell = room * t.n_times + time
+        count = self.room_counts[cell]
+        self.fitness += t.room_clash_score[count + 1] - t.room_clash_score[count]
+        self.room_counts[cell] = count + 1
+
+        cell = facilitator * t.n_times + time
+        count = self.facilitator_counts[cell]
+        self.fitness += t.facilitator_clash_score[count + 1] - t.facilitator_clash_score[count]
+        self.facilitator_counts[cell] = count + 1
+
+        count = self.load[facilitator]
+        scores = t.load_score[facilitator]
+        self.fitness += scores[min(count + 1, LOAD_LEVELS - 1)] - scores[min(count, LOAD_LEVELS - 1)]
+        self.load[facilitator] = count + 1
+
+    def _remove(self, a):  # takes activity a back out of the occupancy tables
+        t = self.tables
+        room, time, facilitator = self.assignment[a]
+        self.fitness -= t.room_score[a][room] + t.facilitator_score[a][facilitator]
+
+        cell = room * t.n_times + time
+        count = self.room_counts[cell]
+        self.fitness += t.room_clash_score[count - 1] - t.room_clash_score[count]
+        self.room_counts[cell] = count - 1
+
+        cell = facilitator * t.n_times + time
+        count = self.facilitator_counts[cell]
+        self.fitness += t.facilitator_clash_score[count - 1] - t.facilitator_clash_score[count]
+        self.facilitator_counts[cell] = count - 1
+
+        count = self.load[facilitator]
+        scores = t.load_score[facilitator]
+        self.fitness += scores[min(count - 1, LOAD_LEVELS - 1)] - scores[min(count, LOAD_LEVELS - 1)]
+        self.load[facilitator] = count - 1
+
+    def move_delta(self, a, room, time, facilitator):  # fitness change of a move, state left untouched
+        old = self.assignment[a]
+        before = self.fitness
+        saved = old[:]
+        self.set(a, room, time, facilitator)
+        delta = self.fitness - before
+        self.set(a, *saved)
+        self.fitness = before  # drop the rounding left over from the round trip
+        return delta
+
+    def set(self, a, room, time, facilitator):  # reassigns activity a, O(1) plus its special rule pairs
+        current = self.assignment[a]
+        if current[ROOM] == room and current[TIME] == time and current[FACILITATOR] == facilitator:
+            return self.fitness
+        pairs = self.tables.pairs_of[a]
+        for cross, x, y in pairs:
+            self.fitness -= self._pair_score(cross, x, y)
+        self._remove(a)
+        current[ROOM], current[TIME], current[FACILITATOR] = room, time, facilitator
+        self._add(a)
+        for cross, x, y in pairs:
+            self.fitness += self._pair_score(cross, x, y)
+        return self.fitness
+
+    def apply(self, encoded):  # moves to a whole new schedule, only differing activities cost anything
+        for a, (room, time, facilitator) in enumerate(encoded):
+            self.set(a, room, time, facilitator)
+        return self.fitness
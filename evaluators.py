@@ -0,0 +1,185 @@
+# Dylan Orpin
+# Assignment 2 (fitness evaluator backends)
+
+# imports
+import os  # used for the default worker count
+import time  # used for the speedup report
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor  # used for the pooled backends
+from multiprocessing import shared_memory  # used for the shared-memory backend
+import numpy as np  # used for the population blocks
+from fitness_engine import batch_fitness  # every backend scores with the same engine
+
+# data definitions
+DEFAULT_CHUNK = 8192  # schedules per task, big enough to hide the task overhead
+
+# every backend takes a (pop x activities x 3) genome block and returns the scores in the same order,
+# so results are identical whichever backend is used
+
+class SerialEvaluator:
+    name = "serial"
+
+    def __init__(self, tables, workers=None, chunk_size=DEFAULT_CHUNK):
+        self.tables = tables
+
+    def evaluate(self, block):
+        return batch_fitness(self.tables, block)
+
+    def close(self):
+        pass
+
+def _chunks(n, chunk_size):  # (start, end) pairs covering range(n)
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+class ThreadEvaluator:  # numpy drops the GIL inside the big array operations
+    name = "thread"
+
+    def __init__(self, tables, workers=None, chunk_size=DEFAULT_CHUNK):
+        self.tables = tables
+        self.chunk_size = chunk_size
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+
+    def evaluate(self, block):
+        scores = np.empty(len(block))
+        def score(span):
+            scores[span[0]:span[1]] = batch_fitness(self.tables, block[span[0]:span[1]])
+        list(self.pool.map(score, _chunks(len(block), self.chunk_size)))
+        return scores
+
+    def close(self):
+        self.pool.shutdown()
+
+# process workers keep their own copy of the tables, sent once when the worker starts
+_tables = None
+_shared = {}  # shared memory name -> attached segment
+
+def _init_worker(tables):
+    global _tables
+    _tables = tables
+
+def _score_chunk(chunk):
+    return batch_fitness(_tables, chunk)
+
+class ProcessEvaluator:  # chunks are pickled to the workers
+    name = "process"
+
+    def __init__(self, tables, workers=None, chunk_size=DEFAULT_CHUNK):
+        self.tables = tables
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                        initargs=(tables,))
+
+    def evaluate(self, block):
+        chunks = [block[start:end] for start, end in _chunks(len(block), self.chunk_size)]
+        if not chunks:
+            return np.empty(0)
+        return np.concatenate(list(self.pool.map(_score_chunk, chunks)))
+
+    def close(self):
+        self.pool.shutdown()
+
+def _attach(name):  # workers attach to each buffer once and keep it
+    if name not in _shared:
+        _shared[name] = shared_memory.SharedMemory(name=name)
+    return _shared[name]
+
+def _score_shared(genome_name, score_name, dtype, shape, start, end):
+    genomes = np.ndarray(shape, dtype=dtype, buffer=_attach(genome_name).buf)
+    scores = np.ndarray(shape[0], dtype=np.float64, buffer=_attach(score_name).buf)
+    scores[start:end] = batch_fitness(_tables, genomes[start:end])
+
+class SharedMemoryEvaluator:  # genomes and scores live in shared buffers, only offsets are sent to workers
+    name = "shared"
+
+    def __init__(self, tables, workers=None, chunk_size=DEFAULT_CHUNK):
+        self.tables = tables
+        self.chunk_size = chunk_size
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                        initargs=(tables,))
+        self.capacity = 0
+        self.genome_buffer = None
+        self.score_buffer = None
+
+    def _reserve(self, block):  # buffers grow to the largest population seen, never shrink
+        if len(block) <= self.capacity and self.genome_buffer.size >= block.nbytes:
+            return
+        self._release()
+        self.capacity = len(block)
+        self.genome_buffer = shared_memory.SharedMemory(create=True, size=max(block.nbytes, 1))
+        self.score_buffer = shared_memory.SharedMemory(create=True, size=max(len(block) * 8, 1))
+
+    def evaluate(self, block):
+        block = np.ascontiguousarray(block)
+        if len(block) == 0:
+            return np.empty(0)
+        self._reserve(block)
+        genomes = np.ndarray(block.shape, dtype=block.dtype, buffer=self.genome_buffer.buf)
+        genomes[:] = block
+        futures = [
+            self.pool.submit(_score_shared, self.genome_buffer.name, self.score_buffer.name, block.dtype.str,
+                             block.shape, start, end)
+            for start, end in _chunks(len(block), self.chunk_size)
+        ]
+        for future in futures:
+            future.result()  # re-raises worker errors
+        return np.ndarray(len(block), dtype=np.float64, buffer=self.score_buffer.buf).copy()
+
+    def _release(self):
+        for buffer in (self.genome_buffer, self.score_buffer):
+            if buffer is not None:
+                buffer.close()
+                buffer.unlink()
+        self.genome_buffer = self.score_buffer = None
+
+    def close(self):
+        self.pool.shutdown()
+        self._release()
+
+EVALUATORS = {cls.name: cls for cls in (SerialEvaluator, ThreadEvaluator, ProcessEvaluator, SharedMemoryEvaluator)}
+
+def make_evaluator(name, tables, workers=None, chunk_size=DEFAULT_CHUNK):
+    if name not in EVALUATORS:
+        raise ValueError(f"unknown evaluator backend: {name}")
+    return EVALUATORS[name](tables, workers=workers, chunk_size=chunk_size)
+
+# speedup report, times each backend on random populations against the serial one
+
+def speedup_report(tables, sizes=(10_000, 100_000), backends=None, workers=None, repeats=3, seed=0):
+    rng = np.random.default_rng(seed)
+    limits = [len(tables.room_names), len(tables.time_names), len(tables.facilitator_names)]
+    rows = []
+    for size in sizes:
+        block = np.stack([rng.integers(0, limit, size=(size, len(tables.activity_names))) for limit in limits], axis=2)
+        block = block.astype(np.uint8 if max(limits) <= 256 else np.uint16)
+        expected = None
+        serial_time = None
+        for name in backends or list(EVALUATORS):
+            evaluator = make_evaluator(name, tables, workers=workers)
+            try:
+                evaluator.evaluate(block[:1])  # warm up the pool outside the timing
+                best = float("inf")
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    scores = evaluator.evaluate(block)
+                    best = min(best, time.perf_counter() - start)
+            finally:
+                evaluator.close()
+            if expected is None:
+                expected = scores
+            if name == "serial":
+                serial_time = best
+            rows.append({
+                "backend": name,
+                "population": size,
+                "seconds": best,
+                "schedules_per_second": size / best,
+                "speedup": (serial_time / best) if serial_time else None,
+                "matches": bool(np.array_equal(scores, expected)),
+            })
+    return rows
+
+def print_speedup_report(rows):
+    print(f"{'backend':<10}{'population':>12}{'seconds':>10}{'sched/s':>14}{'speedup':>9}  matches")
+    for row in rows:
+        speedup = f"{row['speedup']:.2f}x" if row["speedup"] else "-"
+        print(f"{row['backend']:<10}{row['population']:>12}{row['seconds']:>10.3f}"
+              f"{row['schedules_per_second']:>14.0f}{speedup:>9}  {row['matches']}")
@@ -0,0 +1,187 @@
+# Dylan Orpin
+# Assignment 2 (fitness cache)
+
+# imports
+import hashlib  # used for the genome keys
+from collections import OrderedDict  # used for the LRU order
+import numpy as np  # used for batch lookups
+
+# data definitions
+ENTRY_BYTES = 120  # rough cost of one cached score (16 byte key, float, dict/list overhead)
+
+def genome_key(genome):  # 16 byte digest, the same for equal genomes whatever their length
+    return hashlib.blake2b(genome, digest_size=16).digest()
+
+# eviction policies, both hold at most `capacity` scores
+
+# dump() and load() give (keys, values, referenced, hand) in eviction order, used by checkpoints
+
+class _LRU:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def dump(self):  # least recently used first
+        return list(self.entries), list(self.entries.values()), [False] * len(self.entries), 0
+
+    def load(self, keys, values, referenced, hand):
+        self.entries = OrderedDict(zip(keys, values))
+
+    def get(self, key):  # None when missing
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):  # returns how many entries were evicted
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            return 1
+        return 0
+
+class _Clock:  # second-chance ring, hits only set a bit so lookups never reorder anything
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.index = {}  # key -> ring position
+        self.keys = []
+        self.values = []
+        self.referenced = []
+        self.hand = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def dump(self):  # ring order
+        return self.keys[:], self.values[:], self.referenced[:], self.hand
+
+    def load(self, keys, values, referenced, hand):
+        self.keys, self.values, self.referenced, self.hand = list(keys), list(values), list(referenced), hand
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    def get(self, key):
+        i = self.index.get(key)
+        if i is None:
+            return None
+        self.referenced[i] = True
+        return self.values[i]
+
+    def put(self, key, value):
+        i = self.index.get(key)
+        if i is not None:
+            self.values[i] = value
+            self.referenced[i] = True
+            return 0
+        if len(self.keys) < self.capacity:  # ring still filling up
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.values.append(value)
+            self.referenced.append(False)
+            return 0
+        while self.referenced[self.hand]:  # give referenced entries a second chance
+            self.referenced[self.hand] = False
+            self.hand = (self.hand + 1) % self.capacity
+        del self.index[self.keys[self.hand]]
+        self.index[key] = self.hand
+        self.keys[self.hand] = key
+        self.values[self.hand] = value
+        self.hand = (self.hand + 1) % self.capacity
+        return 1
+
+POLICIES = {"lru": _LRU, "clock": _Clock}
+
+# bounded cache in front of a fitness function
+
+class FitnessCache:
+    def __init__(self, max_entries=None, max_mb=None, policy="lru"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown cache policy: {policy}")
+        if max_entries is None and max_mb is None:
+            raise ValueError("fitness cache needs max_entries or max_mb")
+        capacity = max_entries if max_entries is not None else int(max_mb * 2 ** 20 // ENTRY_BYTES)
+        if max_entries is not None and max_mb is not None:
+            capacity = min(capacity, int(max_mb * 2 ** 20 // ENTRY_BYTES))
+        if capacity < 1:
+            raise ValueError("fitness cache must hold at least one entry")
+        self.policy = policy
+        self.store = POLICIES[policy](capacity)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.store)
+
+    def get(self, genome):  # cached score or None
+        value = self.store.get(genome_key(genome))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, genome, fitness):
+        self.evictions += self.store.put(genome_key(genome), fitness)
+
+    def score(self, genome, fitness_function):  # fitness_function(genome) only runs on a miss
+        key = genome_key(genome)
+        value = self.store.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = fitness_function(genome)
+        self.evictions += self.store.put(key, value)
+        return value
+
+    def score_block(self, block, batch_function):  # block of genomes, only the misses go to batch_function in one call
+        block = np.ascontiguousarray(block)
+        keys = [genome_key(row) for row in block]
+        scores = np.empty(len(block))
+        missing = []
+        for i, key in enumerate(keys):
+            value = self.store.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                scores[i] = value
+        self.hits += len(block) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            fresh = batch_function(block[missing])
+            scores[missing] = fresh
+            for i, value in zip(missing, fresh.tolist()):
+                self.evictions += self.store.put(keys[i], value)
+        return scores
+
+    def state(self):  # -> (meta, arrays) for a checkpoint
+        keys, values, referenced, hand = self.store.dump()
+        meta = {"policy": self.policy, "capacity": self.store.capacity, "hand": hand,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+        arrays = {"keys": np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 16),
+                  "values": np.array(values, dtype=np.float64), "referenced": np.array(referenced, dtype=bool)}
+        return meta, arrays
+
+    def load_state(self, meta, arrays):  # only into a cache with the same policy and capacity
+        if meta["policy"] != self.policy or meta["capacity"] != self.store.capacity:
+            raise ValueError("saved fitness cache has a different policy or capacity")
+        keys = [row.tobytes() for row in arrays["keys"]]
+        self.store.load(keys, arrays["values"].tolist(), arrays["referenced"].tolist(), meta["hand"])
+        self.hits, self.misses, self.evictions = meta["hits"], meta["misses"], meta["evictions"]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"policy": self.policy, "entries": len(self.store), "capacity": self.store.capacity,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hit_rate()}
+
+def cache_summary(cache):  # one line for the end of a run
+    s = cache.stats()
+    return (f"Fitness cache ({s['policy']}): {s['hits']} hits, {s['misses']} misses, "
+            f"{s['evictions']} evictions, {s['hit_rate']:.1%} hit rate")
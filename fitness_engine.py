@@ -0,0 +1,196 @@
+# Dylan Orpin
+# Assignment 2 (vectorized fitness engine)
+
+# imports
+import numpy as np  # used for the lookup tables and batch scoring
+
+# data definitions
+ROOM, TIME, FACILITATOR = 0, 1, 2  # field positions inside an encoded assignment
+
+LINKED_COURSES = [("SLA100A", "SLA100B"), ("SLA191A", "SLA191B")]  # sections that follow the SLA100/191 rules
+FAR_BUILDINGS = ["Roman", "Beach"]  # buildings that are far from the rest of campus
+LOAD_EXEMPT = ["Tyler"]  # facilitators allowed to have a light load
+
+CHUNK_SIZE = 65536  # most schedules scored per bincount pass
+CELL_BUDGET = 1 << 24  # most count cells per pass, large instances get smaller chunks
+LOAD_LEVELS = 6  # load scores only differ for 0..5 activities, higher loads share the last column
+OBJECTIVES = ("room_fit", "facilitator_preference", "conflicts", "facilitator_load", "sla_rules")  # fitness terms
+
+# helpers
+
+def normalize_activities(activities):  # accepts both the dict (minheap) and list (prob dist) layouts
+    if isinstance(activities, dict):
+        return [(name, data["enrollment"], data["preferred"], data["others"])
+                for name, data in activities.items()]
+    return [(data["name"], data["expected"], data["preferred"], data["other"])
+            for data in activities]
+
+# lookup tables
+
+# the defaults reproduce the scripts' rules, problem instances loaded from files pass their own
+# linked_courses (groups of sections), course_pairs (which linked courses get the cross-course rules, default
+# every pair), room_zones (1 for rooms in far buildings), load_exempt names
+# and slot_positions (numbers whose differences give how far apart two slots are)
+
+class FitnessTables:
+    def __init__(self, rooms, time_slots, facilitators, activities, variant="minheap",
+                 linked_courses=None, room_zones=None, load_exempt=None, slot_positions=None, course_pairs=None):
+        if variant not in ("minheap", "probdist"):
+            raise ValueError(f"unknown fitness variant: {variant}")
+        self.variant = variant  # the two scripts disagree on a few rules, keep both
+        activity_rows = normalize_activities(activities)
+
+        self.room_names = list(rooms.keys())  # index -> name tables
+        self.time_names = list(time_slots)
+        self.facilitator_names = list(facilitators)
+        self.activity_names = [row[0] for row in activity_rows]
+
+        self.room_index = {name: i for i, name in enumerate(self.room_names)}  # name -> index tables
+        self.time_index = {name: i for i, name in enumerate(self.time_names)}
+        self.facilitator_index = {name: i for i, name in enumerate(self.facilitator_names)}
+        self.activity_index = {name: i for i, name in enumerate(self.activity_names)}
+
+        n_activities = len(self.activity_names)
+        n_facilitators = len(self.facilitator_names)
+        self.sizes = (len(self.room_names), len(self.time_names), n_facilitators)  # values each genome field can take
+
+        # room size score per activity x room
+        capacity = np.array([rooms[name] for name in self.room_names])[None, :]
+        enrollment = np.array([row[1] for row in activity_rows])[:, None]
+        self.room_score = np.select(
+            [capacity < enrollment, capacity > 6 * enrollment, capacity > 3 * enrollment],
+            [-0.5, -0.4, -0.2],
+            0.3
+        )
+        self.room_fits = capacity >= enrollment  # hard constraint for the greedy seeding and the repair operator
+
+        # facilitator preference score per activity x facilitator
+        self.facilitator_score = np.full((n_activities, n_facilitators), -0.1)
+        for a, (_, _, preferred, others) in enumerate(activity_rows):
+            for name in others:
+                self.facilitator_score[a, self.facilitator_index[name]] = 0.2
+            for name in preferred:  # preferred wins if listed twice
+                self.facilitator_score[a, self.facilitator_index[name]] = 0.5
+
+        # scores indexed by how many activities share a cell
+        counts = np.arange(n_activities + 1)
+        if variant == "minheap":
+            self.room_clash_score = -0.5 * np.maximum(counts - 1, 0)  # every extra activity in a room/time
+            self.facilitator_clash_score = np.where(counts == 1, 0.2, np.where(counts > 1, -0.2, 0.0))  # once per slot
+        else:
+            self.room_clash_score = np.where(counts > 1, -0.5 * counts, 0.0)  # every activity in a shared room/time
+            self.facilitator_clash_score = np.where(counts == 1, 0.2, np.where(counts > 1, -0.2 * counts, 0.0))
+
+        # facilitator load score per facilitator x total assignments (capped at LOAD_LEVELS - 1)
+        exempt = LOAD_EXEMPT if load_exempt is None else load_exempt
+        self.load_score = np.zeros((n_facilitators, LOAD_LEVELS))
+        self.load_score[:, 5:] = -0.5  # too many
+        for f, name in enumerate(self.facilitator_names):
+            if name not in exempt:
+                self.load_score[f, 1:3] = -0.4  # too few
+
+        # slot distances, the minheap script compares clock hours and the prob dist script compares slot positions
+        if slot_positions is not None:
+            values = np.asarray(slot_positions)
+        elif variant == "minheap":
+            values = np.array([int(t.split()[0]) for t in self.time_names])
+        else:
+            values = np.arange(len(self.time_names))
+        gap = np.abs(values[:, None] - values[None, :])
+        same = gap == 0
+
+        # SLA100/191 section rules per time x time
+        if variant == "minheap":
+            self.section_score = np.where(gap > 4, 0.5, 0.0) - np.where(same, 0.5, 0.0)
+        else:
+            self.section_score = np.where(same, -0.5, np.where(gap >= 4, 0.5, 0.0))
+
+        # SLA100 vs SLA191 rules per time x time x (rooms in opposite buildings)
+        cross = np.where(gap == 1, 0.5, np.where(gap == 2, 0.25, np.where(same, -0.25, 0.0)))
+        self.cross_score = np.stack([cross, cross - np.where(gap == 1, 0.4, 0.0)], axis=2)
+
+        if room_zones is None:
+            room_zones = [int(any(b in name for b in FAR_BUILDINGS)) for name in self.room_names]
+        self.room_zone = np.array(room_zones, dtype=np.intp)
+
+        # activity index pairs the special rules apply to, every two sections of a course and every
+        # section of one course against every section of a later one
+        courses = [[self.activity_index[name] for name in course]
+                   for course in (LINKED_COURSES if linked_courses is None else linked_courses)]
+        self.section_pairs = np.array(
+            [(a, b) for course in courses for i, a in enumerate(course) for b in course[i + 1:]],
+            dtype=np.intp
+        ).reshape(-1, 2)
+        if course_pairs is None:
+            course_pairs = [(i, j) for i in range(len(courses)) for j in range(i + 1, len(courses))]
+        self.cross_pairs = np.array(
+            [(a, b) for i, j in course_pairs for a in courses[i] for b in courses[j]],
+            dtype=np.intp
+        ).reshape(-1, 2)
+
+# scoring
+
+def _score_terms(tables, population):  # the seven rule groups for one block of schedules, each (n,)
+    n, n_activities = population.shape[0], population.shape[1]
+    n_rooms = len(tables.room_names)
+    n_times = len(tables.time_names)
+    n_facilitators = len(tables.facilitator_names)
+
+    rooms = population[:, :, ROOM]
+    times = population[:, :, TIME]
+    facilitators = population[:, :, FACILITATOR]
+    activity = np.arange(n_activities)
+    row = np.arange(n)[:, None]
+
+    # per activity room size and facilitator preference
+    terms = [tables.room_score[activity, rooms].sum(axis=1)]
+    terms.append(tables.facilitator_score[activity, facilitators].sum(axis=1))
+
+    # room/time conflicts, counted per schedule with one bincount
+    cells = (row * n_rooms + rooms) * n_times + times
+    room_counts = np.bincount(cells.ravel(), minlength=n * n_rooms * n_times).reshape(n, -1)
+    terms.append(tables.room_clash_score[room_counts].sum(axis=1))
+
+    # facilitator double booking and load
+    cells = (row * n_facilitators + facilitators) * n_times + times
+    facilitator_counts = np.bincount(cells.ravel(), minlength=n * n_facilitators * n_times)
+    facilitator_counts = facilitator_counts.reshape(n, n_facilitators, n_times)
+    terms.append(tables.facilitator_clash_score[facilitator_counts].sum(axis=(1, 2)))
+    load = np.minimum(facilitator_counts.sum(axis=2), LOAD_LEVELS - 1)
+    terms.append(tables.load_score[np.arange(n_facilitators), load].sum(axis=1))
+
+    # SLA100/191 special rules
+    a, b = tables.section_pairs[:, 0], tables.section_pairs[:, 1]
+    terms.append(tables.section_score[times[:, a], times[:, b]].sum(axis=1))
+    a, b = tables.cross_pairs[:, 0], tables.cross_pairs[:, 1]
+    opposite = tables.room_zone[rooms[:, a]] ^ tables.room_zone[rooms[:, b]]
+    terms.append(tables.cross_score[times[:, a], times[:, b], opposite].sum(axis=1))
+    return terms
+
+def _score_chunk(tables, population):  # scores one block of schedules, summed in rule order
+    terms = _score_terms(tables, population)
+    scores = terms[0]
+    for term in terms[1:]:
+        scores += term
+    return scores
+
+def _objective_chunk(tables, population):  # (n x OBJECTIVES), the weighted fitness is the row sum
+    room, facilitator, room_clash, facilitator_clash, load, section, cross = _score_terms(tables, population)
+    return np.stack([room, facilitator, room_clash + facilitator_clash, load, section + cross], axis=1)
+
+def _batched(score, width, tables, population, chunk_size):
+    population = np.asarray(population)
+    if population.ndim == 2:  # allow a single schedule
+        return score(tables, population[None])[0]
+    cells = (len(tables.room_names) + len(tables.facilitator_names)) * len(tables.time_names)
+    chunk_size = max(1, min(chunk_size, CELL_BUDGET // cells))
+    scores = np.empty((population.shape[0],) + width)
+    for start in range(0, population.shape[0], chunk_size):
+        scores[start:start + chunk_size] = score(tables, population[start:start + chunk_size])
+    return scores
+
+def batch_fitness(tables, population, chunk_size=CHUNK_SIZE):  # scores every schedule in one call
+    return _batched(_score_chunk, (), tables, population, chunk_size)
+
+def batch_objectives(tables, population, chunk_size=CHUNK_SIZE):  # every schedule's OBJECTIVES, higher is better
+    return _batched(_objective_chunk, (len(OBJECTIVES),), tables, population, chunk_size)
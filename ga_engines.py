@@ -0,0 +1,266 @@
+# Dylan Orpin
+# Assignment 2 (GA loops)
+
+# imports
+import random  # default random source, any random.Random instance works too
+import numpy as np  # used for population blocks
+from fitness_engine import batch_fitness  # used for scoring whole blocks
+from delta_fitness import DeltaTables, IncrementalFitness  # used for the memetic stage
+from genome import genome_triples, genome_from_triples, split_block, stack_genomes  # used for schedules
+from operators import (numpy_rng, random_block, mutate_block, crossover_masks, crossover_block,  # used for
+                       pair_offspring)  # building children
+from population_store import PopulationStore  # used by the steady-state loop
+from selection import build_selector  # used by the generational loop
+from local_search import EPSILON, improve  # used for the memetic stage
+from adaptive import activity_entropy  # used for adaptive control
+from instrumentation import NULL_METRICS, genome_diversity  # used for phase timings and duplicate shares
+from seeding import GreedyTables, seed_greedy, repair_block  # used for greedy seeds and repairs
+
+# the two GA loops, used by both scripts, the island model and the solver API (and so the sweep and the service)
+#   SteadyStateGA   the minheap script's: each child replaces the current worst member of a PopulationStore
+#   GenerationalGA  the prob dist script's: the whole population is replaced each generation, parents by selection
+# both take the same optional stages: a fitness cache, a warm start's pinned activities (frozen), conflict repair,
+# the memetic stage and an AdaptiveControl; callers keep the outer loop (stopping, printing, results, checkpoints)
+# every method that scores schedules returns the evaluations it spent
+# steady-state children are bred and scored in batches, one batch_fitness call each:
+#   members keep no occupancy counters: on 1000 activities a child 10 activities from its parent costs 285 us as a
+#   copy of the parent's IncrementalFitness moved to it, 103 us in batch_fitness, and the parent's counters take
+#   1.8 ms to build (benchmarks.py --groups engine, the incremental_* cases); smaller instances and children further
+#   from their parents favour the batch even more, and counters on every member tripled the population's memory
+#   the incremental path stays where counters pay for themselves (local search, repair), and children equal to one
+#   of their parents take its score without scoring
+#   children join the population after their batch, so later batches breed from them; one batch per generation
+#   lost about 3 points of fitness at equal evaluations on 100 activities, BATCHES per generation keep the
+#   one-child-at-a-time results at batch speed
+
+BATCHES = 10  # steady-state batches per generation
+
+def offspring(tables, parents, pairs, kind, mutation_rate, rng, out=None, frozen=None, metrics=NULL_METRICS):
+    children = pair_offspring(parents, pairs, kind, rng, out)  # both children of every pair, parents only read
+    metrics.lap("crossover")
+    mutate_block(children, tables, mutation_rate, rng)  # only the picked fields cost anything
+    if frozen is not None:
+        frozen.apply_block(children)  # a warm start's pinned activities stay where they were
+    metrics.lap("mutation")
+    return children
+
+class SteadyStateGA:
+    def __init__(self, tables, population_size=500, mutation_rate=0.01, crossover="uniform", rng=random, cache=None,
+                 metrics=NULL_METRICS, frozen=None, repair=False, memetic=None, memetic_interval=10, memetic_top=5,
+                 memetic_steps=50, control=None, delta_tables=None):
+        self.tables = tables
+        self.delta_tables = delta_tables or DeltaTables(tables)
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.crossover = crossover  # "uniform" or "single_point", the adaptive controller can switch it
+        self.rng = rng
+        self.cache = cache
+        self.metrics = metrics
+        self.frozen = frozen
+        self.repair_tables = GreedyTables(tables, self.delta_tables) if repair else None
+        self.memetic, self.memetic_interval = memetic, memetic_interval
+        self.memetic_top, self.memetic_steps = memetic_top, memetic_steps
+        self.control = control
+        self.batch_size = max(1, -(-population_size // BATCHES))
+        self.population = PopulationStore()
+
+    def seed(self, block=None, greedy_share=0.0, fitness=None):  # random schedules unless a block is given
+        if block is None:
+            block = random_block(self.tables, self.population_size, numpy_rng(self.rng))
+            if greedy_share:  # some schedules built clash-free instead, see seeding.py
+                seed_greedy(block, GreedyTables(self.tables, self.delta_tables), greedy_share, self.rng)
+        spent = 0
+        if fitness is None:  # islands pass the scores their block already has
+            fitness, spent = batch_fitness(self.tables, block), len(block)
+        for f, genome in zip(fitness.tolist(), split_block(self.tables, block)):
+            self.population.add(f, genome)
+        return spent
+
+    def best(self):  # -> (fitness, genome), the best is never the one removed so this is the best so far
+        slot = self.population.best_slot()
+        return self.population.fitness[slot], self.population.genome[slot]
+
+    def breed(self):  # one generation of children, each replacing the current worst -> evaluations spent
+        population, n = self.population, self.population_size
+        rng = numpy_rng(self.rng)
+        slots = list(population)
+        parents = stack_genomes(self.tables, (population.genome[slot] for slot in slots)).copy()
+        parent_fitness = np.array([population.fitness[slot] for slot in slots])
+        row = dict(zip(slots, range(len(slots))))  # slot -> its member's row in parents, children take over the row
+        spent = 0
+        for start in range(0, n, self.batch_size):
+            spent += self.breed_batch(min(self.batch_size, n - start), parents, parent_fitness, row, rng)
+        return spent
+
+    def breed_batch(self, n, parents, parent_fitness, row, rng):  # n children of the current members, scored at once
+        population, metrics = self.population, self.metrics
+        first = rng.integers(0, len(parents), n)  # 2 random parents per child, never the same member twice
+        second = (first + rng.integers(1, len(parents), n)) % len(parents)
+        metrics.lap("selection")
+        masks = crossover_masks(n, parents.shape[1], self.crossover, rng)  # "uniform" or "single_point"
+        children = crossover_block(parents, first, second, masks, np.empty((n,) + parents.shape[1:], parents.dtype))
+        metrics.lap("crossover")
+        mutate_block(children, self.tables, self.mutation_rate, rng)
+        if self.frozen is not None:  # pinned activities go back before the children are scored
+            self.frozen.apply_block(children)
+        metrics.lap("mutation")
+        spent = n
+        if self.repair_tables is not None:  # hard conflicts moved away, see seeding.py
+            spent += repair_block(children, self.repair_tables, self.delta_tables, self.rng)
+            if self.frozen is not None:
+                self.frozen.apply_block(children)
+            metrics.lap("repair")
+        fitness = self.score_children(children, parents, parent_fitness, first, second)
+        metrics.lap("fitness")
+        for i, (f, genome) in enumerate(zip(fitness.tolist(), split_block(self.tables, children))):
+            r = row.pop(population.worst_slot())
+            population.pop_worst()  # remove least fit
+            row[population.add(f, genome)] = r  # insert, the next batch can pick it as a parent
+            parents[r], parent_fitness[r] = children[i], f
+        metrics.lap("update")
+        return spent
+
+    def score_children(self, children, parents, parent_fitness, first, second):  # -> fitness array
+        fitness = np.empty(len(children))
+        same_first = (children == parents[first]).all(axis=(1, 2))
+        same_second = ~same_first & (children == parents[second]).all(axis=(1, 2))
+        fitness[same_first] = parent_fitness[first[same_first]]  # nothing changed, nothing to score
+        fitness[same_second] = parent_fitness[second[same_second]]
+        new = np.flatnonzero(~(same_first | same_second))
+        if len(new):  # the rest in one call
+            score = lambda block: batch_fitness(self.tables, block)
+            fitness[new] = score(children[new]) if self.cache is None else self.cache.score_block(children[new], score)
+        return fitness
+
+    def memetic_stage(self):  # polishes the best few members with single-field moves
+        population = self.population
+        spent = 0
+        for slot in population.top(self.memetic_top):
+            searcher = IncrementalFitness(self.delta_tables, genome_triples(population.genome[slot]))
+            spent += improve(searcher, self.memetic, self.memetic_steps)
+            if self.frozen is not None:
+                self.frozen.restore(searcher)
+            if searcher.fitness > population.fitness[slot] + EPSILON:
+                population.remove(slot)  # replaced in place, the population size does not change
+                population.add(searcher.fitness, genome_from_triples(self.tables, searcher.assignment))
+        return spent
+
+    def add_immigrants(self, count):  # random schedules in place of the worst members
+        block = random_block(self.tables, count, numpy_rng(self.rng))
+        if self.frozen is not None:
+            self.frozen.apply_block(block)
+        for genome, fitness in zip(split_block(self.tables, block), batch_fitness(self.tables, block).tolist()):
+            self.population.pop_worst()
+            self.population.add(fitness, genome)
+        return count
+
+    def step(self, generation):  # breeding, then the memetic stage and adaptive control when they are on
+        spent = self.breed()
+        if self.memetic and generation % self.memetic_interval == 0:
+            spent += self.memetic_stage()
+            self.metrics.lap("local_search")
+        if self.control is not None:  # parents are picked uniformly, so there is no temperature to adapt
+            population = self.population
+            block = stack_genomes(self.tables, (population.genome[slot] for slot in population))
+            share = self.control.observe(generation, self.best()[0], activity_entropy(block, self.tables.sizes),
+                                         population.duplicate_count() / len(population))
+            self.mutation_rate, self.crossover = self.control.mutation_rate, self.control.crossover
+            if share:
+                spent += self.add_immigrants(int(share * self.population_size))
+            self.metrics.lap("update")
+        return spent
+
+class GenerationalGA:
+    def __init__(self, tables, population_size=500, mutation_rate=0.01, selection="softmax", temperature=1.0,
+                 tournament_size=2, crossover="single_point", rng=random, evaluator=None, cache=None,
+                 metrics=NULL_METRICS, frozen=None, repair=False, memetic=None, memetic_interval=10, memetic_top=5,
+                 memetic_steps=50, control=None):
+        self.tables = tables
+        self.delta_tables = DeltaTables(tables)
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.selection, self.temperature, self.tournament_size = selection, temperature, tournament_size
+        self.crossover = crossover
+        self.rng = rng
+        self.evaluator = evaluator  # scoring backend from evaluators.py, batch_fitness when None
+        self.cache = cache
+        self.metrics = metrics
+        self.frozen = frozen
+        self.repair_tables = GreedyTables(tables, self.delta_tables) if repair else None
+        self.memetic, self.memetic_interval = memetic, memetic_interval
+        self.memetic_top, self.memetic_steps = memetic_top, memetic_steps
+        self.control = control
+        self.population = None  # (n x activities x 3) block, see genome.py
+        self.spare = None  # the next generation is written here, then the two swap
+        self.repaired = 0  # repair moves on the current population, counted with the generation that scores it
+        self.previous_average = None  # the halving rule compares each average with the one before
+
+    def seed(self, block=None, greedy_share=0.0):  # scored by the first evaluate()
+        if block is None:
+            block = random_block(self.tables, self.population_size, numpy_rng(self.rng))
+            if greedy_share:  # some schedules built clash-free instead, see seeding.py
+                seed_greedy(block, GreedyTables(self.tables, self.delta_tables), greedy_share, self.rng)
+        self.population = block
+
+    def score(self):  # fitness list of the current population
+        if self.evaluator is None:
+            score = lambda block: batch_fitness(self.tables, block)
+        else:
+            score = self.evaluator.evaluate  # pooled backends give the same scores in the same order
+        if self.cache is None:
+            return score(self.population).tolist()
+        return self.cache.score_block(self.population, score).tolist()  # only schedules not seen before are scored
+
+    def evaluate(self, generation):  # -> (scores, evaluations), the memetic stage runs when it is due
+        scores = self.score()
+        self.metrics.lap("fitness")
+        spent = len(scores) + self.repaired
+        if self.memetic and generation % self.memetic_interval == 0:
+            spent += self.memetic_stage(scores)
+            self.metrics.lap("local_search")
+        return scores, spent
+
+    def memetic_stage(self, scores):  # polishes the best few schedules in place, their scores follow
+        spent = 0
+        for i in sorted(range(len(self.population)), key=scores.__getitem__, reverse=True)[:self.memetic_top]:
+            searcher = IncrementalFitness(self.delta_tables, self.population[i].tolist())
+            spent += improve(searcher, self.memetic, self.memetic_steps)
+            if self.frozen is not None:  # moves on pinned activities are undone, the fitness follows
+                self.frozen.restore(searcher)
+            self.population[i] = searcher.assignment  # never worse than the schedule it started from
+            scores[i] = searcher.fitness
+        return spent
+
+    def breed(self, generation, scores):  # replaces the population with children of the scored one
+        average = sum(scores) / len(scores)
+        immigrants = 0
+        if self.control is not None:  # replaces the halving rule, the rate can go back up when diversity runs out
+            share = self.control.observe(generation, max(scores), activity_entropy(self.population, self.tables.sizes),
+                                         1 - genome_diversity(self.population))
+            self.mutation_rate = self.control.mutation_rate
+            self.temperature, self.crossover = self.control.temperature, self.control.crossover
+            immigrants = int(share * len(self.population))
+        elif self.previous_average is not None and average > self.previous_average:
+            self.mutation_rate = max(0.0001, self.mutation_rate / 2)  # cut in half if the average improved
+        self.previous_average = average
+
+        selector = build_selector(self.selection, scores, self.temperature, self.tournament_size)  # built once
+        self.metrics.lap("selection")
+        rng = numpy_rng(self.rng)  # seeded from the random source, so checkpoints and seeds still cover it
+        pairs = [(selector.sample(self.rng), selector.sample(self.rng)) for _ in range((len(self.population) + 1) // 2)]
+        self.metrics.lap("selection")
+        if self.spare is None or self.spare.shape != self.population.shape:
+            self.spare = np.empty_like(self.population)
+        children = offspring(self.tables, self.population, pairs, self.crossover, self.mutation_rate, rng, self.spare,
+                             self.frozen, self.metrics)
+        self.population, self.spare = children, self.population
+        if self.repair_tables is not None:  # hard conflicts in the children moved away, see seeding.py
+            self.repaired = repair_block(self.population, self.repair_tables, self.delta_tables, self.rng)
+            if self.frozen is not None:
+                self.frozen.apply_block(self.population)
+            self.metrics.lap("repair")
+        if immigrants:  # random schedules in place of some children
+            self.population[:immigrants] = random_block(self.tables, immigrants, numpy_rng(self.rng))
+            if self.frozen is not None:
+                self.frozen.apply_block(self.population[:immigrants])
+        self.metrics.lap("update")
@@ -0,0 +1,58 @@
+# Dylan Orpin
+# Assignment 2 (compact genomes)
+
+# imports
+from array import array  # used for the one-schedule genome
+import numpy as np  # used for whole-population blocks
+
+# a genome is one flat array of small ints, three per activity: room, time, facilitator
+# indexes come from the interned name tables on FitnessTables (room_names, time_names, facilitator_names)
+
+def genome_typecode(tables):  # one byte per field unless an instance has more than 256 of something
+    largest = max(len(tables.room_names), len(tables.time_names), len(tables.facilitator_names))
+    return "B" if largest <= 256 else "H"
+
+def genome_dtype(tables):  # numpy dtype matching the typecode
+    return np.uint8 if genome_typecode(tables) == "B" else np.uint16
+
+def new_genome(tables):  # all zeros, filled in by the caller
+    return array(genome_typecode(tables), [0]) * (len(tables.activity_names) * 3)
+
+# conversion to and from the readable form
+
+def encode_genome(tables, rows):  # (room, time, facilitator) names in activity order -> genome
+    genome = array(genome_typecode(tables))
+    for room, time, facilitator in rows:
+        genome.append(tables.room_index[room])
+        genome.append(tables.time_index[time])
+        genome.append(tables.facilitator_index[facilitator])
+    return genome
+
+def decode_genome(tables, genome):  # genome -> (room, time, facilitator) names in activity order
+    return [(tables.room_names[genome[i]], tables.time_names[genome[i + 1]], tables.facilitator_names[genome[i + 2]])
+            for i in range(0, len(genome), 3)]
+
+def genome_triples(genome):  # genome -> (room, time, facilitator) indexes, the incremental evaluator's input
+    return list(zip(genome[0::3], genome[1::3], genome[2::3]))
+
+def genome_from_triples(tables, triples):  # the reverse, e.g. an incremental evaluator's assignment -> genome
+    return array(genome_typecode(tables), [field for triple in triples for field in triple])
+
+# whole-population blocks, (pop x activities x 3) in the fitness engine's layout
+
+def new_block(tables, n):
+    return np.zeros((n, len(tables.activity_names), 3), dtype=genome_dtype(tables))
+
+def stack_genomes(tables, genomes):  # list of genomes -> block, one copy of the raw bytes
+    genomes = list(genomes)
+    data = b"".join(g.tobytes() for g in genomes)
+    return np.frombuffer(data, dtype=genome_dtype(tables)).reshape(len(genomes), len(tables.activity_names), 3)
+
+def genome_from_bytes(tables, data):  # raw bytes (e.g. sent between processes) -> genome
+    return array(genome_typecode(tables), data)
+
+def block_genome(tables, block, i):  # one row of a block -> genome
+    return genome_from_bytes(tables, block[i].tobytes())
+
+def split_block(tables, block):  # block -> list of genomes
+    return [block_genome(tables, block, i) for i in range(len(block))]
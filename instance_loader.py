@@ -0,0 +1,187 @@
+# Dylan Orpin
+# Assignment 2 (problem instance loader)
+
+# imports
+import csv  # used for the CSV directory layout
+import json  # used for JSON instances
+import os  # used for paths
+import tomllib  # used for TOML instances
+from fitness_engine import FitnessTables  # instances compile straight into the scoring tables
+
+# data definitions
+BUILT_IN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances", "sla.json")  # the assignment's instance
+
+# an instance document (JSON or TOML) looks like:
+#   rooms:          [{name, capacity, building?}]   building defaults to the first word of the name
+#   far_buildings:  [building names], rooms in these count as far from everything else
+#   time_slots:     [{name, position?}] or [name], position gives slot distances (default: clock hour for
+#                   the minheap rules, list order for the prob dist rules)
+#   facilitators:   [{name, load_exempt?}] or [name]
+#   activities:     [{name, enrollment, preferred, others}]
+#   linked_courses: [[section names]], sections of one course follow the SLA100/191 rules
+#   course_pairs:   [[i, j]] indexes into linked_courses that get the SLA100 vs SLA191 rules, default every pair
+#   variant:        "minheap" or "probdist", optional, the caller's variant wins
+#
+# a CSV instance is a directory with rooms.csv (name,capacity[,building]), time_slots.csv (name[,position]),
+# facilitators.csv (name[,load_exempt]), activities.csv (name,enrollment,preferred,others, lists split on ';'),
+# linked_courses.csv (course,section) and an optional far_buildings.csv (building)
+
+class InstanceError(ValueError):  # raised for missing or inconsistent instance data
+    pass
+
+def _named(entries):  # allows plain strings where only a name is needed
+    return [{"name": e} if isinstance(e, str) else dict(e) for e in entries]
+
+def _read_csv(folder, name, required=True):
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        if required:
+            raise InstanceError(f"missing {name} in {folder}")
+        return []
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def _split(value):
+    return [part.strip() for part in (value or "").split(";") if part.strip()]
+
+def _count(row, key, kind):  # whole number cell, e.g. a room's capacity
+    try:
+        return int(row.get(key) or "")
+    except ValueError:
+        raise InstanceError(f"{kind} {row.get('name')} needs a whole number {key}") from None
+
+def _truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def read_csv_instance(folder):  # CSV directory -> instance document
+    courses = {}
+    for row in _read_csv(folder, "linked_courses.csv", required=False):
+        courses.setdefault(row["course"], []).append(row["section"])
+    slots = []
+    for row in _read_csv(folder, "time_slots.csv"):
+        slot = {"name": row["name"]}
+        if row.get("position"):
+            slot["position"] = float(row["position"])
+        slots.append(slot)
+    return {
+        "rooms": [{"name": r["name"], "capacity": _count(r, "capacity", "room"), "building": r.get("building") or None}
+                  for r in _read_csv(folder, "rooms.csv")],
+        "far_buildings": [r["building"] for r in _read_csv(folder, "far_buildings.csv", required=False)],
+        "time_slots": slots,
+        "facilitators": [{"name": r["name"], "load_exempt": _truthy(r.get("load_exempt", ""))}
+                         for r in _read_csv(folder, "facilitators.csv")],
+        "activities": [{"name": r["name"], "enrollment": _count(r, "enrollment", "activity"),
+                        "preferred": _split(r.get("preferred")), "others": _split(r.get("others"))}
+                       for r in _read_csv(folder, "activities.csv")],
+        "linked_courses": list(courses.values()),
+    }
+
+def read_instance(path):  # file or directory -> instance document
+    if os.path.isdir(path):
+        return read_csv_instance(path)
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    raise InstanceError(f"unsupported instance format: {path}")
+
+def compile_instance(document, variant=None):  # instance document -> FitnessTables, all strings resolved here
+    variant = variant or document.get("variant", "minheap")
+    rooms = _named(document.get("rooms", []))
+    slots = _named(document.get("time_slots", []))
+    facilitators = _named(document.get("facilitators", []))
+    activities = document.get("activities", [])
+    if not rooms or not slots or not facilitators or not activities:
+        raise InstanceError("an instance needs rooms, time_slots, facilitators and activities")
+
+    room_names = [room["name"] for room in rooms]
+    facilitator_names = [f["name"] for f in facilitators]
+    activity_names = [a["name"] for a in activities]
+    for kind, names in (("room", room_names), ("time slot", [s["name"] for s in slots]),
+                        ("facilitator", facilitator_names), ("activity", activity_names)):
+        if len(set(names)) != len(names):
+            raise InstanceError(f"duplicate {kind} names")
+    for kind, key, entries in (("room", "capacity", rooms), ("activity", "enrollment", activities)):
+        for entry in entries:
+            value = entry.get(key)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise InstanceError(f"{kind} {entry['name']} needs a whole number {key}")
+    known = set(facilitator_names)
+    for activity in activities:
+        unknown = [f for f in activity.get("preferred", []) + activity.get("others", []) if f not in known]
+        if unknown:
+            raise InstanceError(f"{activity['name']} lists unknown facilitators: {', '.join(unknown)}")
+    linked = [list(course) for course in document.get("linked_courses", [])]
+    for course in linked:
+        missing = [name for name in course if name not in set(activity_names)]
+        if missing:
+            raise InstanceError(f"linked course names unknown activities: {', '.join(missing)}")
+    course_pairs = document.get("course_pairs")
+    if course_pairs is not None:
+        course_pairs = [tuple(pair) for pair in course_pairs]
+        if any(not 0 <= i < len(linked) for pair in course_pairs for i in pair):
+            raise InstanceError("course_pairs points past linked_courses")
+
+    far = set(document.get("far_buildings", []))
+    zones = [int((room.get("building") or room["name"].split()[0]) in far) for room in rooms]
+    positions = None
+    if all("position" in slot for slot in slots):
+        positions = [slot["position"] for slot in slots]
+    elif any("position" in slot for slot in slots):
+        raise InstanceError("either every time slot has a position or none do")
+    elif variant == "minheap":  # the minheap rules read the clock hour off the slot name, e.g. "10 AM"
+        unreadable = [slot["name"] for slot in slots if not slot["name"].strip().split(" ", 1)[0].isdigit()]
+        if unreadable:
+            raise InstanceError(f"time slots {', '.join(unreadable)} do not start with a clock hour, "
+                                "give every time slot a position")
+
+    return FitnessTables(
+        {room["name"]: room["capacity"] for room in rooms},
+        [slot["name"] for slot in slots],
+        facilitator_names,
+        {a["name"]: {"enrollment": a["enrollment"], "preferred": a.get("preferred", []),
+                     "others": a.get("others", [])} for a in activities},
+        variant,
+        linked_courses=linked,
+        room_zones=zones,
+        load_exempt=[f["name"] for f in facilitators if f.get("load_exempt")],
+        slot_positions=positions,
+        course_pairs=course_pairs,
+    )
+
+def load_instance(path, variant=None):  # file or directory -> FitnessTables
+    return compile_instance(read_instance(path), variant)
+
+# synthetic instances, used for benchmarks and for trying engines on larger problems
+
+def synthetic_instance(n_activities, seed=0):  # instance document with roughly campus-like proportions
+    import random  # only needed here
+    rng = random.Random(seed)
+    n_slots = 6 if n_activities <= 60 else min(40, 6 + n_activities // 100)
+    n_rooms = max(9, int(1.5 * n_activities / n_slots))
+    n_facilitators = max(10, n_activities // 3)
+    buildings = [f"B{i}" for i in range(max(3, n_rooms // 8))]
+    rooms = [{"name": f"{rng.choice(buildings)} {100 + i}", "capacity": rng.choice([30, 45, 50, 60, 75, 108, 450]),
+              "building": None} for i in range(n_rooms)]
+    for room in rooms:
+        room["building"] = room["name"].split()[0]
+    facilitators = [f"F{i}" for i in range(n_facilitators)]
+    activities = []
+    for i in range(n_activities):
+        chosen = rng.sample(facilitators, min(len(facilitators), 8))
+        activities.append({"name": f"A{i}", "enrollment": rng.choice([20, 25, 50, 60, 100]),
+                           "preferred": chosen[:3], "others": chosen[3:]})
+    linked = [[f"A{i}", f"A{i + 1}"] for i in range(0, min(n_activities - 1, max(4, n_activities // 20)), 2)]
+    pairs = [[i, i + 1] for i in range(0, len(linked) - 1, 2)]  # courses related two by two, like SLA100/191
+    return {
+        "name": f"synthetic-{n_activities}",
+        "rooms": rooms,
+        "far_buildings": buildings[:max(1, len(buildings) // 4)],
+        "time_slots": [{"name": f"slot {i}", "position": i} for i in range(n_slots)],
+        "facilitators": [{"name": name, "load_exempt": i == 0} for i, name in enumerate(facilitators)],
+        "activities": activities,
+        "linked_courses": linked,
+        "course_pairs": pairs,
+    }
@@ -0,0 +1,181 @@
+# Dylan Orpin
+# Assignment 2 (run metrics and profiling)
+
+# imports
+import cProfile  # used for the optional profiler window
+import csv  # used for the CSV sink
+import json  # used for the JSONL sink
+import os  # used for reading the resident set size
+import resource  # used as the fallback for the resident set size
+import time  # used for the phase timers
+import numpy as np  # used for the diversity measure
+
+# data definitions
+PHASES = ["selection", "crossover", "mutation", "fitness", "repair", "update", "local_search"]  # where a generation's time goes
+
+def rss_mb():  # current resident set size, peak size where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if os.uname().sysname == "Darwin" else peak / 2 ** 10
+
+# sinks, each receives one dict per generation
+
+class MemorySink:  # keeps records in a list, handy for tests and notebooks
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+class CallbackSink:  # hands each record to a function
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, record):
+        self.callback(record)
+
+    def close(self):
+        pass
+
+class JsonlSink:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.close()
+
+class CsvSink:  # phase times are flattened into <phase>_seconds columns
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = None
+
+    def write(self, record):
+        row = {k: v for k, v in record.items() if k != "phases"}
+        row.update({f"{phase}_seconds": seconds for phase, seconds in record["phases"].items()})
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(row))
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+# recorder used by the GA loops
+#   metrics.start_generation(gen)   starts the generation clock and the lap timer
+#   metrics.lap(phase)              charges the time since the previous lap to phase
+#   metrics.end_generation(...)     builds the record and sends it to every sink
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, sinks, profile_window=None, profile_output="profile.out"):
+        self.sinks = list(sinks)
+        self.profile_window = profile_window  # (first, last) generation numbers, both included
+        self.profile_output = profile_output
+        self.profiler = None
+        self.generation = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.started = 0.0
+        self.last = 0.0
+        self.cache_seen = (0, 0)
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        if self.profile_window and generation == self.profile_window[0]:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] += now - self.last
+        self.last = now
+
+    def end_generation(self, evaluations, best_fitness=None, avg_fitness=None, diversity=None, cache=None):
+        wall = time.perf_counter() - self.started
+        if self.profiler is not None and self.generation >= self.profile_window[1]:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_output)
+            self.profiler = None
+        record = {
+            "generation": self.generation,
+            "wall_seconds": wall,
+            "phases": dict(self.phases),
+            "evaluations": evaluations,
+            "evaluations_per_second": evaluations / wall if wall else None,
+            "best_fitness": best_fitness,
+            "avg_fitness": avg_fitness,
+            "diversity": diversity,
+            "cache_hit_rate": None,
+            "rss_mb": rss_mb(),
+        }
+        if cache is not None:  # hit rate for this generation only
+            hits, misses = cache.hits - self.cache_seen[0], cache.misses - self.cache_seen[1]
+            self.cache_seen = (cache.hits, cache.misses)
+            record["cache_hit_rate"] = hits / (hits + misses) if hits + misses else None
+        for sink in self.sinks:
+            sink.write(record)
+        return record
+
+    def close(self):
+        if self.profiler is not None:  # run ended inside the window
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_output)
+            self.profiler = None
+        for sink in self.sinks:
+            sink.close()
+
+class NullMetrics:  # used when metrics are off, every call returns straight away
+    enabled = False
+
+    def start_generation(self, generation):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def end_generation(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+# helpers for the command line
+
+def parse_window(text):  # "10:20" -> (10, 20), "15" -> (15, 15)
+    first, _, last = text.partition(":")
+    return int(first), int(last or first)
+
+def metrics_from_args(jsonl=None, csv_path=None, profile=None, profile_output="profile.out"):
+    sinks = []
+    if jsonl:
+        sinks.append(JsonlSink(jsonl))
+    if csv_path:
+        sinks.append(CsvSink(csv_path))
+    if not sinks and not profile:
+        return NULL_METRICS
+    return Metrics(sinks, parse_window(profile) if profile else None, profile_output)
+
+def add_metrics_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--metrics-jsonl", default=None, help="write per-generation metrics as JSON lines here")
+    parser.add_argument("--metrics-csv", default=None, help="write per-generation metrics as CSV here")
+    parser.add_argument("--profile", default=None, help="cProfile generations FIRST[:LAST], e.g. 10:20")
+    parser.add_argument("--profile-output", default="profile.out", help="where the cProfile stats are written")
+
+def genome_diversity(block):  # share of distinct schedules in a (pop x activities x 3) block
+    if len(block) == 0:
+        return None
+    flat = np.ascontiguousarray(block).reshape(len(block), -1)
+    return len(np.unique(flat, axis=0)) / len(block)
@@ -0,0 +1,111 @@
+# Dylan Orpin
+# Assignment 2 (island model)
+
+# imports
+import random  # used for per-island random sources and the random topology
+from concurrent.futures import ProcessPoolExecutor  # used to run islands on separate cores
+import numpy as np  # used for migrant selection
+from fitness_engine import batch_fitness  # used for scoring fresh islands
+from delta_fitness import DeltaTables  # used for the incremental scoring tables, built once per worker
+from genome import stack_genomes, genome_from_bytes  # used for compact populations
+from operators import numpy_rng, random_block  # used for fresh islands
+from ga_engines import SteadyStateGA  # used for the population inside each island
+from run_config import stream_seed  # used for per-island random streams
+
+# every worker keeps its own copy of the tables, sent once when the worker starts
+_tables = None
+_delta_tables = None
+
+def _init_worker(tables):
+    global _tables, _delta_tables
+    _tables = tables
+    _delta_tables = DeltaTables(tables)
+
+# one island: the minheap script's steady-state loop, SteadyStateGA without the optional stages
+
+def _run_epoch(block, fitness, generations, mutation_rate, seed):  # runs `generations` generations on one island
+    engine = SteadyStateGA(_tables, len(block), mutation_rate, rng=random.Random(seed), delta_tables=_delta_tables)
+    engine.seed(block, fitness=fitness)
+    for _ in range(generations):
+        engine.breed()
+
+    population = engine.population
+    slots = list(population)
+    block = stack_genomes(_tables, (population.genome[slot] for slot in slots))
+    fitness = np.array([population.fitness[slot] for slot in slots])
+    best_fitness, best_genome = engine.best()
+    return block, fitness, best_fitness, best_genome.tobytes()
+
+def _new_island(population_size, seed):  # random starting population scored in one batch
+    block = random_block(_tables, population_size, numpy_rng(random.Random(seed)))
+    return block, batch_fitness(_tables, block)
+
+def _island_task(block, fitness, population_size, generations, mutation_rate, seed):
+    if block is None:
+        block, fitness = _new_island(population_size, seed)
+    return _run_epoch(block, fitness, generations, mutation_rate, seed + 1)
+
+# migration, islands send copies of their top-k schedules and drop their worst-k
+
+def migration_targets(n_islands, topology, rng):  # island i sends to targets[i]
+    if topology == "ring":
+        return [(i + 1) % n_islands for i in range(n_islands)]
+    if topology == "random":
+        return [rng.choice([j for j in range(n_islands) if j != i]) for i in range(n_islands)]
+    raise ValueError(f"unknown migration topology: {topology}")
+
+def migrate(islands, migrants, topology, rng):  # islands is a list of (block, fitness), changed in place
+    if migrants <= 0:  # argsort(...)[-0:] would be every schedule
+        return
+    targets = migration_targets(len(islands), topology, rng)
+    outgoing = []
+    for block, fitness in islands:
+        top = np.argsort(fitness)[-migrants:]
+        outgoing.append((block[top].copy(), fitness[top].copy()))
+    incoming = [[] for _ in islands]
+    for source, target in enumerate(targets):
+        incoming[target].append(outgoing[source])
+    for i, arrivals in enumerate(incoming):
+        if not arrivals:
+            continue
+        block, fitness = islands[i]
+        new_genomes = np.concatenate([a[0] for a in arrivals])
+        new_fitness = np.concatenate([a[1] for a in arrivals])
+        worst = np.argsort(fitness)[:len(new_genomes)]
+        block, fitness = block.copy(), fitness.copy()
+        block[worst] = new_genomes[:len(worst)]
+        fitness[worst] = new_fitness[:len(worst)]
+        islands[i] = (block, fitness)
+
+# main island loop
+
+def run_islands(tables, n_islands=4, population_size=500, generations=300, migration_interval=10, migrants=5,
+                topology="ring", mutation_rate=0.01, seed=None, workers=None, report=print):
+    if n_islands < 2:
+        raise ValueError("island mode needs at least 2 islands")
+    streams = np.random.SeedSequence(seed).spawn(n_islands + 1)  # one per island, the last one for migration
+    rng = random.Random(stream_seed(streams[-1]))
+    islands = [(None, None)] * n_islands
+    best_fitness, best_genome = None, None
+    done = 0
+
+    with ProcessPoolExecutor(max_workers=workers or n_islands, initializer=_init_worker, initargs=(tables,)) as pool:
+        while done < generations:
+            epoch = min(migration_interval, generations - done)
+            futures = [
+                pool.submit(_island_task, block, fitness, population_size, epoch, mutation_rate,
+                            stream_seed(stream.spawn(1)[0]))  # a new child stream every epoch, whoever runs it
+                for (block, fitness), stream in zip(islands, streams)
+            ]
+            islands = []
+            for future in futures:
+                block, fitness, island_best, island_genome = future.result()
+                islands.append((block, fitness))
+                if best_fitness is None or island_best > best_fitness:
+                    best_fitness, best_genome = island_best, island_genome
+            done += epoch
+            report(f"Generation {done}: Best Fitness = {best_fitness:.3f} across {n_islands} islands")
+            if done < generations:
+                migrate(islands, migrants, topology, rng)
+
+    return best_fitness, genome_from_bytes(tables, best_genome)
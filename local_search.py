@@ -0,0 +1,101 @@
+# Dylan Orpin
+# Assignment 2 (memetic local search)
+
+# imports
+from fitness_engine import ROOM, TIME, FACILITATOR  # field positions
+
+# a move changes one field (room, time or facilitator) of one activity
+# moves are scored with IncrementalFitness.move_delta, so each one costs O(1) plus the activity's SLA pair terms
+# instead of a full compute_fitness call; every scored move counts as one evaluation
+# only activities that break a constraint are moved (room/facilitator clash, a room or facilitator scoring below
+# the activity's best); once none do, every activity is tried so the SLA pair rules still get polished
+
+# data definitions
+EPSILON = 1e-9  # smaller gains are rounding, not improvements
+
+def _sizes(evaluator):
+    t = evaluator.tables
+    return ((ROOM, t.n_rooms), (TIME, t.n_times), (FACILITATOR, t.n_facilitators))
+
+def conflicted(evaluator):  # activities with something to fix, read straight off the occupancy counters
+    t = evaluator.tables
+    found = []
+    for a, (room, time, facilitator) in enumerate(evaluator.assignment):
+        if evaluator.room_counts[room * t.n_times + time] > 1 \
+                or evaluator.facilitator_counts[facilitator * t.n_times + time] > 1 \
+                or t.room_score[a][room] < t.best_room_score[a] \
+                or t.facilitator_score[a][facilitator] < t.best_facilitator_score[a]:
+            found.append(a)
+    return found or range(len(evaluator.assignment))
+
+def best_move(evaluator, tabu=(), aspiration=None, everything=False):  # -> (delta, activity, new assignment, evaluations)
+    best = (float("-inf"), None, None)
+    evaluations = 0
+    for a in range(len(evaluator.assignment)) if everything else conflicted(evaluator):
+        current = evaluator.assignment[a]
+        for field, size in _sizes(evaluator):
+            for value in range(size):
+                if value == current[field]:
+                    continue
+                move = current[:]
+                move[field] = value
+                delta = evaluator.move_delta(a, *move)
+                evaluations += 1
+                if (a, field, value) in tabu and (aspiration is None or evaluator.fitness + delta <= aspiration + EPSILON):
+                    continue  # tabu unless it beats the best schedule found so far
+                if delta > best[0]:
+                    best = (delta, a, move)
+    return best + (evaluations,)
+
+def hill_climb(evaluator, max_steps=50):  # steepest ascent until no single move helps, changes evaluator -> evaluations
+    evaluations = 0
+    for _ in range(max_steps):
+        delta, a, move, spent = best_move(evaluator)
+        evaluations += spent
+        if a is None or delta <= EPSILON:  # nothing left among the conflicts, one last look at every activity
+            delta, a, move, spent = best_move(evaluator, everything=True)
+            evaluations += spent
+        if a is None or delta <= EPSILON:
+            break
+        evaluator.set(a, *move)
+    return evaluations
+
+def tabu_search(evaluator, max_steps=50, tenure=7, patience=10):  # best non-tabu move even when it is worse
+    evaluations = 0
+    best_fitness = evaluator.fitness
+    best_assignment = [entry[:] for entry in evaluator.assignment]
+    tabu = {}  # (activity, field, old value) -> step it stays forbidden until, stops a move being undone at once
+    since_best = 0
+    for step in range(max_steps):
+        delta, a, move, spent = best_move(evaluator, {k for k, until in tabu.items() if until > step}, best_fitness)
+        evaluations += spent
+        if a is None:
+            break
+        for field, _ in _sizes(evaluator):
+            if move[field] != evaluator.assignment[a][field]:
+                tabu[(a, field, evaluator.assignment[a][field])] = step + tenure
+        evaluator.set(a, *move)
+        if evaluator.fitness > best_fitness + EPSILON:
+            best_fitness = evaluator.fitness
+            best_assignment = [entry[:] for entry in evaluator.assignment]
+            since_best = 0
+        else:
+            since_best += 1
+            if since_best >= patience:
+                break
+    evaluator.apply(best_assignment)  # end on the best schedule seen, not the last one
+    return evaluations
+
+LOCAL_SEARCH = {"hill": hill_climb, "tabu": tabu_search}
+
+def improve(evaluator, method="hill", max_steps=50):  # -> evaluations spent, evaluator ends on the improved schedule
+    if method not in LOCAL_SEARCH:
+        raise ValueError(f"unknown local search: {method}")
+    return LOCAL_SEARCH[method](evaluator, max_steps)
+
+def add_memetic_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--memetic", choices=sorted(LOCAL_SEARCH), default=None,
+                        help="polish the best schedules with hill climbing or tabu search")
+    parser.add_argument("--memetic-interval", type=int, default=10, help="generations between local search rounds")
+    parser.add_argument("--memetic-top", type=int, default=5, help="schedules polished per round")
+    parser.add_argument("--memetic-steps", type=int, default=50, help="moves per schedule per round")
@@ -0,0 +1,97 @@
+# Dylan Orpin
+# Assignment 2 (genome operators)
+
+# imports
+import random  # default random source, any random.Random instance works too
+import numpy as np  # used for drawing a whole batch of random fields at once
+from genome import genome_dtype  # used for block dtypes
+
+# genomes hold room, time and facilitator indexes, 3 per activity (see genome.py)
+
+def random_genome(genome, tables, rng=random):  # fills a genome with random assignments
+    n_rooms, n_times, n_facilitators = len(tables.room_names), len(tables.time_names), len(tables.facilitator_names)
+    for i in range(0, len(genome), 3):
+        genome[i] = rng.randrange(n_rooms)
+        genome[i + 1] = rng.randrange(n_times)
+        genome[i + 2] = rng.randrange(n_facilitators)
+    return genome
+
+def uniform_crossover(genome1, genome2, rng=random):  # each activity comes from either parent
+    child = genome1[:]  # child owns its genome, parents are never changed
+    for i in range(0, len(child), 3):
+        if rng.random() >= 0.5:
+            child[i:i + 3] = genome2[i:i + 3]
+    return child
+
+def single_point_crossover(genome1, genome2, rng=random):  # cut between two activities, swap the tails
+    point = 3 * rng.randint(1, len(genome1) // 3 - 1)
+    return genome1[:point] + genome2[point:], genome2[:point] + genome1[point:]  # slicing copies
+
+def mutate_genome(genome, tables, mutation_rate, rng=random):  # each field re-drawn with probability mutation_rate
+    n_rooms, n_times, n_facilitators = len(tables.room_names), len(tables.time_names), len(tables.facilitator_names)
+    for i in range(0, len(genome), 3):
+        if rng.random() < mutation_rate:
+            genome[i] = rng.randrange(n_rooms)
+        if rng.random() < mutation_rate:
+            genome[i + 1] = rng.randrange(n_times)
+        if rng.random() < mutation_rate:
+            genome[i + 2] = rng.randrange(n_facilitators)
+    return genome
+
+# batched versions, every random number for a generation is drawn in a few numpy calls
+# the numpy Generator is seeded from the random source, so random.seed and checkpoints still cover it
+
+def numpy_rng(rng=random):
+    return np.random.default_rng(rng.getrandbits(64))
+
+def _field_sizes(tables):
+    return np.array([len(tables.room_names), len(tables.time_names), len(tables.facilitator_names)])
+
+def random_block(tables, n, rng=None):  # n random genomes as a (n x activities x 3) block
+    rng = rng or numpy_rng()
+    return rng.integers(0, _field_sizes(tables), size=(n, len(tables.activity_names), 3), dtype=genome_dtype(tables))
+
+def mutation_sites(n_fields, mutation_rate, rng):  # sorted flat indexes, each field picked with probability mutation_rate
+    if mutation_rate <= 0 or n_fields == 0:
+        return np.zeros(0, dtype=np.int64)
+    if mutation_rate >= 1:
+        return np.arange(n_fields)
+    expected = n_fields * mutation_rate
+    gaps = rng.geometric(mutation_rate, size=int(expected + 4 * expected ** 0.5) + 16)  # distance to the next site
+    sites = np.cumsum(gaps) - 1
+    while sites[-1] < n_fields:  # rarely needed, the first draw covers the expected count plus 4 sigma
+        sites = np.concatenate([sites, sites[-1] + np.cumsum(rng.geometric(mutation_rate, size=len(gaps)))])
+    return sites[:np.searchsorted(sites, n_fields)]
+
+def mutate_block(block, tables, mutation_rate, rng=None):  # same odds as mutate_genome, in place, only picked fields cost
+    rng = rng or numpy_rng()
+    flat = block.reshape(-1)
+    sites = mutation_sites(len(flat), mutation_rate, rng)
+    flat[sites] = rng.integers(0, _field_sizes(tables)[sites % 3])
+    return block
+
+# block crossover for generational loops, children are written into a preallocated buffer
+# parents are only read, so a child never shares data with them and scores stay attached to the genomes they scored
+
+def crossover_masks(n, n_activities, kind="single_point", rng=None):  # (n x activities), True -> from the first parent
+    rng = rng or numpy_rng()
+    if kind == "uniform":
+        return rng.random((n, n_activities)) < 0.5
+    points = rng.integers(1, n_activities, size=n)  # cut between two activities, as single_point_crossover
+    return np.arange(n_activities)[None, :] < points[:, None]
+
+def crossover_block(parents, first, second, masks, out):  # out[i] = parents[first[i]] where masks[i], else second[i]
+    np.take(parents, second, axis=0, out=out)
+    np.copyto(out, parents[first], where=masks[:, :, None])
+    return out
+
+def pair_offspring(parents, pairs, kind="single_point", rng=None, out=None):  # two children per (parent1, parent2) row
+    rng = rng or numpy_rng()
+    n = len(out) if out is not None else 2 * len(pairs)
+    pairs = np.asarray(pairs)
+    first = pairs.reshape(-1)[:n]  # child 2k takes parent1's side of the mask, child 2k + 1 parent2's
+    second = pairs[:, ::-1].reshape(-1)[:n]
+    masks = np.repeat(crossover_masks(len(pairs), parents.shape[1], kind, rng), 2, axis=0)[:n]
+    if out is None:
+        out = np.empty((n,) + parents.shape[1:], dtype=parents.dtype)
+    return crossover_block(parents, first, second, masks, out)
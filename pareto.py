@@ -0,0 +1,172 @@
+# Dylan Orpin
+# Assignment 2 (multi-objective Pareto mode)
+
+# imports
+import csv  # used for the .csv front export
+import json  # used for the .json front export
+import os  # used for file extensions
+import numpy as np  # used for objective arrays
+from fitness_engine import OBJECTIVES, batch_objectives  # used for scoring the fitness terms separately
+from genome import block_genome, decode_genome  # used for readable schedules
+from operators import numpy_rng, random_block  # used for the starting population
+from ga_engines import offspring  # used for building children, as the generational GA does
+from results import NULL_WRITER, generation_record  # used for streamed results
+
+# every objective in OBJECTIVES is maximized, their sum is the weighted fitness the single-objective GAs use
+# one NSGA-II run returns the whole set of trade-offs instead of one schedule per choice of weights
+
+FRONT_FORMATS = (".json", ".csv")
+
+# non-dominated sorting, efficient non-dominated sort with binary search (ENS-BS):
+#   solutions are taken in decreasing lexicographic order, so a solution can only be dominated by earlier ones
+#   if front k does not dominate a solution, no later front does either, so its front is found by binary search
+#   each check is one vectorized comparison against a front, about O(M N log N) comparisons instead of O(M N^2)
+#   GA populations repeat objective vectors a lot, so only distinct vectors are sorted, copies share their front
+
+class _Front:  # members of one front and their objective rows, grown by doubling
+    def __init__(self, width):
+        self.rows = np.empty((8, width))
+        self.members = []
+
+    def dominates(self, row):  # does any member dominate row
+        rows = self.rows[:len(self.members)]
+        return bool(np.any(np.all(rows >= row, axis=1) & np.any(rows > row, axis=1)))
+
+    def add(self, i, row):
+        if len(self.members) == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.empty_like(self.rows)])
+        self.rows[len(self.members)] = row
+        self.members.append(i)
+
+def non_dominated_sort(objectives):  # (n x m) -> list of index arrays, the non-dominated front first
+    objectives = np.asarray(objectives, dtype=float)
+    distinct, copies = np.unique(objectives, axis=0, return_inverse=True)  # sorted, first objective is the primary key
+    fronts = []
+    for i in range(len(distinct) - 1, -1, -1):
+        row = distinct[i]
+        low, high = 0, len(fronts)
+        while low < high:
+            middle = (low + high) // 2
+            if fronts[middle].dominates(row):
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(fronts):
+            fronts.append(_Front(objectives.shape[1]))
+        fronts[low].add(i, row)
+    rank = np.empty(len(distinct), dtype=np.intp)
+    for number, front in enumerate(fronts):
+        rank[front.members] = number
+    rank = rank[copies.reshape(-1)]
+    return [np.flatnonzero(rank == number) for number in range(len(fronts))]
+
+def crowding_distance(objectives):  # (n x m) for one front -> (n,), boundary solutions get infinity
+    n = len(objectives)
+    distance = np.zeros(n)
+    if n < 3:
+        distance[:] = np.inf
+        return distance
+    for column in objectives.T:
+        order = np.argsort(column, kind="stable")
+        span = column[order[-1]] - column[order[0]]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (column[order[2:]] - column[order[:-2]]) / span
+    return distance
+
+def rank_and_crowding(objectives):  # -> (front number, crowding distance) per solution
+    rank = np.empty(len(objectives), dtype=np.intp)
+    crowding = np.empty(len(objectives))
+    for number, front in enumerate(non_dominated_sort(objectives)):
+        rank[front] = number
+        crowding[front] = crowding_distance(objectives[front])
+    return rank, crowding
+
+def survivors(rank, crowding, n):  # the n best by front, ties in the last front broken by crowding distance
+    return np.lexsort((-crowding, rank))[:n]
+
+def tournament(rank, crowding, k, rng):  # k binary tournaments on the crowded comparison
+    a = rng.integers(0, len(rank), k)
+    b = rng.integers(0, len(rank), k)
+    a_wins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowding[a] > crowding[b]))
+    return np.where(a_wins, a, b)
+
+# NSGA-II loop, generational like the prob dist script: parents by crowded tournament, block crossover and
+# mutation, then parents and children compete for the next population
+
+def run_nsga2(tables, population_size=500, generations=200, mutation_rate=0.01, crossover="single_point", rng=None,
+              stopping=None, results=NULL_WRITER, report=print):  # -> (front genomes block, front objectives)
+    rng = rng or numpy_rng()
+    population = random_block(tables, population_size, rng)
+    objectives = batch_objectives(tables, population)
+    rank, crowding = rank_and_crowding(objectives)
+    if stopping is not None:
+        stopping.evaluations += population_size
+    children = np.empty_like(population)
+    for gen in range(generations):
+        parents = tournament(rank, crowding, 2 * ((population_size + 1) // 2), rng).reshape(-1, 2)
+        offspring(tables, population, parents, crossover, mutation_rate, rng, children)
+        merged = np.concatenate([population, children])
+        merged_objectives = np.concatenate([objectives, batch_objectives(tables, children)])
+        merged_rank, merged_crowding = rank_and_crowding(merged_objectives)
+        keep = survivors(merged_rank, merged_crowding, population_size)  # whole fronts, so ranks do not change
+        population, objectives = merged[keep], merged_objectives[keep]
+        rank, crowding = merged_rank[keep], merged_crowding[keep]
+
+        best = float(objectives.sum(axis=1).max())
+        results.write(generation_record(gen + 1, best, evaluations=population_size))
+        if report is not None:
+            report(f"Generation {gen + 1}: Front = {int((rank == 0).sum())} schedules, "
+                   f"Best Weighted Fitness = {best:.3f}")
+        if stopping is not None:
+            reason = stopping.update(gen + 1, best, best, population_size)
+            if reason:
+                print(f"Stopping early: {reason}")
+                break
+    results.close()
+    return pareto_front(population, objectives)
+
+def pareto_front(population, objectives):  # distinct non-dominated schedules, best weighted fitness first
+    front = non_dominated_sort(objectives)[0]
+    _, first = np.unique(population[front].reshape(len(front), -1), axis=0, return_index=True)
+    front = front[first]
+    front = front[np.argsort(-objectives[front].sum(axis=1), kind="stable")]
+    return population[front], objectives[front]
+
+# reporting
+
+def format_front(objectives):  # one line per distinct trade-off, objectives, weighted fitness, schedules with it
+    lines = ["  ".join(f"{name:>22}" for name in OBJECTIVES + ("fitness", "schedules"))]
+    distinct, counts = np.unique(np.round(objectives, 9), axis=0, return_counts=True)
+    for row, count in sorted(zip(distinct.tolist(), counts.tolist()), key=lambda item: -sum(item[0])):
+        lines.append("  ".join(f"{value:>22.3f}" for value in row + [sum(row)]) + f"  {count:>22}")
+    return "\n".join(lines)
+
+def export_front(tables, genomes, objectives, path):  # .json with every schedule, or a .csv row per schedule
+    schedules = [decode_genome(tables, block_genome(tables, genomes, i)) for i in range(len(genomes))]
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FRONT_FORMATS:  # check_pareto_arguments refuses these before a run
+        raise ValueError(f"unknown front format {extension!r}, use .json or .csv")
+    if extension == ".json":
+        with open(path, "w") as f:
+            json.dump({"objectives": list(OBJECTIVES), "front": [
+                {"objectives": dict(zip(OBJECTIVES, row.tolist())), "fitness": float(row.sum()),
+                 "assignments": [{"activity": activity, "room": room, "time": slot, "facilitator": facilitator}
+                                 for activity, (room, slot, facilitator) in zip(tables.activity_names, schedule)]}
+                for row, schedule in zip(objectives, schedules)]}, f, indent=2)
+    elif extension == ".csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(list(OBJECTIVES) + ["fitness"] + list(tables.activity_names))
+            for row, schedule in zip(objectives, schedules):
+                writer.writerow(row.tolist() + [float(row.sum())] + [f"{room} @ {slot} with {facilitator}"
+                                                                     for room, slot, facilitator in schedule])
+
+def add_pareto_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--pareto", action="store_true",
+                        help="NSGA-II over the separate fitness terms, returns the whole Pareto front")
+    parser.add_argument("--front", default="pareto_front.json", help="where --pareto writes the front (.json/.csv)")
+
+def check_pareto_arguments(parser, args):  # an unknown front format fails before the run, not after it
+    if args.pareto and os.path.splitext(args.front)[1].lower() not in FRONT_FORMATS:
+        parser.error(f"--front needs one of {', '.join(FRONT_FORMATS)}")
@@ -0,0 +1,217 @@
+# Dylan Orpin
+# Assignment 2 (steady-state population store)
+
+# imports
+import random  # default random source, any random.Random instance works too
+import heapq  # used for top-k iteration
+
+# members live in numbered slots, slot numbers are reused after a member is removed
+# store.fitness[slot], store.genome[slot] and store.data[slot] are public, data is free for the caller
+#
+# complexity, n = members, L = genome length:
+#   add                O(log n + L)   two heap inserts plus the genome hash
+#   pop_worst, remove  O(log n + L)
+#   best_slot, worst_slot O(1)
+#   sample(k)          O(k)           uniform, distinct members
+#   sample_ranked      O(size)        tournament of `size` uniform draws, size 2 gives linear rank bias
+#   top(k)             O(k log k)     walks the max-heap, best first
+#   has_genome         O(L)
+#   duplicate_count    O(1)
+#
+# state() and from_state() copy the slot layout, ages and heap order exactly, so a store rebuilt from a
+# checkpoint samples and breaks ties the same way the original would have
+
+class _IndexedHeap:  # binary heap of slots on key[slot], remembers where each slot sits so any slot can be removed
+    def __init__(self, key):
+        self.key = key  # list of comparable keys, indexed by slot
+        self.heap = []
+        self.position = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def top(self):
+        return self.heap[0]
+
+    def push(self, slot):
+        self.heap.append(slot)
+        self.position[slot] = len(self.heap) - 1
+        self._up(len(self.heap) - 1)
+
+    def remove(self, slot):
+        i = self.position.pop(slot)
+        last = self.heap.pop()
+        if i < len(self.heap):  # move the last slot into the hole and restore order
+            self.heap[i] = last
+            self.position[last] = i
+            self._up(i)
+            self._down(self.position[last])
+
+    def _up(self, i):
+        heap, key, position = self.heap, self.key, self.position
+        slot = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if key[heap[parent]] <= key[slot]:
+                break
+            heap[i] = heap[parent]
+            position[heap[i]] = i
+            i = parent
+        heap[i] = slot
+        position[slot] = i
+
+    def _down(self, i):
+        heap, key, position = self.heap, self.key, self.position
+        n = len(heap)
+        slot = heap[i]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and key[heap[child + 1]] < key[heap[child]]:
+                child += 1
+            if key[slot] <= key[heap[child]]:
+                break
+            heap[i] = heap[child]
+            position[heap[i]] = i
+            i = child
+        heap[i] = slot
+        position[slot] = i
+
+class PopulationStore:
+    def __init__(self):
+        self.fitness = []
+        self.genome = []
+        self.data = []
+        self._next_age = 0  # ties go to the older member, like the old (fitness, counter) heap entries
+        self._min_key = []  # (fitness, age) per slot
+        self._max_key = []  # (-fitness, age) per slot
+        self._worst = _IndexedHeap(self._min_key)
+        self._best = _IndexedHeap(self._max_key)
+        self._members = []  # dense list of live slots for uniform sampling
+        self._member_index = {}  # slot -> index in _members
+        self._free = []  # slots ready for reuse
+        self._genomes = {}  # genome bytes -> members holding it
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):  # live slots in no particular order
+        return iter(self._members[:])
+
+    # adding and removing
+
+    def add(self, fitness, genome, data=None):
+        if self._free:
+            slot = self._free.pop()
+            self.fitness[slot], self.genome[slot], self.data[slot] = fitness, genome, data
+        else:
+            slot = len(self.fitness)
+            self.fitness.append(fitness)
+            self.genome.append(genome)
+            self.data.append(data)
+            self._min_key.append(None)
+            self._max_key.append(None)
+        age = self._next_age
+        self._next_age += 1
+        self._min_key[slot] = (fitness, age)
+        self._max_key[slot] = (-fitness, age)
+        self._worst.push(slot)
+        self._best.push(slot)
+        self._member_index[slot] = len(self._members)
+        self._members.append(slot)
+        key = bytes(genome)
+        self._genomes[key] = self._genomes.get(key, 0) + 1
+        return slot
+
+    def remove(self, slot):  # returns (fitness, genome, data) of the removed member
+        self._worst.remove(slot)
+        self._best.remove(slot)
+        i = self._member_index.pop(slot)
+        last = self._members.pop()
+        if last != slot:  # swap-remove keeps the member list dense
+            self._members[i] = last
+            self._member_index[last] = i
+        key = bytes(self.genome[slot])
+        if self._genomes[key] == 1:
+            del self._genomes[key]
+        else:
+            self._genomes[key] -= 1
+        member = (self.fitness[slot], self.genome[slot], self.data[slot])
+        self.genome[slot] = self.data[slot] = None  # drop references so they can be freed
+        self._free.append(slot)
+        return member
+
+    def pop_worst(self):
+        return self.remove(self._worst.top())
+
+    # lookups
+
+    def best_slot(self):
+        return self._best.top()
+
+    def worst_slot(self):
+        return self._worst.top()
+
+    def sample(self, k=1, rng=random):  # k distinct members chosen uniformly
+        return [self._members[i] for i in rng.sample(range(len(self._members)), k)]
+
+    def sample_ranked(self, size=2, rng=random):  # best of `size` uniform draws
+        members = self._members
+        best = members[int(rng.random() * len(members))]
+        for _ in range(size - 1):
+            challenger = members[int(rng.random() * len(members))]
+            if self._max_key[challenger] < self._max_key[best]:
+                best = challenger
+        return best
+
+    def top(self, k):  # the k best slots, best first, without touching the heap
+        heap, key = self._best.heap, self._max_key
+        result = []
+        frontier = [(key[heap[0]], 0)] if heap else []
+        while frontier and len(result) < k:
+            _, i = heapq.heappop(frontier)
+            result.append(heap[i])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (key[heap[child]], child))
+        return result
+
+    def has_genome(self, genome):
+        return bytes(genome) in self._genomes
+
+    def duplicate_count(self):  # members whose genome another member already has
+        return len(self._members) - len(self._genomes)
+
+    # checkpoints
+
+    def state(self):  # slot-indexed lists plus the orders that decide sampling and ties, genomes and data left out
+        return {
+            "fitness": self.fitness[:],
+            "age": [-1 if key is None else key[1] for key in self._min_key],
+            "members": self._members[:],
+            "worst": self._worst.heap[:],
+            "best": self._best.heap[:],
+            "free": self._free[:],
+            "next_age": self._next_age,
+        }
+
+    @classmethod
+    def from_state(cls, state, genomes, data):  # genomes and data are slot-indexed, None in free slots
+        store = cls()
+        store.fitness = list(state["fitness"])
+        store.genome = list(genomes)
+        store.data = list(data)
+        store._min_key[:] = [(f, age) for f, age in zip(store.fitness, state["age"])]
+        store._max_key[:] = [(-f, age) for f, age in zip(store.fitness, state["age"])]
+        for heap, order in ((store._worst, state["worst"]), (store._best, state["best"])):
+            heap.heap = list(order)
+            heap.position = {slot: i for i, slot in enumerate(heap.heap)}
+        store._members = list(state["members"])
+        store._member_index = {slot: i for i, slot in enumerate(store._members)}
+        store._free = list(state["free"])
+        store._next_age = state["next_age"]
+        for slot in store._members:
+            key = bytes(store.genome[slot])
+            store._genomes[key] = store._genomes.get(key, 0) + 1
+        return store
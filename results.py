@@ -0,0 +1,206 @@
+# Dylan Orpin
+# Assignment 2 (streamed results and timetable export)
+
+# imports
+import csv  # used for the timetable grid
+import json  # used for JSON lines and the JSON timetable
+import os  # used for file extensions
+import queue  # used for handing batches to the writer thread
+import threading  # used for writing off the GA loop
+import time  # used for elapsed times
+import numpy as np  # used for the npz columnar format
+from genome import decode_genome  # used for readable schedules
+
+# records are flat dicts, the GA loops send two kinds:
+#   {"kind": "generation", "generation", "elapsed", "best_fitness", "avg_fitness", "evaluations"}
+#   {"kind": "improvement", "generation", "elapsed", "best_fitness", "schedule": [[activity, room, time, facilitator]]}
+# columnar formats store every column the records use, lists are kept as JSON text
+
+PARQUET_ROW_GROUP = 4096  # rows per parquet row group
+TIMETABLE_FORMATS = (".csv", ".json")
+
+def _cell(value):
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+class _JsonlBatches:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write_batch(self, records):
+        self.file.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def close(self):
+        self.file.close()
+
+class _NpzBatches:  # numpy only, columns are gathered in memory and saved once at the end
+    def __init__(self, path):
+        self.path = path
+        self.columns = {}
+        self.rows = 0
+
+    def write_batch(self, records):
+        for record in records:
+            for name in record:
+                if name not in self.columns:
+                    self.columns[name] = [None] * self.rows
+            for name, column in self.columns.items():
+                column.append(_cell(record.get(name)))
+            self.rows += 1
+
+    def close(self):
+        arrays = {}
+        for name, column in self.columns.items():
+            if all(v is None or isinstance(v, (int, float)) for v in column):
+                arrays[name] = np.array([np.nan if v is None else v for v in column], dtype=float)
+            else:
+                arrays[name] = np.array(["" if v is None else str(v) for v in column])
+        np.savez(self.path, **arrays)
+
+class _ParquetBatches:  # needs pyarrow, records are kept until close so the schema covers every column
+    def __init__(self, path):
+        try:
+            import pyarrow  # optional, only this format needs it
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("parquet output needs pyarrow, use .jsonl or .npz instead") from None
+        self.pyarrow = pyarrow
+        self.path = path
+        self.records = []
+
+    def write_batch(self, records):
+        self.records.extend(records)
+
+    def close(self):  # columns that only ever hold numbers are float64, the rest text
+        if not self.records:
+            return
+        pa = self.pyarrow
+        names = list(dict.fromkeys(name for record in self.records for name in record))
+        columns, fields = {}, []
+        for name in names:
+            values = [_cell(record.get(name)) for record in self.records]
+            if all(v is None or isinstance(v, (int, float)) for v in values):
+                fields.append((name, pa.float64()))
+            else:  # a column that starts as a number and later holds text is text throughout
+                values = [None if v is None else str(v) for v in values]
+                fields.append((name, pa.string()))
+            columns[name] = values
+        schema = pa.schema(fields)
+        pa.parquet.write_table(pa.table(columns, schema=schema), self.path, row_group_size=PARQUET_ROW_GROUP)
+
+FORMATS = {".jsonl": _JsonlBatches, ".npz": _NpzBatches, ".parquet": _ParquetBatches}
+
+# buffered writer, the GA loop only appends to a list, a background thread does the encoding and the I/O
+
+class ResultWriter:
+    enabled = True
+
+    def __init__(self, path, batch_size=256):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in FORMATS:
+            raise ValueError(f"unknown results format {extension!r}, use one of {', '.join(FORMATS)}")
+        self.sink = FORMATS[extension](path)
+        self.batch_size = batch_size
+        self.batch = []
+        self.started = time.perf_counter()
+        self.error = None
+        self.queue = queue.Queue(maxsize=16)  # bounded, a stalled disk slows the GA instead of filling memory
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            records = self.queue.get()
+            if records is None:
+                return
+            if self.error is None:
+                try:
+                    self.sink.write_batch(records)
+                except Exception as error:  # kept and raised from close(), the GA keeps running
+                    self.error = error
+
+    def write(self, record):
+        record.setdefault("elapsed", time.perf_counter() - self.started)
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.queue.put(self.batch)
+            self.batch = []
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        self.sink.close()
+        if self.error is not None:
+            raise self.error
+
+class NullWriter:  # used when no results file is asked for
+    enabled = False
+
+    def write(self, record):
+        pass
+
+    def close(self):
+        pass
+
+NULL_WRITER = NullWriter()
+
+def generation_record(generation, best_fitness, avg_fitness=None, evaluations=None):  # evaluations in this generation
+    return {"kind": "generation", "generation": generation, "best_fitness": best_fitness, "avg_fitness": avg_fitness,
+            "evaluations": evaluations}
+
+def improvement_record(tables, generation, best_fitness, genome):
+    return {"kind": "improvement", "generation": generation, "best_fitness": best_fitness,
+            "schedule": [[activity, *row] for activity, row in zip(tables.activity_names, decode_genome(tables, genome))]}
+
+# final timetable export, a room x time grid
+
+def timetable_grid(tables, genome):  # -> {room: {time: [(activity, facilitator)]}}, every room and slot present
+    grid = {room: {slot: [] for slot in tables.time_names} for room in tables.room_names}
+    for activity, (room, slot, facilitator) in zip(tables.activity_names, decode_genome(tables, genome)):
+        grid[room][slot].append((activity, facilitator))
+    return grid
+
+def export_timetable(tables, genome, path, fitness=None):  # .csv grid or .json with the grid and the assignment list
+    grid = timetable_grid(tables, genome)
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in TIMETABLE_FORMATS:  # check_output_arguments refuses these before a run
+        raise ValueError(f"unknown timetable format {extension!r}, use .csv or .json")
+    if extension == ".csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["room"] + list(tables.time_names))
+            for room, slots in grid.items():  # clashes share a cell, separated by ';'
+                writer.writerow([room] + ["; ".join(f"{activity} ({facilitator})" for activity, facilitator in slots[slot])
+                                          for slot in tables.time_names])
+    elif extension == ".json":
+        with open(path, "w") as f:
+            json.dump({
+                "fitness": fitness,
+                "rooms": list(tables.room_names),
+                "time_slots": list(tables.time_names),
+                "grid": {room: {slot: [{"activity": activity, "facilitator": facilitator} for activity, facilitator in cell]
+                                for slot, cell in slots.items()} for room, slots in grid.items()},
+                "assignments": [{"activity": activity, "room": room, "time": slot, "facilitator": facilitator}
+                                for activity, (room, slot, facilitator)
+                                in zip(tables.activity_names, decode_genome(tables, genome))],
+            }, f, indent=2)
+
+# helpers for the command line
+
+def add_output_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--results", default=None, help="stream generation summaries and improvements "
+                                                        "to a .jsonl, .npz or .parquet file")
+    parser.add_argument("--export", default=None, help="write the final timetable as a room x time .csv or .json")
+    parser.add_argument("--quiet", action="store_true", help="do not print a line per generation")
+
+def check_output_arguments(parser, args):  # unknown file formats fail before the run, not after it
+    for option, path, formats in (("--results", args.results, FORMATS), ("--export", args.export, TIMETABLE_FORMATS)):
+        if path and os.path.splitext(path)[1].lower() not in formats:
+            parser.error(f"{option} needs one of {', '.join(formats)}")
+
+def writer_from_args(path):
+    return ResultWriter(path) if path else NULL_WRITER
@@ -0,0 +1,68 @@
+# Dylan Orpin
+# Assignment 2 (run configuration and seeding)
+
+# imports
+import json  # used for saved configurations
+import random  # used for seeding the scripts
+import numpy as np  # used for SeedSequence streams
+
+# a run is fixed by its seed and its options, the same config gives the same best schedule whatever the scoring
+# backend or the number of worker processes:
+#   the random module is seeded once, the numpy Generators used for batches are drawn from it (operators.numpy_rng)
+#   each worker task gets its own stream spawned from a SeedSequence, so streams never overlap and do not depend on
+#   which worker runs a task or when it finishes
+#   scoring has no randomness, pooled evaluators return scores in population order
+
+def fresh_seed():  # 128 bits of OS entropy, printed and saved so the run can be repeated
+    return int(np.random.SeedSequence().entropy)
+
+def stream_seed(sequence):  # SeedSequence -> int seed for random.Random or numpy
+    return int(sequence.generate_state(1, np.uint64)[0])
+
+def spawn_seeds(seed, n):  # n independent seeds, the i-th is the same however many are spawned
+    return [stream_seed(child) for child in np.random.SeedSequence(seed).spawn(n)]
+
+class RunConfig:
+    def __init__(self, seed=None, options=None):
+        self.seed = fresh_seed() if seed is None else int(seed)
+        self.options = dict(options or {})  # the command line options, by argparse name
+
+    def seed_random(self):
+        random.seed(self.seed)
+
+    def spawn(self, n):
+        return spawn_seeds(self.seed, n)
+
+    def to_dict(self):
+        return {"seed": self.seed, "options": self.options}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("seed"), data.get("options"))
+
+# command line, --config loads a saved configuration as the defaults, options given on the command line still win
+
+CONFIG_ONLY = ("seed", "config", "save_config")  # not part of RunConfig.options
+
+def add_config_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--seed", type=int, default=None, help="random seed (default: a fresh one, printed)")
+    parser.add_argument("--config", default=None, help="start from a run configuration saved with --save-config")
+    parser.add_argument("--save-config", default=None, help="write the seed and options of this run to a .json file")
+
+def parse_with_config(parser, argv=None):  # parse_args with --config defaults, args.seed is always set
+    known, _ = parser.parse_known_args(argv)
+    if known.config:
+        saved = RunConfig.load(known.config)
+        parser.set_defaults(seed=saved.seed, **saved.options)
+    args = parser.parse_args(argv)
+    config = RunConfig(args.seed, {name: value for name, value in vars(args).items() if name not in CONFIG_ONLY})
+    args.seed = config.seed
+    if args.save_config:
+        config.save(args.save_config)
+    return args
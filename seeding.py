@@ -0,0 +1,139 @@
+# Dylan Orpin
+# Assignment 2 (greedy seeding and conflict repair)
+
+# imports
+import random  # default random source, any random.Random instance works too
+import numpy as np  # used for the candidate tables
+from delta_fitness import IncrementalFitness  # used for repairing block rows
+from local_search import EPSILON  # smaller gains are rounding, not improvements
+
+# uniform random schedules mostly start with rooms that are too small, two activities in one room at once and
+# facilitators booked twice, and the GA spends its first generations removing them
+# greedy seeding builds schedules activity by activity, most constrained first, each taking a random choice among:
+#   rooms that fit the enrollment best, then any room that fits, then any room
+#   preferred facilitators under their load limit, then listed ones, then anyone
+#   time slots where both the room and the facilitator are still free
+# the SLA100/191 rules are left to the GA, the seeds only have to be clash-free and well matched
+# repair fixes the hard conflicts of one schedule (room clash, facilitator clash, room too small) with moves read
+# off IncrementalFitness's occupancy counters, a move is only made when it raises the fitness
+
+class GreedyTables:  # per-activity candidate lists, built once per instance
+    def __init__(self, tables, delta_tables):
+        self.n_times = delta_tables.n_times
+        fits = tables.room_fits
+        room_score, facilitator_score = tables.room_score, tables.facilitator_score
+        all_rooms = list(range(len(tables.room_names)))
+        all_facilitators = list(range(len(tables.facilitator_names)))
+        self.room_tiers = []  # activity -> [best fitting rooms, fitting rooms, every room]
+        self.facilitator_tiers = []  # activity -> [preferred, preferred or listed, everyone]
+        for a in range(len(tables.activity_names)):
+            best = np.flatnonzero(fits[a] & (room_score[a] == room_score[a][fits[a]].max())) if fits[a].any() else []
+            self.room_tiers.append([list(map(int, best)), np.flatnonzero(fits[a]).tolist(), all_rooms])
+            scores = facilitator_score[a]
+            self.facilitator_tiers.append([np.flatnonzero(scores == scores.max()).tolist(),
+                                           np.flatnonzero(scores > scores.min()).tolist(), all_facilitators])
+        self.fits = fits.tolist()
+        # most activities a facilitator takes before the load score turns against them
+        self.max_load = [int(np.flatnonzero(row > row[-1]).max()) if (row > row[-1]).any() else len(tables.activity_names)
+                         for row in tables.load_score]
+        self.order_key = [len(tiers[0]) * len(facilitators[0])  # fewest good options first
+                          for tiers, facilitators in zip(self.room_tiers, self.facilitator_tiers)]
+
+def greedy_triples(greedy, rng=random):  # -> one schedule as [room, time, facilitator] per activity
+    n_times = greedy.n_times
+    n_activities = len(greedy.order_key)
+    room_busy = set()
+    facilitator_busy = set()
+    load = [0] * len(greedy.max_load)
+    triples = [None] * n_activities
+    for a in sorted(range(n_activities), key=lambda a: (greedy.order_key[a], rng.random())):
+        choice = None
+        for rooms, facilitators in zip(greedy.room_tiers[a], greedy.facilitator_tiers[a]):
+            if not rooms:
+                continue
+            free_facilitators = [f for f in facilitators if load[f] < greedy.max_load[f]] or facilitators
+            for room in rng.sample(rooms, len(rooms)):
+                for facilitator in rng.sample(free_facilitators, len(free_facilitators)):
+                    slots = [t for t in range(n_times)
+                             if (room, t) not in room_busy and (facilitator, t) not in facilitator_busy]
+                    if slots:
+                        choice = (room, rng.choice(slots), facilitator)
+                        break
+                if choice:
+                    break
+            if choice:
+                break
+        if choice is None:  # everything is booked, the GA sorts it out
+            everyone = greedy.room_tiers[a][-1], greedy.facilitator_tiers[a][-1]
+            choice = (rng.choice(everyone[0]), rng.randrange(n_times), rng.choice(everyone[1]))
+        room, time, facilitator = choice
+        room_busy.add((room, time))
+        facilitator_busy.add((facilitator, time))
+        load[facilitator] += 1
+        triples[a] = list(choice)
+    return triples
+
+def seed_greedy(block, greedy, share, rng=random):  # replaces the first share of a random block with greedy schedules
+    for i in range(int(round(len(block) * share))):
+        block[i] = greedy_triples(greedy, rng)
+    return block
+
+# repair
+
+def hard_conflicts(evaluator, greedy):  # activities in a shared room, with a double-booked facilitator or a small room
+    t = evaluator.tables
+    n_times = t.n_times
+    return [a for a, (room, time, facilitator) in enumerate(evaluator.assignment)
+            if evaluator.room_counts[room * n_times + time] > 1
+            or evaluator.facilitator_counts[facilitator * n_times + time] > 1
+            or not greedy.fits[a][room]]
+
+def repair_conflicts(evaluator, greedy, rng=random, tries=12):  # -> moves scored, evaluator ends on the repair
+    n_times = greedy.n_times
+    spent = 0
+    for a in hard_conflicts(evaluator, greedy):
+        room, time, facilitator = evaluator.assignment[a]
+        if evaluator.room_counts[room * n_times + time] <= 1 and evaluator.facilitator_counts[
+                facilitator * n_times + time] <= 1 and greedy.fits[a][room]:
+            continue  # an earlier move in this pass already fixed it
+        room_free = lambda r, s: evaluator.room_counts[r * n_times + s] - (r == room and s == time) == 0
+        facilitator_free = lambda f, s: evaluator.facilitator_counts[f * n_times + s] - (f == facilitator and s == time) == 0
+        rooms = greedy.room_tiers[a][1] or greedy.room_tiers[a][2]
+        times = [time] + rng.sample([s for s in range(n_times) if s != time], n_times - 1)  # keep the slot if it can
+        best_delta, best_move = EPSILON, None
+        candidates = 0
+        for r in rng.sample(rooms, len(rooms)):  # a free, fitting room, the facilitator free too
+            for s in times:
+                if (r, s) != (room, time) and room_free(r, s) and facilitator_free(facilitator, s):
+                    delta = evaluator.move_delta(a, r, s, facilitator)
+                    spent += 1
+                    candidates += 1
+                    if delta > best_delta:
+                        best_delta, best_move = delta, (r, s, facilitator)
+                    break  # the first free slot per room, then the next room
+            if candidates >= tries:
+                break
+        if best_move is None:  # no free cell for this facilitator, try someone else in place
+            for f in greedy.facilitator_tiers[a][1] or greedy.facilitator_tiers[a][2]:
+                if f != facilitator and facilitator_free(f, time):
+                    delta = evaluator.move_delta(a, room, time, f)
+                    spent += 1
+                    if delta > best_delta:
+                        best_delta, best_move = delta, (room, time, f)
+        if best_move is not None:
+            evaluator.set(a, *best_move)
+    return spent
+
+def repair_block(block, greedy, delta_tables, rng=random):  # every row of a block, in place -> moves scored
+    spent = 0
+    for i in range(len(block)):
+        evaluator = IncrementalFitness(delta_tables, block[i].tolist())
+        if hard_conflicts(evaluator, greedy):
+            spent += repair_conflicts(evaluator, greedy, rng)
+            block[i] = evaluator.assignment
+    return spent
+
+def add_seeding_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--greedy-share", type=float, default=0.0,
+                        help="share of the initial population built greedily instead of at random (0 to 1)")
+    parser.add_argument("--repair", action="store_true", help="fix room, facilitator and capacity conflicts in children")
@@ -0,0 +1,97 @@
+# Dylan Orpin
+# Assignment 2 (parent selection)
+
+# imports
+import random  # default random source, any random.Random instance works too
+import numpy as np  # used for building the distributions
+
+# every selector is built once per generation from the fitness scores and then hands out
+# population indexes, sample() is O(1) for softmax and rank so picking all parents is O(n) per generation
+
+def softmax_weights(fitness_scores, temperature=1.0):  # same distribution as softmax() in the prob dist script
+    if temperature <= 0:
+        raise ValueError("softmax temperature must be positive")
+    scores = np.asarray(fitness_scores, dtype=np.float64) / temperature
+    exps = np.exp(scores - scores.max())  # shifted for stability
+    return exps / exps.sum()
+
+def rank_weights(fitness_scores):  # worst gets weight 1, best gets weight n, ties share the average
+    scores = np.asarray(fitness_scores, dtype=np.float64)
+    order = np.argsort(scores, kind="stable")
+    ranks = np.empty(len(scores))
+    ranks[order] = np.arange(1, len(scores) + 1)
+    _, inverse = np.unique(scores, return_inverse=True)
+    sums = np.bincount(inverse, weights=ranks)
+    counts = np.bincount(inverse)
+    return sums[inverse] / counts[inverse]
+
+# alias table (Vose), O(n) build and O(1) sample
+
+class AliasTable:
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        if n == 0 or weights.sum() <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+        scaled = (weights * (n / weights.sum())).tolist()
+        self.n = n
+        self.prob = [0.0] * n  # chance of keeping column i
+        self.alias = [0] * n  # where column i sends the rest
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:  # leftovers are 1 up to rounding
+            self.prob[i] = 1.0
+            self.alias[i] = i
+
+    def sample(self, rng=random):
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+# selection schemes
+
+class SoftmaxSelector:  # fitness-proportional on exp(fitness / temperature)
+    def __init__(self, fitness_scores, temperature=1.0):
+        self.sampler = AliasTable(softmax_weights(fitness_scores, temperature))
+
+    def sample(self, rng=random):
+        return self.sampler.sample(rng)
+
+class RankSelector:  # proportional to rank, insensitive to the scale of the scores
+    def __init__(self, fitness_scores):
+        self.sampler = AliasTable(rank_weights(fitness_scores))
+
+    def sample(self, rng=random):
+        return self.sampler.sample(rng)
+
+class TournamentSelector:  # best of `size` uniformly drawn members, O(size) per sample
+    def __init__(self, fitness_scores, size=2):
+        if size < 1:
+            raise ValueError("tournament size must be at least 1")
+        self.scores = list(fitness_scores)
+        self.size = size
+
+    def sample(self, rng=random):
+        n = len(self.scores)
+        best = int(rng.random() * n)
+        for _ in range(self.size - 1):
+            challenger = int(rng.random() * n)
+            if self.scores[challenger] > self.scores[best]:
+                best = challenger
+        return best
+
+SELECTION_SCHEMES = ["softmax", "rank", "tournament"]
+
+def build_selector(scheme, fitness_scores, temperature=1.0, tournament_size=2):
+    if scheme == "softmax":
+        return SoftmaxSelector(fitness_scores, temperature)
+    if scheme == "rank":
+        return RankSelector(fitness_scores)
+    if scheme == "tournament":
+        return TournamentSelector(fitness_scores, tournament_size)
+    raise ValueError(f"unknown selection scheme: {scheme}")
@@ -0,0 +1,324 @@
+# Dylan Orpin
+# Assignment 2 (local scheduling service)
+
+# runs from the command line, for example
+#   python service.py --port 8461 --workers 4
+#   python service.py --unix /tmp/scheduler.sock
+#   python service.py --port 8461 --submit job.json    (client: sends one job and prints what comes back)
+
+# protocol: JSON lines both ways on one connection
+#   -> {"op": "submit", "solver": "heap_ga", "instance": null | path | instance document, "variant": null | "minheap" | "probdist",
+#       "time_limit": 10, "target": null, "max_evaluations": null, "seed": null, "options": {}, "priority": 0}
+#   <- {"event": "queued", "job": 1, "seed": 42, "position": 0}   (jobs ahead of it, -1 when it started at once)
+#   <- {"event": "started", "job": 1, "worker": 0}
+#   <- {"event": "best", "job": 1, "best_fitness": 12.5, "evaluations": 4000, "seconds": 0.2}   (new bests)
+#   <- {"event": "done", "job": 1, "summary": {...}, "schedule": [[activity, room, time, facilitator], ...]}
+#   <- {"event": "error", "job": 1, "error": "..."}   (the job failed, or its worker process died)
+#   -> {"op": "cancel", "job": 1}   <- {"event": "cancelled", "job": 1, ...}
+#   -> {"op": "status"}             <- {"event": "status", "queued": 0, "running": 1, "workers": 4}
+# lower priority numbers run first, equal priorities in submission order, a priority that is not a number is refused
+# a job's events go to the connection that submitted it, closing that connection cancels its jobs
+
+# imports
+import argparse  # used for the command line options
+import asyncio  # used for the server and the job queue
+import heapq  # used for the priority queue
+import itertools  # used for job numbers
+import json  # used for the wire format
+import math  # used for checking priorities
+import multiprocessing  # used for the warm worker processes
+import multiprocessing.connection  # used for waiting on every worker's pipe at once
+import os  # used for instance file times
+import threading  # used for reading worker messages off the event loop
+import time  # used for throttling progress events
+from genome import decode_genome  # used for readable schedules
+from instance_loader import compile_instance, load_instance  # used for problem instances
+from run_config import fresh_seed  # used for jobs without a seed
+from solvers import BUILT_IN, SOLVERS, SolverRun, solve  # used for running jobs
+
+# data definitions
+PROGRESS_INTERVAL = 0.1  # seconds between "best" events per job, the final best always comes with "done"
+POLL_INTERVAL = 0.2  # seconds the message reader waits before picking up replaced workers
+
+# worker side, each process keeps compiled instance tables between jobs
+
+class _ServiceRun(SolverRun):  # streams new bests and stops when its job is cancelled
+    def __init__(self, job, outbox, cancel, time_limit, target, max_evaluations):
+        super().__init__(time_limit, target, max_evaluations)
+        self.job, self.outbox, self.cancel = job, outbox, cancel
+        self.sent = 0.0
+
+    def offer(self, fitness, genome):
+        before = self.best_fitness
+        super().offer(fitness, genome)
+        now = time.perf_counter()
+        if self.best_fitness > before and now - self.sent >= PROGRESS_INTERVAL:
+            self.sent = now
+            self.outbox.send(("best", self.job, {"best_fitness": self.best_fitness, "evaluations": self.evaluations,
+                                                "seconds": self.elapsed()}))
+
+    def done(self):
+        return self.cancel.value == self.job or super().done()
+
+def _tables_for(spec, cache):  # compiled tables, built once per instance and variant
+    instance, variant = spec.get("instance"), spec.get("variant")  # None: the instance's own variant
+    if instance is None or isinstance(instance, str):
+        path = instance or BUILT_IN
+        key = (path, os.path.getmtime(path), variant)  # an edited file is compiled again
+        if key not in cache:
+            cache[key] = load_instance(path, variant)
+    else:
+        key = (json.dumps(instance, sort_keys=True), variant)
+        if key not in cache:
+            cache[key] = compile_instance(instance, variant)
+    return cache[key]
+
+def _worker(index, inbox, outbox, cancel):
+    cache = {}
+    while True:
+        task = inbox.get()
+        if task is None:
+            return
+        job, spec = task
+        outbox.send(("started", job, {"worker": index}))
+        try:
+            tables = _tables_for(spec, cache)
+            run = _ServiceRun(job, outbox, cancel, spec.get("time_limit", 10.0), spec.get("target"),
+                              spec.get("max_evaluations"))
+            solve(spec.get("solver", "heap_ga"), tables, seed=spec["seed"], run=run, **spec.get("options", {}))
+            summary = run.summary(spec.get("solver", "heap_ga"), spec.get("target"))
+            schedule = None if run.best_genome is None else [
+                [activity, *row] for activity, row in zip(tables.activity_names, decode_genome(tables, run.best_genome))]
+            outbox.send(("cancelled" if cancel.value == job else "done", job,
+                        {"summary": summary, "schedule": schedule}))
+        except Exception as error:  # reported to the client, the worker stays up for the next job
+            outbox.send(("error", job, {"error": f"{type(error).__name__}: {error}"}))
+
+# service side
+# every worker writes to its own pipe: a worker killed halfway through a message breaks only that pipe, where a
+# shared queue would stay locked for every other worker; the pipe's end of file is how a crash is noticed, the
+# running job gets an "error" event and a fresh worker takes the slot
+
+class Job:
+    def __init__(self, number, spec, priority, send):
+        self.number, self.spec, self.priority, self.send = number, spec, priority, send
+        self.state = "queued"  # queued -> running -> done / cancelled / error
+        self.worker = None
+
+class Scheduler:
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.numbers = itertools.count(1)
+        self.queue = []  # (priority, number, job)
+        self.jobs = {}  # unfinished jobs by number
+        self.workers = [self._spawn(index) for index in range(self.n_workers)]  # (process, inbox, cancel, pipe)
+        self.idle = list(range(self.n_workers))
+        self.loop = None
+        self.closing = False
+
+    def _spawn(self, index):
+        inbox = multiprocessing.Queue()
+        cancel = multiprocessing.Value("q", 0, lock=False)  # number of the job to stop, checked by the solver loop
+        pipe, outbox = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_worker, args=(index, inbox, outbox, cancel), daemon=True)
+        process.start()
+        outbox.close()  # only the worker holds the writing end, so the pipe ends when the worker does
+        return process, inbox, cancel, pipe
+
+    async def start(self):  # worker messages are read on a thread and handed to the event loop
+        self.loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read_outbox, daemon=True).start()
+
+    def _read_outbox(self):
+        ended = set()
+        while not self.closing:
+            pipes = [worker[3] for worker in self.workers if worker[3] not in ended]  # replaced workers join here
+            for pipe in multiprocessing.connection.wait(pipes, POLL_INTERVAL):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):  # the worker exited
+                    ended.add(pipe)
+                    self.loop.call_soon_threadsafe(self._replace, pipe)
+                    continue
+                self.loop.call_soon_threadsafe(self._on_message, *message)
+
+    def _replace(self, pipe):  # fails the dead worker's job and starts a new worker in its slot
+        index = next((i for i, worker in enumerate(self.workers) if worker[3] is pipe), None)
+        if index is None or self.closing:
+            return
+        process, inbox = self.workers[index][:2]
+        process.join(timeout=1)
+        inbox.cancel_join_thread()  # nobody reads it any more
+        self.workers[index] = self._spawn(index)
+        job = next((job for job in self.jobs.values() if job.state == "running" and job.worker == index), None)
+        if job is None:  # it died between jobs, the slot is still idle
+            return
+        job.state = "error"
+        del self.jobs[job.number]
+        job.send({"event": "error", "job": job.number, "error": f"worker {index} exited with code {process.exitcode}"})
+        self.idle.append(index)
+        self._dispatch()
+
+    def _on_message(self, event, number, payload):
+        job = self.jobs.get(number)
+        if job is None:
+            return
+        job.send(dict(payload, event=event, job=number))
+        if event in ("done", "cancelled", "error"):
+            job.state = event
+            del self.jobs[number]
+            self.idle.append(job.worker)
+            self._dispatch()
+
+    def submit(self, spec, send):  # -> job, send(event dict) is called for every event of the job
+        spec = dict(spec)
+        if spec.get("solver", "heap_ga") not in SOLVERS:
+            raise ValueError(f"unknown solver: {spec.get('solver')}")
+        if spec.get("seed") is None:  # returned in the summary of "done" so the job can be repeated
+            spec["seed"] = fresh_seed()
+        priority = spec.get("priority", 0)
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)) or not math.isfinite(priority):
+            raise ValueError(f"priority must be a number, not {priority!r}")  # the heap compares priorities
+        job = Job(next(self.numbers), spec, priority, send)
+        heapq.heappush(self.queue, (job.priority, job.number, job))
+        self.jobs[job.number] = job  # only once it is queued
+        self._dispatch()
+        send({"event": "queued", "job": job.number, "seed": spec["seed"],  # position 0 runs next, -1 already runs
+              "position": -1 if job.state == "running" else sum(
+                  1 for priority, number, other in self.queue
+                  if other.state == "queued" and (priority, number) < (job.priority, job.number))})
+        return job
+
+    def _dispatch(self):
+        while self.idle and self.queue:
+            _, _, job = heapq.heappop(self.queue)
+            if job.state != "queued":  # cancelled while waiting
+                continue
+            job.state, job.worker = "running", self.idle.pop()
+            _, inbox, cancel, _ = self.workers[job.worker]
+            cancel.value = 0
+            inbox.put((job.number, job.spec))
+
+    def cancel(self, number):  # queued jobs go at once, running ones stop at the solver's next check
+        job = self.jobs.get(number)
+        if job is None:
+            return False
+        if job.state == "queued":
+            job.state = "cancelled"
+            del self.jobs[number]
+            job.send({"event": "cancelled", "job": number})
+        elif job.state == "running":
+            self.workers[job.worker][2].value = number
+        return True
+
+    def status(self):
+        return {"event": "status", "queued": sum(1 for job in self.jobs.values() if job.state == "queued"),
+                "running": sum(1 for job in self.jobs.values() if job.state == "running"), "workers": self.n_workers}
+
+    def close(self):
+        self.closing = True  # workers ending now are not replaced, the reader stops at its next wait
+        for process, inbox, _, _ in self.workers:
+            inbox.put(None)
+        for process, _, _, _ in self.workers:
+            process.join(timeout=5)
+
+# connections
+
+async def handle_connection(scheduler, reader, writer):
+    outgoing = asyncio.Queue()
+    mine = set()
+
+    async def drain():  # one writer per connection, events from every job are written in order
+        while True:
+            message = await outgoing.get()
+            if message is None:
+                return
+            try:
+                writer.write((json.dumps(message) + "\n").encode())
+                await writer.drain()
+            except ConnectionError:  # the client went away, its jobs are cancelled below
+                return
+
+    def send(message):
+        if message.get("event") in ("done", "cancelled", "error"):
+            mine.discard(message.get("job"))
+        outgoing.put_nowait(message)
+
+    drainer = asyncio.create_task(drain())
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "submit":
+                    mine.add(scheduler.submit(request, send).number)
+                elif op == "cancel":
+                    if not scheduler.cancel(request.get("job")):
+                        send({"event": "error", "job": request.get("job"), "error": "no such job"})
+                elif op == "status":
+                    send(scheduler.status())
+                else:
+                    send({"event": "error", "error": f"unknown op: {op}"})
+            except (ValueError, TypeError) as error:  # bad JSON or a bad job, the connection stays open
+                send({"event": "error", "error": str(error)})
+    except ConnectionError:  # dropped without closing
+        pass
+    finally:
+        for number in list(mine):  # nobody is listening any more
+            scheduler.cancel(number)
+        outgoing.put_nowait(None)
+        await drainer
+        writer.close()
+
+async def serve(host="127.0.0.1", port=8461, unix=None, workers=None):
+    scheduler = Scheduler(workers)
+    await scheduler.start()
+    handler = lambda reader, writer: handle_connection(scheduler, reader, writer)
+    if unix:
+        server = await asyncio.start_unix_server(handler, path=unix)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    print(f"Serving on {unix or f'{host}:{port}'} with {scheduler.n_workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        scheduler.close()
+
+# client, sends one job and prints every event until it finishes
+
+async def submit_job(job, host="127.0.0.1", port=8461, unix=None, report=print):  # -> the final event
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps(dict(job, op="submit")) + "\n").encode())
+    await writer.drain()
+    try:
+        while line := await reader.readline():
+            event = json.loads(line)
+            report(event)
+            if event["event"] in ("done", "cancelled", "error"):
+                return event
+    finally:
+        writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs scheduling jobs on a pool of warm worker processes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8461)
+    parser.add_argument("--unix", default=None, help="listen on (or connect to) this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--submit", default=None, help="act as a client: send the job in this .json file")
+    args = parser.parse_args()
+    if args.submit:
+        with open(args.submit) as f:
+            asyncio.run(submit_job(json.load(f), args.host, args.port, args.unix, lambda e: print(json.dumps(e))))
+    else:
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
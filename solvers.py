@@ -0,0 +1,263 @@
+# Dylan Orpin
+# Assignment 2 (solver API)
+
+# runs from the command line, for example
+#   python solvers.py --time-limit 10 --target 12.5
+#   python solvers.py --instance instances/sla.json --solvers heap_ga,annealing,exact --repeats 3
+
+# imports
+import argparse  # used for the command line options
+import math  # used for the annealing acceptance test
+import random  # used for the per-run random sources
+import time  # used for the clock
+import numpy as np  # used for population blocks
+from fitness_engine import batch_fitness, LOAD_LEVELS, ROOM, TIME, FACILITATOR  # shared problem tables
+from delta_fitness import DeltaTables, IncrementalFitness  # used for incremental scoring
+from genome import new_genome, genome_triples, genome_from_triples, block_genome  # used for schedules
+from operators import random_genome  # used for random starting schedules
+from ga_engines import SteadyStateGA, GenerationalGA  # used by the GAs, the same loops as the two scripts
+from adaptive import AdaptiveControl  # used for the GAs' adaptive option
+from local_search import tabu_search, EPSILON  # used by the tabu solver
+from instance_loader import BUILT_IN, load_instance  # used for problem instances stored in files
+
+# every solver is solver(tables, run, rng, **options)
+#   it keeps going until run.done(), reports scored schedules with run.count() and candidates with run.offer()
+#   the run keeps the best schedule, the evaluation count and a (seconds, evaluations, best) trace of improvements
+
+class SolverRun:
+    def __init__(self, time_limit=10.0, target=None, max_evaluations=None):
+        self.time_limit = time_limit
+        self.target = target
+        self.max_evaluations = max_evaluations
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.evaluations = 0
+        self.best_fitness = float("-inf")
+        self.best_genome = None
+        self.trace = []
+        self.notes = {}  # solver specific facts, e.g. whether the exact model was solved to optimality
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def remaining(self):
+        return max(0.0, self.time_limit - self.elapsed())
+
+    def count(self, evaluations=1):
+        self.evaluations += evaluations
+
+    def offer(self, fitness, genome):  # genome is copied only when it is a new best
+        if fitness > self.best_fitness + EPSILON:
+            self.best_fitness = fitness
+            self.best_genome = genome[:]
+            self.trace.append((self.elapsed(), self.evaluations, fitness))
+
+    def done(self):
+        return (self.elapsed() >= self.time_limit
+                or (self.target is not None and self.best_fitness >= self.target - EPSILON)
+                or (self.max_evaluations is not None and self.evaluations >= self.max_evaluations))
+
+    def time_to_target(self, target):  # (seconds, evaluations) when the best first reached target, None if never
+        for seconds, evaluations, fitness in self.trace:
+            if fitness >= target - EPSILON:
+                return seconds, evaluations
+        return None
+
+    def summary(self, name, target=None):
+        reached = self.time_to_target(target) if target is not None else None
+        return {"solver": name, "best_fitness": self.best_fitness, "seconds": self.elapsed(),
+                "cpu_seconds": time.process_time() - self.cpu_started, "evaluations": self.evaluations,
+                "seconds_to_target": reached and reached[0], "evaluations_to_target": reached and reached[1],
+                **self.notes}
+
+# genetic algorithms, the two scripts' loops from ga_engines.py with the same options
+#   greedy_share, repair, memetic, memetic_interval, memetic_top, memetic_steps, adaptive (on or off)
+#   evaluations are counted and the best offered once per generation
+
+def heap_ga(tables, run, rng, population_size=500, mutation_rate=0.01, greedy_share=0.0, adaptive=False,
+            **options):  # steady state, worst member replaced, options as SteadyStateGA (crossover, repair, memetic...)
+    control = AdaptiveControl(mutation_rate, temperature=None, crossover="uniform") if adaptive else None
+    engine = SteadyStateGA(tables, population_size, mutation_rate, rng=rng, control=control, **options)
+    run.count(engine.seed(greedy_share=greedy_share))
+    run.offer(*engine.best())
+    generation = 0
+    while not run.done():
+        generation += 1
+        run.count(engine.step(generation))
+        run.offer(*engine.best())
+
+def softmax_ga(tables, run, rng, population_size=500, selection="softmax", temperature=1.0, mutation_rate=0.01,
+               greedy_share=0.0, adaptive=False, **options):  # generational, options as GenerationalGA
+    control = AdaptiveControl(mutation_rate, temperature, "single_point") if adaptive else None
+    engine = GenerationalGA(tables, population_size, mutation_rate, selection, temperature, rng=rng, control=control,
+                            **options)
+    engine.seed(greedy_share=greedy_share)
+    generation = 0
+    while not run.done():  # every schedule replaced each round
+        generation += 1
+        scores, evaluations = engine.evaluate(generation)
+        run.count(evaluations)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        run.offer(scores[best], block_genome(tables, engine.population, best))
+        engine.breed(generation, scores)
+
+# single schedule searches over one-field moves, scored incrementally
+
+def _random_move(evaluator, sizes, rng):  # one activity gets a new room, time or facilitator
+    a = rng.randrange(len(evaluator.assignment))
+    field = rng.randrange(3)
+    move = evaluator.assignment[a][:]
+    move[field] = rng.randrange(sizes[field])
+    return a, move
+
+def annealing(tables, run, rng, start_temperature=1.0, cooling=0.9995, min_temperature=1e-3):
+    sizes = (len(tables.room_names), len(tables.time_names), len(tables.facilitator_names))
+    evaluator = IncrementalFitness(DeltaTables(tables), genome_triples(random_genome(new_genome(tables), tables, rng)))
+    run.count()
+    run.offer(evaluator.fitness, genome_from_triples(tables, evaluator.assignment))
+    temperature = start_temperature
+    while not run.done():
+        for _ in range(256):  # the clock is only read between batches of moves
+            a, move = _random_move(evaluator, sizes, rng)
+            delta = evaluator.move_delta(a, *move)
+            run.count()
+            if delta >= 0 or rng.random() < math.exp(delta / temperature):
+                evaluator.set(a, *move)
+                if evaluator.fitness > run.best_fitness + EPSILON:
+                    run.offer(evaluator.fitness, genome_from_triples(tables, evaluator.assignment))
+            temperature *= cooling
+            if temperature < min_temperature:  # reheat from the best schedule so far
+                temperature = start_temperature
+                evaluator.apply(genome_triples(run.best_genome))
+
+def tabu(tables, run, rng, steps=50, tenure=7, kick=3):  # iterated tabu search, restarts from a kicked best
+    sizes = (len(tables.room_names), len(tables.time_names), len(tables.facilitator_names))
+    evaluator = IncrementalFitness(DeltaTables(tables), genome_triples(random_genome(new_genome(tables), tables, rng)))
+    run.count()
+    while not run.done():
+        run.count(tabu_search(evaluator, steps, tenure, patience=steps))
+        run.offer(evaluator.fitness, genome_from_triples(tables, evaluator.assignment))
+        evaluator.apply(genome_triples(run.best_genome))
+        for _ in range(kick):  # a few random moves so the next search starts somewhere new
+            a, move = _random_move(evaluator, sizes, rng)
+            evaluator.set(a, *move)
+
+# exact baseline, a 0/1 model of the same fitness solved with CBC through PuLP (optional dependency)
+
+def exact(tables, run, rng, solver_threads=1):
+    try:
+        import pulp  # only this solver needs it
+    except ImportError:
+        raise ImportError("the exact solver needs PuLP (pip install pulp)") from None
+    n_activities = len(tables.activity_names)
+    rooms, times, facilitators = (range(len(names)) for names in
+                                  (tables.room_names, tables.time_names, tables.facilitator_names))
+    activities = range(n_activities)
+    counts = range(n_activities + 1)
+    model = pulp.LpProblem("schedule", pulp.LpMaximize)
+    binary = lambda name, *keys: pulp.LpVariable.dicts(name, keys, cat="Binary")  # one 0/1 variable per key combination
+    place = binary("place", activities, rooms, times)  # activity a in room r at time t
+    staff = binary("staff", activities, facilitators, times)  # activity a led by f at time t
+    room_count = binary("room_count", rooms, times, counts)  # one-hot number of activities in a room/time cell
+    staff_count = binary("staff_count", facilitators, times, counts)
+    load = binary("load", facilitators, counts)  # one-hot total activities per facilitator
+    objective = []
+
+    for a in activities:
+        model += pulp.lpSum(place[a][r][t] for r in rooms for t in times) == 1
+        for t in times:  # room and facilitator agree on the time
+            model += pulp.lpSum(place[a][r][t] for r in rooms) == pulp.lpSum(staff[a][f][t] for f in facilitators)
+        objective += [tables.room_score[a, r] * place[a][r][t] for r in rooms for t in times]
+        objective += [tables.facilitator_score[a, f] * staff[a][f][t] for f in facilitators for t in times]
+    for r in rooms:
+        for t in times:
+            model += pulp.lpSum(room_count[r][t][k] for k in counts) == 1
+            model += pulp.lpSum(k * room_count[r][t][k] for k in counts) == pulp.lpSum(place[a][r][t] for a in activities)
+            objective += [tables.room_clash_score[k] * room_count[r][t][k] for k in counts]
+    for f in facilitators:
+        for t in times:
+            model += pulp.lpSum(staff_count[f][t][k] for k in counts) == 1
+            model += pulp.lpSum(k * staff_count[f][t][k] for k in counts) == pulp.lpSum(staff[a][f][t] for a in activities)
+            objective += [tables.facilitator_clash_score[k] * staff_count[f][t][k] for k in counts]
+        model += pulp.lpSum(load[f][k] for k in counts) == 1
+        model += pulp.lpSum(k * load[f][k] for k in counts) == pulp.lpSum(staff[a][f][t] for a in activities for t in times)
+        objective += [tables.load_score[f, min(k, LOAD_LEVELS - 1)] * load[f][k] for k in counts]
+
+    zone_rooms = [[r for r in rooms if tables.room_zone[r] == z] for z in (0, 1)]
+    def at(a, t, z=None):  # 1 when activity a is at time t (in zone z), a linear expression
+        return pulp.lpSum(place[a][r][t] for r in (rooms if z is None else zone_rooms[z]))
+    def both(name, x, y):  # product of two 0/1 expressions, exact because each side is 0 or 1
+        p = pulp.LpVariable(name, 0, 1)
+        model.addConstraint(p <= x)
+        model.addConstraint(p <= y)
+        model.addConstraint(p >= x + y - 1)
+        return p
+    for i, (a, b) in enumerate(tables.section_pairs.tolist()):
+        objective += [tables.section_score[ta, tb] * both(f"s{i}_{ta}_{tb}", at(a, ta), at(b, tb))
+                      for ta in times for tb in times if tables.section_score[ta, tb]]
+    for i, (a, b) in enumerate(tables.cross_pairs.tolist()):
+        objective += [tables.cross_score[ta, tb, za ^ zb] * both(f"c{i}_{ta}_{za}_{tb}_{zb}", at(a, ta, za), at(b, tb, zb))
+                      for ta in times for tb in times for za in (0, 1) for zb in (0, 1)
+                      if tables.cross_score[ta, tb, za ^ zb] and zone_rooms[za] and zone_rooms[zb]]
+    model += pulp.lpSum(objective)
+
+    status = model.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=max(1, int(run.remaining())), threads=solver_threads))
+    solved = {pulp.LpSolutionOptimal: "optimal", pulp.LpSolutionIntegerFeasible: "feasible, time limit"}
+    run.notes["status"] = solved.get(model.sol_status, f"no schedule ({pulp.LpStatus[status]})")
+    if model.sol_status not in solved:
+        return
+    genome = new_genome(tables)
+    for a in activities:
+        genome[3 * a + ROOM], genome[3 * a + TIME] = next((r, t) for r in rooms for t in times if place[a][r][t].value() > 0.5)
+        genome[3 * a + FACILITATOR] = next(f for f in facilitators if staff[a][f][genome[3 * a + TIME]].value() > 0.5)
+    run.count()
+    run.offer(float(batch_fitness(tables, np.array(genome_triples(genome)))), genome)  # scored like every other solver
+
+SOLVERS = {"heap_ga": heap_ga, "softmax_ga": softmax_ga, "annealing": annealing, "tabu": tabu, "exact": exact}
+
+def solve(name, tables, time_limit=10.0, target=None, max_evaluations=None, seed=None, run=None,
+          **options):  # -> SolverRun, run is for callers that watch the search (a SolverRun subclass)
+    if name not in SOLVERS:
+        raise ValueError(f"unknown solver: {name}")
+    run = run or SolverRun(time_limit, target, max_evaluations)
+    SOLVERS[name](tables, run, random.Random(seed), **options)
+    return run
+
+# comparison on one instance
+
+def compare_solvers(tables, names, time_limit=10.0, target=None, repeats=1, seed=0, report=print):  # -> summaries
+    summaries = []
+    for name in names:
+        for repeat in range(repeats):
+            try:
+                run = solve(name, tables, time_limit, target, seed=seed + repeat)
+            except ImportError as error:  # optional solvers are skipped, not fatal
+                report(f"{name}: skipped, {error}")
+                break
+            summary = run.summary(name, target)
+            summary["seed"] = seed + repeat
+            summaries.append(summary)
+            report(format_summary(summary))
+    return summaries
+
+def format_summary(s):
+    reached = "-" if s["seconds_to_target"] is None else f"{s['seconds_to_target']:.3f}s/{s['evaluations_to_target']}"
+    return (f"{s['solver']:<12}seed={s['seed']:<4}best={s['best_fitness']:>9.3f}  time={s['seconds']:>7.2f}s  "
+            f"cpu={s['cpu_seconds']:>7.2f}s  evals={s['evaluations']:>10}  to target={reached}"
+            + (f"  ({s['status']})" if "status" in s else ""))  # cpu is this process only, CBC runs in its own
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs every solver on one instance and reports time to target.")
+    parser.add_argument("--instance", default=BUILT_IN, help="problem instance file (.json/.toml) or CSV folder")
+    parser.add_argument("--variant", choices=["minheap", "probdist"], default="minheap", help="fitness rules")
+    parser.add_argument("--solvers", default=",".join(SOLVERS), help="comma separated solver names")
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds per solver run")
+    parser.add_argument("--target", type=float, default=None, help="fitness to time; runs stop once they reach it")
+    parser.add_argument("--repeats", type=int, default=1, help="runs per solver, seeds seed..seed+repeats-1")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    compare_solvers(load_instance(args.instance, args.variant), args.solvers.split(","), args.time_limit, args.target,
+                    args.repeats, args.seed)
+
+if __name__ == "__main__":
+    main()
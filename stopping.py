@@ -0,0 +1,115 @@
+# Dylan Orpin
+# Assignment 2 (stopping policies)
+
+# imports
+import time  # used for the wall clock budget
+
+# a criterion looks at the run's progress after each generation and returns a reason to stop, or None
+#   progress.generation   generations finished (1-based)
+#   progress.history      the tracked value per generation (best fitness for the heap, average for prob dist)
+#   progress.best         best fitness so far
+#   progress.evaluations  schedules scored so far, local search moves and immigrants included
+#   progress.elapsed()    seconds since the run (or the resumed run) started
+# gains are compared against max(rel_tol * |reference|, abs_tol), so zero and negative fitness behave
+
+def _threshold(reference, rel_tol, abs_tol):
+    return max(rel_tol * abs(reference), abs_tol)
+
+class SinceGeneration:  # the original rule: little gain since a fixed generation
+    def __init__(self, anchor=101, rel_tol=0.01, abs_tol=1e-9):
+        self.anchor, self.rel_tol, self.abs_tol = anchor, rel_tol, abs_tol
+
+    def check(self, progress):
+        if progress.generation <= self.anchor:
+            return None
+        reference = progress.history[self.anchor - 1]
+        if progress.history[-1] - reference < _threshold(reference, self.rel_tol, self.abs_tol):
+            return f"<{self.rel_tol * 100:g}% improvement since generation {self.anchor}"
+        return None
+
+class Stagnation:  # little gain over the last `window` generations
+    def __init__(self, window=50, rel_tol=0.01, abs_tol=1e-9):
+        self.window, self.rel_tol, self.abs_tol = window, rel_tol, abs_tol
+
+    def check(self, progress):
+        if len(progress.history) <= self.window:
+            return None
+        reference = progress.history[-self.window - 1]
+        if progress.history[-1] - reference < _threshold(reference, self.rel_tol, self.abs_tol):
+            return f"<{self.rel_tol * 100:g}% improvement over the last {self.window} generations"
+        return None
+
+class MaxEvaluations:
+    def __init__(self, limit):
+        self.limit = limit
+
+    def check(self, progress):
+        return f"evaluation budget of {self.limit} used" if progress.evaluations >= self.limit else None
+
+class MaxSeconds:  # checked between generations, so a run can overrun by at most one generation
+    def __init__(self, limit):
+        self.limit = limit
+
+    def check(self, progress):
+        return f"time budget of {self.limit:g}s used" if progress.elapsed() >= self.limit else None
+
+class TargetFitness:
+    def __init__(self, target):
+        self.target = target
+
+    def check(self, progress):
+        return f"target fitness {self.target:g} reached" if progress.best >= self.target else None
+
+# combines criteria, the first one that fires stops the run
+
+class StoppingRules:
+    def __init__(self, *criteria):
+        self.criteria = list(criteria)
+        self.generation = 0
+        self.history = []
+        self.best = float("-inf")
+        self.evaluations = 0
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def update(self, generation, tracked, best, evaluations):  # -> reason to stop or None
+        self.generation = generation
+        self.history.append(tracked)
+        self.best = max(self.best, best)
+        self.evaluations += evaluations
+        for criterion in self.criteria:
+            reason = criterion.check(self)
+            if reason:
+                return reason
+        return None
+
+    def resume(self, history, evaluations=0):  # continues from a checkpoint, the clock starts again
+        self.history = list(history)
+        self.generation = len(self.history)
+        self.evaluations = evaluations
+
+def add_stopping_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--stagnation", type=int, default=None,
+                        help="stop after this many generations without enough gain (default: gain since generation 101)")
+    parser.add_argument("--rel-tol", type=float, default=0.01, help="gain below this share of |fitness| is stagnation")
+    parser.add_argument("--abs-tol", type=float, default=1e-9, help="gain below this is stagnation, whatever the fitness")
+    parser.add_argument("--max-evaluations", type=int, default=None, help="stop once this many schedules were scored")
+    parser.add_argument("--max-seconds", type=float, default=None, help="stop once this many seconds have passed")
+    parser.add_argument("--target", type=float, default=None, help="stop once the best fitness reaches this")
+
+def rules_from_args(stagnation=None, rel_tol=0.01, abs_tol=1e-9, max_evaluations=None, max_seconds=None, target=None,
+                    since_generation=101):  # since_generation=None: no gain rule unless --stagnation asks for one
+    criteria = []
+    if stagnation:
+        criteria.append(Stagnation(stagnation, rel_tol, abs_tol))
+    elif since_generation:
+        criteria.append(SinceGeneration(since_generation, rel_tol, abs_tol))
+    if max_evaluations is not None:
+        criteria.append(MaxEvaluations(max_evaluations))
+    if max_seconds is not None:
+        criteria.append(MaxSeconds(max_seconds))
+    if target is not None:
+        criteria.append(TargetFitness(target))
+    return StoppingRules(*criteria)
@@ -0,0 +1,206 @@
+# Dylan Orpin
+# Assignment 2 (hyperparameter sweep)
+
+# runs from the command line, for example
+#   python sweep.py --engines heap_ga,softmax_ga --populations 100,250,500,1000 --mutation-rates 0.002,0.01,0.05
+#   python sweep.py --instances 11,100 --samples 20 --seeds 5 --workers 8 --output sweep.json
+
+# imports
+import argparse  # used for the command line options
+import csv  # used for the .csv report
+import itertools  # used for the configuration grid
+import json  # used for the .json report
+import math  # used for the rung budgets
+import os  # used for file extensions
+import random  # used for sampling configurations
+import statistics  # used for the per-config summaries
+from concurrent.futures import ProcessPoolExecutor  # used for running configurations on every core
+from instance_loader import BUILT_IN, compile_instance, load_instance, synthetic_instance  # used for instances
+from run_config import fresh_seed, spawn_seeds  # used for the per-run seeds
+from selection import SELECTION_SCHEMES  # used for the selection choices
+from solvers import solve  # used for the GA engines, budgeted by evaluations
+
+# successive halving: every configuration gets a small evaluation budget, the best 1/eta go on to eta times the
+# budget, and so on until one rung reaches max_evaluations
+#   every configuration runs the same seeds at each rung (common random numbers), so differences are the settings
+#   rather than the luck of the draw, and ranking is by the mean best fitness over those seeds
+#   budgets are evaluations, not seconds, so a rung is fair whatever else the machine is doing; CPU seconds are
+#   measured in the worker and reported next to the fitness
+#   racing: after each rung, configurations whose best seed is below the leader's worst seed are dropped even if
+#   they would have made the cut, every run of theirs lost to every run of the leader
+#   the quality vs CPU front is drawn among the configurations of the last rung, at equal budgets
+
+ENGINES = ("heap_ga", "softmax_ga")  # the two scripts' loops, see solvers.py
+
+# configurations
+
+def config_name(config):
+    return " ".join(f"{key}={value}" for key, value in config.items())
+
+def config_grid(engines, populations, mutation_rates, selections, temperatures):  # -> list of option dicts
+    configs = []
+    for engine, population_size, mutation_rate in itertools.product(engines, populations, mutation_rates):
+        base = {"engine": engine, "population_size": population_size, "mutation_rate": mutation_rate}
+        if engine != "softmax_ga":  # the heap GA picks parents uniformly, it has no selection settings
+            configs.append(base)
+            continue
+        for selection in selections:
+            for temperature in temperatures if selection == "softmax" else [1.0]:  # only softmax has a temperature
+                configs.append(dict(base, selection=selection, temperature=temperature))
+    return configs
+
+def sample_configs(configs, n, rng):  # random subset of the grid, in grid order
+    if n is None or n >= len(configs):
+        return configs
+    return [configs[i] for i in sorted(rng.sample(range(len(configs)), n))]
+
+# one run, in a worker process
+
+_tables = {}  # compiled instances, one per worker process and instance
+
+def instance_tables(instance, variant):  # instance: path or number of activities for a synthetic instance
+    key = (instance, variant)
+    if key not in _tables:
+        if isinstance(instance, int):
+            _tables[key] = compile_instance(synthetic_instance(instance, 0), variant)
+        else:
+            _tables[key] = load_instance(instance, variant)
+    return _tables[key]
+
+def run_one(instance, variant, config, seed, evaluations, time_limit):  # -> (best fitness, CPU seconds)
+    options = dict(config)
+    engine = options.pop("engine")
+    run = solve(engine, instance_tables(instance, variant), time_limit, max_evaluations=evaluations, seed=seed,
+                **options)
+    summary = run.summary(engine)
+    return summary["best_fitness"], summary["cpu_seconds"]
+
+# the sweep
+
+def rung_budgets(min_evaluations, max_evaluations, eta):  # min, min*eta, ... up to and including max
+    rungs = max(1, math.floor(math.log(max_evaluations / min_evaluations, eta) + 1e-9) + 1)
+    return [int(min_evaluations * eta ** r) for r in range(rungs - 1)] + [max_evaluations]
+
+def successive_halving(instance, variant, configs, seeds, min_evaluations=5_000, max_evaluations=150_000, eta=3,
+                       time_limit=600.0, pool=None, report=print):  # -> one result per config, best first
+    results = [{"config": config, "rung": -1, "evaluations": 0, "fitness": [], "cpu_seconds": [], "total_cpu": 0.0}
+               for config in configs]
+    alive = list(range(len(configs)))
+    budgets = rung_budgets(min_evaluations, max_evaluations, eta)
+    for rung, budget in enumerate(budgets):
+        tasks = [(i, seed) for i in alive for seed in seeds]
+        args = [(instance, variant, configs[i], seed, budget, time_limit) for i, seed in tasks]
+        outcomes = pool.map(run_one, *zip(*args)) if pool is not None else itertools.starmap(run_one, args)
+        for i in alive:
+            results[i].update(rung=rung, evaluations=budget, fitness=[], cpu_seconds=[])
+        for (i, _), (fitness, cpu) in zip(tasks, outcomes):
+            results[i]["fitness"].append(fitness)
+            results[i]["cpu_seconds"].append(cpu)
+            results[i]["total_cpu"] += cpu
+        for i in alive:
+            result = results[i]
+            result["mean"] = statistics.fmean(result["fitness"])
+            result["stdev"] = statistics.stdev(result["fitness"]) if len(result["fitness"]) > 1 else 0.0
+            result["mean_cpu"] = statistics.fmean(result["cpu_seconds"])
+        alive.sort(key=lambda i: (-results[i]["mean"], results[i]["mean_cpu"]))  # ties go to the cheaper setting
+        if rung == len(budgets) - 1:
+            break
+        leader = results[alive[0]]
+        keep = max(1, len(alive) // eta)
+        survivors = [i for i in alive[:keep] if max(results[i]["fitness"]) >= min(leader["fitness"])]  # the race
+        if report is not None:
+            report(f"rung {rung}: {len(alive)} configs x {len(seeds)} seeds at {budget} evaluations, "
+                   f"best mean {leader['mean']:.3f}, {len(survivors)} go on")
+        alive = survivors
+    if report is not None:
+        report(f"rung {len(budgets) - 1}: {len(alive)} configs x {len(seeds)} seeds at {budgets[-1]} evaluations, "
+               f"best mean {results[alive[0]]['mean']:.3f}")
+    finalists = [results[i] for i in alive]  # only they ran the full budget, earlier rungs are not comparable
+    for i, result in enumerate(results):  # quality vs CPU: no other finalist has at least the fitness for less CPU
+        result["front"] = i in alive and not any(
+            other is not result and other["mean"] >= result["mean"] and other["mean_cpu"] <= result["mean_cpu"]
+            and (other["mean"] > result["mean"] or other["mean_cpu"] < result["mean_cpu"]) for other in finalists)
+    return sorted(results, key=lambda r: (-r["rung"], -r["mean"], r["mean_cpu"]))
+
+# reporting
+
+def format_report(instance, results):
+    lines = [f"\nInstance {instance}: {len(results)} configurations, "
+             f"{sum(r['total_cpu'] for r in results):.1f} CPU seconds in total",
+             f"{'rank':>4}  {'rung':>4}  {'evals':>8}  {'mean':>8}  {'stdev':>7}  {'cpu s':>8}  front  configuration"]
+    for rank, r in enumerate(results, 1):
+        lines.append(f"{rank:>4}  {r['rung']:>4}  {r['evaluations']:>8}  {r['mean']:>8.3f}  {r['stdev']:>7.3f}  "
+                     f"{r['mean_cpu']:>8.3f}  {'*' if r['front'] else ' ':^5}  {config_name(r['config'])}")
+    return "\n".join(lines)
+
+def write_report(path, report):  # {instance: results}, .json with every run or a .csv row per configuration
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    elif extension == ".csv":
+        keys = sorted({key for results in report["instances"].values() for r in results for key in r["config"]})
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["instance", "rank", "rung", "evaluations", "mean", "stdev", "mean_cpu", "total_cpu",
+                             "front"] + keys)
+            for instance, results in report["instances"].items():
+                for rank, r in enumerate(results, 1):
+                    writer.writerow([instance, rank, r["rung"], r["evaluations"], r["mean"], r["stdev"], r["mean_cpu"],
+                                     r["total_cpu"], r["front"]] + [r["config"].get(key, "") for key in keys])
+    else:
+        raise ValueError(f"unknown report format {extension!r}, use .json or .csv")
+
+def parse_list(kind):
+    return lambda text: [kind(part) for part in text.split(",") if part]
+
+def parse_instance(text):  # a number is a synthetic instance with that many activities
+    return int(text) if text.isdigit() else text
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunes GA settings with successive halving across a process pool.")
+    parser.add_argument("--instances", type=parse_list(parse_instance), default=[BUILT_IN],
+                        help="comma separated instance files, or activity counts for synthetic instances")
+    parser.add_argument("--variant", choices=["minheap", "probdist"], default="minheap", help="fitness rules")
+    parser.add_argument("--engines", type=parse_list(str), default=list(ENGINES), help="comma separated GA engines")
+    parser.add_argument("--populations", type=parse_list(int), default=[100, 250, 500, 1000])
+    parser.add_argument("--mutation-rates", type=parse_list(float), default=[0.002, 0.01, 0.05])
+    parser.add_argument("--selections", type=parse_list(str), default=list(SELECTION_SCHEMES),
+                        help="selection schemes for softmax_ga")
+    parser.add_argument("--temperatures", type=parse_list(float), default=[0.5, 1.0, 2.0],
+                        help="temperatures for softmax selection")
+    parser.add_argument("--samples", type=int, default=None, help="random sample of this many configurations from the grid")
+    parser.add_argument("--seeds", type=int, default=3, help="runs per configuration and rung")
+    parser.add_argument("--min-evaluations", type=int, default=5_000, help="budget of the first rung")
+    parser.add_argument("--max-evaluations", type=int, default=150_000, help="budget of the last rung (300 x 500)")
+    parser.add_argument("--eta", type=int, default=3, help="1/eta of the configurations survive each rung")
+    parser.add_argument("--time-limit", type=float, default=600.0, help="seconds any one run may take")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--output", default=None, help="write the ranked report as .json or .csv")
+    parser.add_argument("--seed", type=int, default=None, help="seed for sampling and the runs (default: a fresh one)")
+    args = parser.parse_args()
+    unknown = [engine for engine in args.engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+    if args.eta < 2 or args.min_evaluations > args.max_evaluations:
+        parser.error("--eta must be at least 2 and --min-evaluations at most --max-evaluations")
+
+    seed = fresh_seed() if args.seed is None else args.seed
+    print(f"Seed: {seed}")
+    configs = sample_configs(config_grid(args.engines, args.populations, args.mutation_rates, args.selections,
+                                         args.temperatures), args.samples, random.Random(seed))
+    seeds = spawn_seeds(seed, args.seeds)
+    print(f"{len(configs)} configurations, {args.seeds} seeds, rungs at "
+          f"{', '.join(map(str, rung_budgets(args.min_evaluations, args.max_evaluations, args.eta)))} evaluations")
+    report = {"seed": seed, "variant": args.variant, "instances": {}}
+    with ProcessPoolExecutor(args.workers) as pool:
+        for instance in args.instances:
+            results = successive_halving(instance, args.variant, configs, seeds, args.min_evaluations,
+                                         args.max_evaluations, args.eta, args.time_limit, pool)
+            print(format_report(instance, results))
+            report["instances"][str(instance)] = results
+    if args.output:
+        write_report(args.output, report)
+
+if __name__ == "__main__":
+    main()
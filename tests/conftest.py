@@ -0,0 +1,8 @@
+# Dylan Orpin
+# Assignment 2 (test setup)
+
+# imports
+import os  # used for the repository path
+import sys  # used for importing the modules under test
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the modules sit in the repo root
@@ -0,0 +1,30 @@
+# Dylan Orpin
+# Assignment 2 (evaluator backend tests)
+
+# imports
+import random  # used for the random schedules
+import pytest  # used for the test cases
+from evaluators import EVALUATORS, make_evaluator  # the scoring backends
+from fitness_engine import batch_fitness  # the serial reference
+from instance_loader import compile_instance, synthetic_instance  # used for the test instance
+from operators import numpy_rng, random_block  # used for random schedules
+from test_resume import run  # used for running the prob dist script
+
+# every backend has to return exactly the serial scores in the same order, so a seed repeats a run whichever
+# backend scored it; small chunks make the pooled backends split the block across workers
+
+@pytest.mark.parametrize("backend", sorted(EVALUATORS))
+def test_backend_scores_match_serial(backend):
+    tables = compile_instance(synthetic_instance(40, 0), "probdist")
+    evaluator = make_evaluator(backend, tables, workers=2, chunk_size=97)
+    try:
+        for n in (1, 500, 2000):  # the shared buffers grow between calls
+            block = random_block(tables, n, numpy_rng(random.Random(n)))
+            assert evaluator.evaluate(block).tolist() == batch_fitness(tables, block).tolist()
+    finally:
+        evaluator.close()
+
+def test_runs_match_across_backends(tmp_path):
+    options = ["--generations", "15", "--workers", "2"]
+    runs = {backend: run("probdist", options + ["--evaluator", backend], tmp_path) for backend in sorted(EVALUATORS)}
+    assert all(lines == runs["serial"] for lines in runs.values())
@@ -0,0 +1,89 @@
+# Dylan Orpin
+# Assignment 2 (fitness tests)
+
+# run with: python -m pytest -q
+
+# imports
+import random  # used for random moves
+import numpy as np  # used for one-schedule blocks
+import pytest  # used for the test cases
+from benchmarks import load_script  # used for importing both scripts
+from delta_fitness import DeltaTables, IncrementalFitness  # the incremental evaluator
+from fitness_engine import batch_fitness  # the vectorized evaluator
+from genome import block_genome, genome_triples  # used for schedules
+from instance_loader import compile_instance, synthetic_instance  # used for the larger instances
+from operators import numpy_rng, random_block  # used for random schedules
+
+# batch_fitness replaced both scripts' compute_fitness in the GA loops, the original functions are kept as the
+# reference; IncrementalFitness has to agree with batch_fitness after any sequence of moves
+
+N = 300  # random schedules per case, enough to hit the SLA100/191 pair rules on the built-in instance
+
+@pytest.fixture(scope="module")
+def heap():
+    return load_script("heap")
+
+@pytest.fixture(scope="module")
+def probdist():
+    return load_script("probdist")
+
+def test_batch_matches_heap_compute_fitness(heap):
+    block = random_block(heap.TABLES, N, numpy_rng(random.Random(1)))
+    expected = [heap.compute_fitness(heap.Schedule(block_genome(heap.TABLES, block, i))) for i in range(N)]
+    assert batch_fitness(heap.TABLES, block).tolist() == pytest.approx(expected, abs=1e-9)
+
+def test_batch_matches_probdist_compute_fitness(probdist):
+    block = random_block(probdist.TABLES, N, numpy_rng(random.Random(2)))
+    expected = [probdist.compute_fitness(probdist.schedule_entries(block_genome(probdist.TABLES, block, i)))
+                for i in range(N)]
+    assert batch_fitness(probdist.TABLES, block).tolist() == pytest.approx(expected, abs=1e-9)
+
+@pytest.mark.parametrize("script, variant", [("heap", "minheap"), ("probdist", "probdist")])
+def test_compute_fitness_follows_use_instance(script, variant):  # a fresh copy, the fixtures keep the built-in one
+    module = load_script(script)
+    tables = compile_instance(synthetic_instance(40, 0), variant)
+    module.use_instance(tables)
+    block = random_block(tables, 20, numpy_rng(random.Random(4)))
+    genomes = [block_genome(tables, block, i) for i in range(len(block))]
+    if script == "heap":
+        actual = [module.compute_fitness(module.Schedule(genome)) for genome in genomes]
+    else:
+        actual = [module.compute_fitness(module.schedule_entries(genome)) for genome in genomes]
+    assert actual == pytest.approx(batch_fitness(tables, block).tolist(), abs=1e-9)
+
+def variant_tables(variant, activities):  # the built-in instance for 11 activities, a synthetic one otherwise
+    if activities == 11:
+        return load_script("heap" if variant == "minheap" else "probdist").TABLES
+    return compile_instance(synthetic_instance(activities, 0), variant)
+
+@pytest.mark.parametrize("variant", ["minheap", "probdist"])
+@pytest.mark.parametrize("activities", [11, 60])
+def test_incremental_matches_batch(variant, activities):
+    tables = variant_tables(variant, activities)
+    delta_tables = DeltaTables(tables)
+    block = random_block(tables, 50, numpy_rng(random.Random(3)))
+    expected = batch_fitness(tables, block)
+    for i in range(len(block)):
+        assert IncrementalFitness(delta_tables, block[i].tolist()).fitness == pytest.approx(expected[i], abs=1e-9)
+
+@pytest.mark.parametrize("variant", ["minheap", "probdist"])
+def test_incremental_follows_moves(variant):
+    tables = variant_tables(variant, 11)
+    delta_tables = DeltaTables(tables)
+    sizes = (delta_tables.n_rooms, delta_tables.n_times, delta_tables.n_facilitators)
+    rng = random.Random(4)
+    block = random_block(tables, 2, numpy_rng(random.Random(4)))
+    evaluator = IncrementalFitness(delta_tables, block[0].tolist())
+    for _ in range(N):  # single-field moves, each delta checked against a full score of the moved schedule
+        a = rng.randrange(len(evaluator.assignment))
+        move = evaluator.assignment[a][:]
+        field = rng.randrange(3)
+        move[field] = rng.randrange(sizes[field])
+        before = evaluator.fitness
+        delta = evaluator.move_delta(a, *move)
+        evaluator.set(a, *move)
+        moved = batch_fitness(tables, np.array([evaluator.assignment], dtype=block.dtype))[0]
+        assert evaluator.fitness == pytest.approx(moved, abs=1e-9)
+        assert before + delta == pytest.approx(moved, abs=1e-9)
+    evaluator.apply(genome_triples(block_genome(tables, block, 1)))  # a jump to a whole other schedule
+    assert evaluator.fitness == pytest.approx(batch_fitness(tables, block[1:])[0], abs=1e-9)
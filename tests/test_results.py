@@ -0,0 +1,36 @@
+# Dylan Orpin
+# Assignment 2 (results output tests)
+
+# imports
+import argparse  # used for a parser to check the options against
+import pytest  # used for the test cases
+from results import _ParquetBatches, add_output_arguments, check_output_arguments  # the output helpers
+
+# unknown formats must be refused while parsing, and parquet must keep every column whichever batch it first shows up in
+
+def parse(argv):
+    parser = argparse.ArgumentParser()
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    check_output_arguments(parser, args)
+    return args
+
+@pytest.mark.parametrize("argv", [["--export", "best.txt"], ["--results", "run.csv"]])
+def test_unknown_format_fails_while_parsing(argv):
+    with pytest.raises(SystemExit):
+        parse(argv)
+
+def test_known_formats_parse():
+    args = parse(["--export", "best.JSON", "--results", "run.parquet"])
+    assert args.export == "best.JSON"
+
+def test_parquet_keeps_late_columns_and_mixed_types(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "run.parquet")
+    writer = _ParquetBatches(path)
+    writer.write_batch([{"kind": "generation", "generation": 1, "value": 1.5}])
+    writer.write_batch([{"kind": "improvement", "generation": 2, "value": "text", "schedule": [["SLA100A", "Roman 201"]]}])
+    writer.close()
+    rows = parquet.read_table(path).to_pylist()
+    assert rows[0]["generation"] == 1.0 and rows[0]["value"] == "1.5" and rows[0]["schedule"] is None
+    assert rows[1]["value"] == "text" and rows[1]["schedule"] == '[["SLA100A", "Roman 201"]]'
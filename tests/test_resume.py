@@ -0,0 +1,37 @@
+# Dylan Orpin
+# Assignment 2 (checkpoint and resume tests)
+
+# imports
+import os  # used for the script paths
+import subprocess  # used for running the scripts
+import sys  # used for the interpreter path
+import pytest  # used for the test cases
+from benchmarks import HERE, SCRIPTS  # used for the script paths
+
+# a run stopped after a checkpoint and resumed from it has to finish exactly like the run that was never stopped:
+# same population, random streams, cache, adaptive state and stopping counters
+
+HEAP_OPTIONS = ["--max-evaluations", "80000"]
+PROBDIST_OPTIONS = ["--generations", "40"]
+EXTRAS = [[], ["--adaptive", "--memetic", "hill", "--repair", "--cache-size", "5000"]]
+
+def run(engine, options, cwd):  # -> printed lines, those about the checkpoint itself left out
+    result = subprocess.run([sys.executable, os.path.join(HERE, SCRIPTS[engine]), "--seed", "3", "--quiet"] + options,
+                            cwd=cwd, capture_output=True, text=True, check=True)
+    return [line for line in result.stdout.splitlines() if not line.startswith("Resuming from")]
+
+def resumed(engine, options, stop, cwd):  # stopped early by `stop` with a checkpoint, then resumed with `options`
+    checkpoint = os.path.join(cwd, "run.ckpt")
+    run(engine, options + stop + ["--checkpoint", checkpoint, "--checkpoint-every", "2"], cwd)
+    assert os.path.exists(checkpoint)  # the early stop came after at least one checkpoint
+    return run(engine, options + ["--resume", checkpoint], cwd)
+
+@pytest.mark.parametrize("extra", EXTRAS, ids=["plain", "stages"])
+def test_heap_resume_matches_uninterrupted(extra, tmp_path):
+    options = HEAP_OPTIONS + extra
+    assert resumed("heap", options, ["--max-evaluations", "30000"], tmp_path) == run("heap", options, tmp_path)
+
+@pytest.mark.parametrize("extra", EXTRAS, ids=["plain", "stages"])
+def test_probdist_resume_matches_uninterrupted(extra, tmp_path):
+    options = PROBDIST_OPTIONS + extra
+    assert resumed("probdist", options, ["--generations", "17"], tmp_path) == run("probdist", options, tmp_path)
@@ -0,0 +1,50 @@
+# Dylan Orpin
+# Assignment 2 (scheduling service tests)
+
+# imports
+import asyncio  # used for running the scheduler
+import pytest  # used for the test cases
+from service import Scheduler  # the job queue and its worker pool
+
+# a bad job must fail on its own without breaking the queue for everyone else, and a worker that dies mid-job
+# must fail that job and come back so the pool keeps its size
+
+LONG_JOB = {"solver": "heap_ga", "time_limit": 30.0}
+
+async def events_until_end(events):  # -> the final event of a job
+    while True:
+        event = await events.get()
+        if event["event"] in ("done", "cancelled", "error"):
+            return event
+
+def test_bad_priority_is_rejected():
+    scheduler = Scheduler(1)
+    try:
+        with pytest.raises(ValueError):
+            scheduler.submit({"priority": "high"}, lambda event: None)
+        assert scheduler.jobs == {} and scheduler.queue == []  # nothing left behind
+        sent = []
+        scheduler.submit({"priority": 1, "time_limit": 0.1}, sent.append)  # later jobs still queue
+        assert sent[0]["event"] == "queued"
+    finally:
+        scheduler.close()
+
+def test_crashed_worker_fails_its_job_and_is_replaced():
+    async def scenario():
+        scheduler = Scheduler(1)
+        await scheduler.start()
+        try:
+            events = asyncio.Queue()
+            job = scheduler.submit(LONG_JOB, events.put_nowait)
+            while (await events.get())["event"] != "started":
+                pass
+            scheduler.workers[job.worker][0].kill()
+            final = await asyncio.wait_for(events_until_end(events), 10)
+            assert final["event"] == "error" and final["job"] == job.number
+            assert scheduler.workers[0][0].is_alive() and scheduler.idle == [0]
+            events = asyncio.Queue()
+            scheduler.submit({"solver": "heap_ga", "time_limit": 0.2}, events.put_nowait)  # the new worker runs jobs
+            assert (await asyncio.wait_for(events_until_end(events), 30))["event"] == "done"
+        finally:
+            scheduler.close()
+    asyncio.run(scenario())
@@ -0,0 +1,240 @@
+# Dylan Orpin
+# Assignment 2 (warm-start re-optimization)
+
+# imports
+import ast  # used for reading final_schedule.txt lines
+import json  # used for instance diffs and exported timetables
+import random  # used for the varied repairs, seeded by the scripts
+import tomllib  # used for TOML instance diffs
+import numpy as np  # used for the seeded population block
+from delta_fitness import DeltaTables, IncrementalFitness  # used for repairing schedules move by move
+from fitness_engine import ROOM, TIME, FACILITATOR  # field positions
+from genome import genome_from_triples, genome_triples, new_block  # used for schedules
+from instance_loader import BUILT_IN, InstanceError, compile_instance, read_instance  # used for the changed instance
+from local_search import EPSILON  # smaller gains are rounding, not improvements
+from operators import numpy_rng  # used for the perturbations
+
+# after a small change to the instance (a room closes, a facilitator is away) the last published schedule is still
+# almost right, so the run starts from it instead of from random schedules:
+#   activities whose assignment the change broke or touched are "affected", the rest keep their assignment
+#   repaired copies: affected activities are placed again field by field with IncrementalFitness, the first copy
+#   greedily, the others from random starting points and orders so the population is not one schedule
+#   perturbed copies: a repaired copy with a few random fields changed, the neighbourhood the GA searches
+#   freezing pins unaffected activities to their previous assignment for the whole run, so the published timetable
+#   only changes where it has to
+
+# an instance diff (JSON or TOML) lists what changed since the previous schedule was made:
+#   remove: {rooms, time_slots, facilitators, activities}   names
+#   add:    {rooms, time_slots, facilitators, activities}   entries as in an instance document
+#   update: {rooms, activities}                             entries with a name and the fields that changed
+# e.g. {"remove": {"rooms": ["Loft 310"], "facilitators": ["Tyler"]}}
+
+KINDS = ("rooms", "time_slots", "facilitators", "activities")
+STAGNATION = 25  # default --stagnation for warm-started runs, they start near the end of a cold run
+
+def read_diff(path):
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+def _name(entry):
+    return entry if isinstance(entry, str) else entry["name"]
+
+def apply_diff(document, diff):  # instance document + diff -> new instance document, the original is not changed
+    document = json.loads(json.dumps(document))  # deep copy
+    removed = {kind: set(diff.get("remove", {}).get(kind, [])) for kind in KINDS}
+    for kind in KINDS:
+        names = {_name(entry) for entry in document.get(kind, [])}
+        unknown = removed[kind] - names
+        if unknown:
+            raise InstanceError(f"diff removes unknown {kind}: {', '.join(sorted(unknown))}")
+        document[kind] = [entry for entry in document.get(kind, []) if _name(entry) not in removed[kind]]
+        document[kind] += diff.get("add", {}).get(kind, [])
+    for kind in ("rooms", "activities"):
+        by_name = {_name(entry): entry for entry in document[kind]}
+        for change in diff.get("update", {}).get(kind, []):
+            if change["name"] not in by_name:
+                raise InstanceError(f"diff updates unknown {kind}: {change['name']}")
+            by_name[change["name"]].update(change)
+    for activity in document["activities"]:  # a facilitator who is gone is no longer anyone's preference
+        for key in ("preferred", "others"):
+            activity[key] = [f for f in activity.get(key, []) if f not in removed["facilitators"]]
+
+    courses = [[name for name in course if name not in removed["activities"]]
+               for course in document.get("linked_courses", [])]
+    kept = [i for i, course in enumerate(courses) if course]  # courses with no sections left are dropped
+    document["linked_courses"] = [courses[i] for i in kept]
+    if document.get("course_pairs") is not None:
+        new_index = {old: new for new, old in enumerate(kept)}
+        document["course_pairs"] = [[new_index[i], new_index[j]] for i, j in document["course_pairs"]
+                                    if i in new_index and j in new_index]
+    return document
+
+def changed_names(diff):  # rooms and activities the diff added or updated, anything assigned to them is affected
+    return ({change["name"] for kind in ("rooms", "activities") for change in diff.get("update", {}).get(kind, [])}
+            | {_name(entry) for entry in diff.get("add", {}).get("activities", [])})
+
+def changed_instance(instance_path, diff_path, variant):  # -> FitnessTables for the instance after the diff
+    return compile_instance(apply_diff(read_instance(instance_path or BUILT_IN), read_diff(diff_path)), variant)
+
+# previous schedules, whatever the scripts wrote: best_schedule.txt, final_schedule.txt or an --export .json
+
+def read_schedule(path):  # -> {activity: (room, time, facilitator)}
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        if "front" in data:  # a --pareto front, its first schedule has the best weighted fitness
+            data = data["front"][0]
+        return {row["activity"]: (row["room"], row["time"], row["facilitator"]) for row in data["assignments"]}
+    schedule = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("{"):  # prob dist: {'activity': ..., 'room': ..., 'time': ..., 'facilitator': ...}
+                row = ast.literal_eval(line)
+                schedule[row["activity"]] = (row["room"], row["time"], row["facilitator"])
+            elif " @ " in line and " with " in line:  # minheap: "SLA100A: Roman 201 @ 10 AM with Glen"
+                activity, rest = line.split(": ", 1)
+                room, rest = rest.split(" @ ", 1)
+                time, facilitator = rest.rsplit(" with ", 1)
+                schedule[activity] = (room, time, facilitator)
+    if not schedule:
+        raise ValueError(f"no schedule found in {path}")
+    return schedule
+
+# repair
+
+def _indexes(tables, previous):  # previous assignment as indexes in the new tables, -1 where a name is gone
+    triples = []
+    for name in tables.activity_names:
+        room, time, facilitator = previous.get(name, (None, None, None))
+        triples.append([tables.room_index.get(room, -1), tables.time_index.get(time, -1),
+                        tables.facilitator_index.get(facilitator, -1)])
+    return triples
+
+def affected_activities(tables, previous, changed=()):  # activity indexes the previous schedule cannot keep as is
+    return [a for a, (name, triple) in enumerate(zip(tables.activity_names, _indexes(tables, previous)))
+            if -1 in triple or name in changed or tables.room_names[triple[ROOM]] in changed]
+
+def repair(tables, delta_tables, previous, affected, rng=None, passes=2):  # -> IncrementalFitness of the repair
+    sizes = ((ROOM, delta_tables.n_rooms), (TIME, delta_tables.n_times), (FACILITATOR, delta_tables.n_facilitators))
+    triples = _indexes(tables, previous)
+    order = list(affected)
+    if rng is not None:  # a different starting point and order each time, for varied copies
+        rng.shuffle(order)
+    for a in order:
+        for field, size in sizes:
+            if rng is not None:
+                triples[a][field] = rng.randrange(size)
+            elif triples[a][field] == -1:  # fields that are still valid stay, so fewer things change
+                triples[a][field] = 0
+    searcher = IncrementalFitness(delta_tables, triples)
+    for _ in range(passes):  # later placements can make earlier ones worth moving again
+        for a in order:
+            for field, size in sizes:
+                current = searcher.assignment[a]
+                best_delta, best_value = EPSILON, current[field]
+                for value in range(size):
+                    if value == current[field]:
+                        continue
+                    move = current[:]
+                    move[field] = value
+                    delta = searcher.move_delta(a, *move)
+                    if delta > best_delta:
+                        best_delta, best_value = delta, value
+                if best_value != current[field]:
+                    move = current[:]
+                    move[field] = best_value
+                    searcher.set(a, *move)
+    return searcher
+
+class Freeze:  # pins activities to fixed assignments in genomes, blocks and local search evaluators
+    def __init__(self, triples, activities):
+        self.activities = np.array(sorted(activities), dtype=np.intp)
+        self.values = np.array([triples[a] for a in self.activities], dtype=np.intp).reshape(-1, 3)
+        self.positions = [(3 * a + field, int(value)) for a, row in zip(self.activities.tolist(), self.values)
+                          for field, value in enumerate(row)]
+
+    def apply(self, genome):  # one genome, in place
+        for position, value in self.positions:
+            genome[position] = value
+        return genome
+
+    def apply_block(self, block):  # every row of a block, in place
+        block[:, self.activities] = self.values
+        return block
+
+    def restore(self, evaluator):  # undoes local search moves on pinned activities, the fitness follows
+        for a, row in zip(self.activities.tolist(), self.values.tolist()):
+            evaluator.set(a, *row)
+        return evaluator
+
+class WarmStart:
+    def __init__(self, tables, previous, changed=(), freeze=False, repaired_share=0.2, perturb=3):
+        self.tables = tables
+        self.delta_tables = DeltaTables(tables)
+        self.previous = previous
+        self.affected = affected_activities(tables, previous, changed)
+        self.repaired = repair(tables, self.delta_tables, previous, self.affected)  # the greedy repair
+        self.frozen = None
+        if freeze:
+            unaffected = set(range(len(tables.activity_names))) - set(self.affected)
+            self.frozen = Freeze(self.repaired.assignment, unaffected)
+        self.repaired_share = repaired_share
+        self.perturb = perturb
+
+    def genome(self):  # the greedy repair as a genome
+        return genome_from_triples(self.tables, self.repaired.assignment)
+
+    def population(self, n, rng=None):  # -> (n x activities x 3) block of repaired and perturbed copies
+        block = new_block(self.tables, n)
+        n_repaired = min(n, max(1, int(n * self.repaired_share)))
+        block[0] = genome_triples(self.genome())
+        for i in range(1, n_repaired):
+            block[i] = repair(self.tables, self.delta_tables, self.previous, self.affected, random).assignment
+        movable = self.affected if self.frozen is not None else range(len(self.tables.activity_names))
+        movable = np.array(list(movable), dtype=np.intp)
+        n_perturbed = n - n_repaired
+        if n_perturbed:
+            rng = rng or numpy_rng()
+            rows = np.arange(n_repaired, n)
+            block[rows] = block[rng.integers(0, n_repaired, n_perturbed)]
+            if len(movable) and self.perturb:
+                sizes = np.array([self.delta_tables.n_rooms, self.delta_tables.n_times, self.delta_tables.n_facilitators])
+                activities = movable[rng.integers(0, len(movable), (n_perturbed, self.perturb))]
+                fields = rng.integers(0, 3, (n_perturbed, self.perturb))
+                block[rows[:, None], activities, fields] = rng.integers(0, sizes[fields])
+        return block
+
+    def changes(self, genome):  # -> [(activity, previous assignment or None, new assignment)] that differ
+        found = []
+        for name, triple in zip(self.tables.activity_names, genome_triples(genome)):
+            new = (self.tables.room_names[triple[ROOM]], self.tables.time_names[triple[TIME]],
+                   self.tables.facilitator_names[triple[FACILITATOR]])
+            old = self.previous.get(name)
+            if old is None or tuple(old) != new:
+                found.append((name, old, new))
+        return found
+
+    def describe(self, genome):  # console report of what moved compared with the previous schedule
+        changes = self.changes(genome)
+        lines = [f"Changed from the previous schedule: {len(changes)} of {len(self.tables.activity_names)} activities"]
+        for name, old, new in changes:
+            before = "new activity" if old is None else f"{old[0]} @ {old[1]} with {old[2]}"
+            lines.append(f"  {name}: {before} -> {new[0]} @ {new[1]} with {new[2]}")
+        return "\n".join(lines)
+
+def add_warm_start_arguments(parser):  # the same options for both scripts
+    parser.add_argument("--warm-start", default=None,
+                        help="start from a previous schedule (best_schedule.txt, final_schedule.txt or an --export .json)")
+    parser.add_argument("--instance-diff", default=None,
+                        help="what changed in the instance since that schedule (.json/.toml, see warm_start.py)")
+    parser.add_argument("--freeze", action="store_true", help="keep activities the change does not affect where they were")
+    parser.add_argument("--repaired-share", type=float, default=0.2, help="share of the population that is repaired copies")
+    parser.add_argument("--perturb", type=int, default=3, help="fields changed in each perturbed copy")
+
+def warm_start_from_args(tables, schedule_path, diff_path=None, freeze=False, repaired_share=0.2, perturb=3):
+    changed = changed_names(read_diff(diff_path)) if diff_path else set()
+    return WarmStart(tables, read_schedule(schedule_path), changed, freeze, repaired_share, perturb)